@@ -10,29 +10,41 @@ import streamlit.components.v1 as components
 #BACKEND IMPORTS 
 from database.bank_crud import (
     create_account,
+    authenticate,
     get_account,
     list_accounts,
     transfer_money,
-    get_transaction_history,get_cards, add_card, block_cards,block_all_cards,
+    get_transaction_page, get_transaction_totals, iter_transactions, get_cards, add_card, block_cards,block_all_cards,
     block_card_by_number,
     block_card_by_last4,
     block_card_by_last6_secure,
     block_cards_by_category,
     unblock_card_by_last6, 
 )
-from database.security import verify_password
-from nlu_engine.infer_intent import predict_intent
-from database.db import init_db,get_conn
+from database.security import get_bcrypt_pool, verify_password
+from nlu_engine.infer_intent import (
+    predict_intent, USE_CASCADE, get_cascade,
+    USE_PREDICTION_CACHE, get_prediction_cache,
+)
+from nlu_engine.model_manager import get_model_manager
+from database.db import init_db,db_connection
+from database.faq_search import add_faq, update_faq, delete_faq, best_answer as best_faq_answer
+from database.faq_embeddings import USE_SEMANTIC_FAQ, get_faq_embeddings, semantic_answer
+from database.log_writer import get_log_writer
+from database import analytics
+from database.faq_clustering import GROUPED_PENDING_SQL, assign_new as cluster_new_suggestions, \
+    cluster_members, set_cluster_status
+from llm_engine.cache import get_llm_cache
+from llm_engine.streaming import StreamTimer, record_turn
+from llm_engine.gateway import LLM_BACKEND, get_llm_gateway
+from llm_engine.local_backend import LOCAL_MODEL_PATH, get_local_llm
 
-from groq import Groq
 import os
 import time
+import uuid
 from datetime import datetime, timezone, timedelta
 
 
-client = Groq(
-    api_key=os.getenv("GROQ_API_KEY")  
-)
 INTENTS_PATH = os.path.join("nlu_engine", "intents.json")
 
 def load_intents():
@@ -52,6 +64,23 @@ init_db()
 st.set_page_config(page_title="BankBot AI", layout="wide")
 
 
+# NLU MODEL (loaded + warmed once per process, shared by every session/rerun)
+@st.cache_resource(show_spinner="Loading NLU model...")
+def load_nlu_model():
+    return get_model_manager()
+
+nlu_model = load_nlu_model()
+
+
+# FAQ EMBEDDINGS (encoded once per process, not on the first fallback turn)
+@st.cache_resource(show_spinner="Loading FAQ embeddings...")
+def load_faq_vectors():
+    # warms the index semantic_answer() uses; None without sentence-transformers, and the step is skipped
+    return get_faq_embeddings() if USE_SEMANTIC_FAQ else None
+
+load_faq_vectors()
+
+
 #SESSION INIT 
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -130,7 +159,20 @@ if st.session_state.logged_in or st.session_state.get("admin_logged", False):
 
 
 
+LLM_MODEL = os.path.basename(LOCAL_MODEL_PATH) if LLM_BACKEND == "local" else "llama-3.1-8b-instant"
+LLM_TEMPERATURE = 0.3
+LLM_STREAMING = os.getenv("BANKBOT_LLM_STREAM", "1") == "1"
+
+if LLM_BACKEND == "local":
+    # start loading the model now rather than on the first fallback question
+    get_llm_gateway(LLM_MODEL, LLM_TEMPERATURE)
+
+
 def groq_llm_response(user_text):
+    cached = get_llm_cache().get(user_text, LLM_MODEL, LLM_TEMPERATURE)
+    if cached:
+        return cached[0]
+
     prompt = f"""
 You are a professional banking assistant.
 Reply clearly and concisely.
@@ -139,17 +181,46 @@ User query:
 {user_text}
 """
 
-    completion = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": "You are a helpful banking assistant."},
-            {"role": "user", "content": user_text}
-        ],
-        temperature=0.3,
-        max_tokens=300
-    )
+    # deadline, concurrency cap, retries and circuit breaker live in the gateway
+    answer, source = get_llm_gateway(LLM_MODEL, LLM_TEMPERATURE).complete(user_text)
+    if source == "llm":
+        get_llm_cache().put(user_text, LLM_MODEL, LLM_TEMPERATURE, answer)
+    return answer
+
 
-    return completion.choices[0].message.content
+def groq_llm_stream(user_text, turn=None):
+    """Same answer as groq_llm_response, yielded chunk by chunk; cached only once complete."""
+    turn = turn if turn is not None else {}
+    cached = get_llm_cache().get(user_text, LLM_MODEL, LLM_TEMPERATURE)
+    if cached:
+        turn["source"] = "cache"
+        yield cached[0]
+        return
+    parts = []
+    for chunk in get_llm_gateway(LLM_MODEL, LLM_TEMPERATURE).stream(user_text, turn):
+        parts.append(chunk)
+        yield chunk
+    # degraded or cut-off answers are not worth keeping
+    if turn.get("source") == "llm":
+        get_llm_cache().put(user_text, LLM_MODEL, LLM_TEMPERATURE, "".join(parts))
+
+
+def stream_llm_answer(user_text):
+    """Render the fallback answer into a bot bubble as it streams; returns the final text."""
+    st.markdown(f'<div class="chat-bubble-user">{user_text}</div>', unsafe_allow_html=True)
+    bubble = st.empty()
+    turn = {}
+    timer = StreamTimer(groq_llm_stream(user_text, turn))
+    for _ in timer:
+        bubble.markdown(
+            f'<div class="chat-bubble-bot">{timer.text}▌</div>',
+            unsafe_allow_html=True
+        )
+    record_turn(
+        st.session_state.account_no, LLM_BACKEND, LLM_MODEL, turn.get("source", "llm"),
+        timer.ttft, timer.total, timer.chunks, timestamp=ist_now()
+    )
+    return timer.text
 
 
 # HOME PAGE 
@@ -316,9 +387,9 @@ def login_page():
 
             if st.button("Login", use_container_width=True):
                 acc_no = account_map[selected_user]
-                acc = get_account(acc_no)
+                acc = authenticate(acc_no, password)
 
-                if acc and verify_password(password, acc[4]):
+                if acc:
                     st.session_state.logged_in = True
                     st.session_state.account_no = acc_no
                     st.success("✅ Login successful")
@@ -699,7 +770,9 @@ def chatbot_page():
             else:
                 st.session_state.pending_transfer = {
                     "amount": float(amount),
-                    "to_acc": to_acc
+                    "to_acc": to_acc,
+                    # one key per confirmation: a double-submitted form moves money once
+                    "key": uuid.uuid4().hex
                 }
 
                 response = (
@@ -753,7 +826,10 @@ def chatbot_page():
            if faq_answer:
                response = f"📘 {faq_answer}"
            else:
-                llm_answer = groq_llm_response(user_text)
+                if LLM_STREAMING:
+                    llm_answer = stream_llm_answer(user_text)
+                else:
+                    llm_answer = groq_llm_response(user_text)
 
                 # Real-bank behavior: log suggestion if FAQ missing or low confidence
                 if confidence < 0.6:
@@ -783,7 +859,8 @@ def chatbot_page():
                 from_acc=st.session_state.account_no,
                 to_acc=pt["to_acc"],
                 amount=pt["amount"],
-                password=password
+                password=password,
+                idempotency_key=pt["key"]
             )
 
             st.session_state.chat.append(("bot", result))
@@ -791,27 +868,13 @@ def chatbot_page():
             st.rerun()
 
 def log_chat(account_no, user_text, intent, confidence):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence)
-        VALUES (?, ?, ?, ?, ?)
-    """, (ist_now(), account_no, user_text, intent, confidence))
-    conn.commit()
-    conn.close()
+    # queued; the background writer commits it with the rest of its batch
+    get_log_writer().submit("chat_logs", (ist_now(), account_no, user_text, intent, confidence))
 
 
 def get_faq_answer(user_text):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT question, answer FROM faqs")
-    faqs = cur.fetchall()
-    conn.close()
-
-    for q, a in faqs:
-        if q.lower() in user_text.lower():
-            return a
-    return None
+    # keyword match first; embeddings catch the paraphrases before we pay for the LLM
+    return best_faq_answer(user_text) or semantic_answer(user_text)
 
 
 
@@ -935,12 +998,11 @@ def transaction_history_page():
 
     account_no = st.session_state.account_no
 
-    data = get_transaction_history(account_no)
-
     # -------- SUMMARY METRICS --------
-    total_txns = len(data)
-    total_credit = sum(row[2] for row in data if row[1] == account_no)
-    total_debit = sum(row[2] for row in data if row[0] == account_no)
+    totals = get_transaction_totals(account_no)
+    total_txns = totals["count"]
+    total_credit = totals["credit"]
+    total_debit = totals["debit"]
 
     c1, c2, c3 = st.columns(3)
 
@@ -1011,14 +1073,19 @@ def transaction_history_page():
 
 
 
-    # Convert to table-friendly format
-    table_data = []
+    # -------- PAGE (keyset on timestamp, id) --------
+    # the cursor stack resets whenever the filters change
+    filters = (account_no, start_date, end_date, txn_type_filter)
+    if st.session_state.get("txn_filters") != filters:
+        st.session_state.txn_filters = filters
+        st.session_state.txn_cursors = [None]
 
-    for row in data:
-        from_acc, to_acc, amount, ts = row
+    rows, next_cursor = get_transaction_page(
+        account_no, start_date, end_date, txn_type_filter, before=st.session_state.txn_cursors[-1]
+    )
 
-        # Parse timestamp → datetime
-        txn_dt = datetime.fromisoformat(ts)
+    def table_row(row):
+        _, from_acc, to_acc, amount, ts = row
 
         # Determine transaction type
         if from_acc == account_no:
@@ -1028,28 +1095,15 @@ def transaction_history_page():
             txn_type = "Credit"
             amount_display = f"+₹{amount:,.2f}"
 
-        # -------- APPLY TYPE FILTER --------
-        if txn_type_filter != "All" and txn_type != txn_type_filter:
-            continue
-
-        # -------- APPLY DATE FILTER --------
-        if start_date and txn_dt.date() < start_date:
-            continue
-
-        if end_date and txn_dt.date() > end_date:
-            continue
-
-        table_data.append({
+        return {
             "From Account": from_acc,
             "To Account": to_acc,
             "Amount": amount_display,
             "Type": txn_type.upper(),
-            "Date & Time": txn_dt.strftime("%Y-%m-%d %H:%M:%S")
-        })
-
-
-
+            "Date & Time": datetime.fromisoformat(ts).strftime("%Y-%m-%d %H:%M:%S")
+        }
 
+    table_data = [table_row(row) for row in rows]
 
     import pandas as pd
 
@@ -1059,6 +1113,15 @@ def transaction_history_page():
         st.info("No transactions found for the selected filters.")
         return
 
+    if start_date or end_date or txn_type_filter != "All":
+        window = get_transaction_totals(account_no, start_date, end_date)
+        matching = {"All": window["count"], "Debit": window["debit_count"],
+                    "Credit": window["credit_count"]}[txn_type_filter]
+    else:
+        matching = total_txns
+    page_no = len(st.session_state.txn_cursors)
+    st.caption(f"Page {page_no} · {len(rows)} of {matching} matching transactions")
+
     def color_amount(val):
         if isinstance(val, str) and val.startswith("+"):
             return "color: green; font-weight: 600;"
@@ -1085,13 +1148,29 @@ def transaction_history_page():
         hide_index=True
     )
 
+    p1, p2 = st.columns(2)
+    with p1:
+        if st.button("⬅️ Newer", disabled=page_no == 1, use_container_width=True):
+            st.session_state.txn_cursors.pop()
+            st.rerun()
+    with p2:
+        if st.button("Older ➡️", disabled=next_cursor is None, use_container_width=True):
+            st.session_state.txn_cursors.append(next_cursor)
+            st.rerun()
+
     from io import StringIO
     from datetime import datetime
 
     st.markdown("<br>", unsafe_allow_html=True)
 
+    # the statement covers every matching row, so it is only built on request
+    if not st.button("🧾 Prepare Statement", use_container_width=True):
+        return
+
     csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    pd.DataFrame(
+        [table_row(row) for row in iter_transactions(account_no, start_date, end_date, txn_type_filter)]
+    ).to_csv(csv_buffer, index=False)
 
     filename = f"BankBot_Transaction_Statement_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
@@ -1635,10 +1714,7 @@ def admin_panel_page():
         </div>
         """, unsafe_allow_html=True)
 
-        conn = get_conn()
-        df = pd.read_sql("SELECT * FROM chat_logs", conn)
-        conn.close()
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        overview = analytics.query("summary")
 
 
         st.markdown("""
@@ -1695,10 +1771,10 @@ def admin_panel_page():
         </style>
         """, unsafe_allow_html=True)
 
-        total_queries = len(df)
-        active_users = df["account_no"].nunique() if not df.empty else 0
-        unique_intents = df["intent"].nunique() if not df.empty else 0
-        last_activity = df["timestamp"].iloc[-1] if not df.empty else "N/A"
+        total_queries = overview["total"]
+        active_users = overview["active_users"]
+        unique_intents = overview["unique_intents"]
+        last_activity = overview["last_activity"] or "N/A"
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
@@ -1736,8 +1812,127 @@ def admin_panel_page():
                 <div class="kpi-value">{last_activity}</div>
             </div>
             """, unsafe_allow_html=True)
-        
-        
+
+        # ---------- NLU MODEL ----------
+        with st.expander("🧠 NLU Model"):
+            model_stats = nlu_model.stats()
+            if model_stats["error"]:
+                st.warning(f"Model not loaded, using rule-based fallback: {model_stats['error']}")
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Backend", model_stats["backend"])
+            m2.metric("Load time", f"{model_stats['load_seconds']} s")
+            m3.metric("Warm-up time", f"{model_stats['warmup_seconds']} s")
+            m4.metric("Model size", f"{model_stats['model_mb']} MB")
+            st.caption(f"Process RSS growth on load: {model_stats['rss_delta_mb']} MB · PID {model_stats['pid']}")
+            if USE_PREDICTION_CACHE:
+                cache_stats = get_prediction_cache().stats()
+                c1, c2, c3, c4 = st.columns(4)
+                c1.metric("Cache hits", cache_stats["hits"])
+                c2.metric("Cache misses", cache_stats["misses"])
+                c3.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+                c4.metric("Entries", f"{cache_stats['size']}/{cache_stats['maxsize']}")
+                st.caption(
+                    f"Evictions: {cache_stats['evictions']} · Expired: {cache_stats['expirations']} · "
+                    f"Invalidations: {cache_stats['invalidations']} · TTL: {cache_stats['ttl']:.0f} s"
+                )
+            if USE_CASCADE:
+                cascade_stats = get_cascade().stats()
+                st.markdown(
+                    f"**Cascade** (margin ≥ {cascade_stats['margin_threshold']}) — "
+                    f"transformer calls saved: **{cascade_stats['transformer_calls_saved']}** "
+                    f"of {cascade_stats['calls']}"
+                )
+                st.dataframe(pd.DataFrame(cascade_stats["stages"]).T, use_container_width=True)
+
+        with st.expander("💬 LLM Fallback"):
+            llm_stats = get_llm_cache().stats()
+            l1, l2, l3, l4 = st.columns(4)
+            l1.metric("Exact hits", llm_stats["exact_hits"])
+            l2.metric("Semantic hits", llm_stats["semantic_hits"])
+            l3.metric("Hit rate", f"{llm_stats['hit_rate']:.0%}")
+            l4.metric("Cached answers", f"{llm_stats['size']}/{llm_stats['maxsize']}")
+            st.caption(
+                f"Misses: {llm_stats['misses']} · Evictions: {llm_stats['evictions']} · "
+                f"TTL: {llm_stats['ttl'] / 3600:.0f} h · Semantic level: {'on' if llm_stats['semantic'] else 'off'}"
+            )
+            try:
+                gw_stats = get_llm_gateway(LLM_MODEL, LLM_TEMPERATURE).stats()
+            except Exception as e:
+                gw_stats = None
+                st.caption(f"Gateway unavailable: {e}")
+            if gw_stats:
+                g1, g2, g3, g4 = st.columns(4)
+                g1.metric("Circuit", gw_stats["breaker"].replace("_", "-"))
+                g2.metric("In flight", f"{gw_stats['in_flight']}/{gw_stats['max_concurrent']}")
+                g3.metric("Degraded", gw_stats["degraded"])
+                g4.metric("Retries", gw_stats["retries"])
+                st.caption(
+                    f"Calls: {gw_stats['calls']} · OK: {gw_stats['ok']} · Timeouts: {gw_stats['timeouts']} · "
+                    f"Errors: {gw_stats['errors']} · Busy: {gw_stats['busy']} · "
+                    f"Short-circuited: {gw_stats['short_circuited']} · Breaker trips: {gw_stats['breaker_trips']} · "
+                    f"Deadline: {gw_stats['deadline']:.0f} s"
+                )
+            if LLM_BACKEND == "local":
+                local_stats = get_local_llm().stats()
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Local model", "ready" if local_stats["ready"] else "loading")
+                m2.metric("Tokens/sec", f"{local_stats['tokens_per_sec']:.1f}")
+                m3.metric("Queued", local_stats["queued"])
+                m4.metric("Requests", local_stats["requests"])
+                st.caption(
+                    f"{local_stats['model']} · n_threads {local_stats['n_threads']} · n_ctx {local_stats['n_ctx']} · "
+                    f"last {local_stats['last_tokens_per_sec']:.1f} tok/s"
+                    + (f" · loaded in {local_stats['load_seconds']:.1f} s" if local_stats["load_seconds"] else "")
+                )
+                if local_stats["load_error"]:
+                    st.error(f"Local model failed to load: {local_stats['load_error']}")
+            with db_connection() as conn:
+                turns = pd.read_sql(
+                    "SELECT source, ttft_ms, total_ms FROM llm_turns ORDER BY id DESC LIMIT 500", conn
+                )
+            if not turns.empty:
+                st.markdown("**Median latency per turn (last 500)**")
+                st.dataframe(
+                    turns.groupby("source")[["ttft_ms", "total_ms"]].median().round(0),
+                    use_container_width=True
+                )
+
+        with st.expander("📝 Log Writer"):
+            log_stats = get_log_writer().stats()
+            w1, w2, w3, w4 = st.columns(4)
+            w1.metric("Queued", f"{log_stats['queued']}/{log_stats['maxsize']}")
+            w2.metric("Written", log_stats["written"])
+            w3.metric("Dropped", log_stats["dropped"])
+            w4.metric("Flush p99", f"{log_stats['flush_ms_p99']:.1f} ms")
+            st.caption(
+                f"Mode: {log_stats['mode']} · Batches: {log_stats['batches']} "
+                f"(avg {log_stats['avg_batch']:.1f} rows) · Flush p50: {log_stats['flush_ms_p50']:.1f} ms · "
+                f"High water: {log_stats['high_water']} · Failed: {log_stats['failed']}"
+            )
+
+        # ---------- ANALYTICS CACHE ----------
+        with st.expander("📈 Analytics Cache"):
+            cache_stats = analytics.get_analytics_cache().stats()
+            a1, a2, a3, a4 = st.columns(4)
+            a1.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+            a2.metric("Entries", cache_stats["entries"])
+            a3.metric("Invalidations", cache_stats["invalidations"])
+            a4.metric("Query p99", f"{cache_stats['query_ms_p99']:.1f} ms")
+            st.caption(
+                f"TTL: {cache_stats['ttl']:.0f}s · Hits: {cache_stats['hits']} · Misses: {cache_stats['misses']} · "
+                f"Query p50: {cache_stats['query_ms_p50']:.1f} ms"
+            )
+
+        # ---------- PASSWORD HASHING ----------
+        with st.expander("🔐 Password Hashing"):
+            bcrypt_stats = get_bcrypt_pool().stats()
+            b1, b2, b3, b4 = st.columns(4)
+            b1.metric("Work factor", bcrypt_stats["rounds"])
+            b2.metric("Workers", f"{bcrypt_stats['in_flight']}/{bcrypt_stats['workers']}")
+            b3.metric("Calls", bcrypt_stats["calls"])
+            b4.metric("p99", f"{bcrypt_stats['ms_p99']:.0f} ms")
+            st.caption(f"Executor: {bcrypt_stats['executor']} · p50: {bcrypt_stats['ms_p50']:.0f} ms")
+
         st.markdown("""
         <div class="section-box">
             <div class="section-title">🔍 Filters</div>
@@ -1751,29 +1946,19 @@ def admin_panel_page():
         with f1:
             start_date = st.date_input(
                 "From Date",
-                value=df["timestamp"].min().date() if not df.empty else None
+                value=datetime.fromisoformat(overview["first_activity"]).date() if total_queries else None
             )
         with f2:
             end_date = st.date_input(
                 "To Date",
-                value=df["timestamp"].max().date() if not df.empty else None
+                value=datetime.fromisoformat(overview["last_activity"]).date() if total_queries else None
             )
         with f3:
             intent_filter = st.selectbox(
                 "Intent",
-                options=["All"] + sorted(df["intent"].unique().tolist())
-            if not df.empty else ["All"]
+                options=["All"] + analytics.query("intent_names")
+            if total_queries else ["All"]
             )
-        
-        if not df.empty:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-            if start_date:
-                df = df[df["timestamp"].dt.date >= start_date]
-            if end_date:
-                df = df[df["timestamp"].dt.date <= end_date]
-            if intent_filter != "All":
-                df = df[df["intent"] == intent_filter]
 
         st.markdown("""
         <div class="section-box">
@@ -1785,8 +1970,9 @@ def admin_panel_page():
         
 
 
-        if not df.empty:
-            intent_counts = df["intent"].value_counts()
+        intent_rows = analytics.query("intent_counts", start_date, end_date, intent_filter)
+        if intent_rows:
+            intent_counts = pd.Series(dict(intent_rows), name="count")
 
             st.bar_chart(intent_counts)
         else:
@@ -1802,9 +1988,12 @@ def admin_panel_page():
         
 
 
-        if not df.empty:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            trend = df.groupby(df["timestamp"].dt.date).size()
+        # a single day is shown hour by hour
+        trend_query = "hourly_counts" if start_date and start_date == end_date else "daily_counts"
+        trend_rows = analytics.query(trend_query, start_date, end_date, intent_filter)
+        if trend_rows:
+            trend = pd.Series(dict(trend_rows), name="queries")
+            trend.index = pd.to_datetime(trend.index)
 
             st.line_chart(trend)
         else:
@@ -1818,10 +2007,18 @@ def admin_panel_page():
     # -------- USER LOGS --------
     with tab_logs:
         st.subheader("🧾 User Logs")
-        conn = get_conn()
-        df = pd.read_sql("SELECT * FROM chat_logs", conn)
-        conn.close()
+        l1, l2 = st.columns(2)
+        with l1:
+            log_range = st.date_input("Date range", value=(), key="log_range")
+        with l2:
+            log_limit = st.number_input("Latest rows", min_value=100, max_value=100000, value=1000, step=500)
+        log_start, log_end = (tuple(log_range) + (None, None))[:2]
+        df = pd.DataFrame(
+            analytics.query("recent_logs", log_start, log_end, limit=int(log_limit)),
+            columns=analytics.RECENT_LOG_COLUMNS,
+        )
 
+        st.caption(f"Newest {len(df)} rows of {overview['total']}")
         st.dataframe(df, use_container_width=True)
         st.download_button(
             "Download CSV",
@@ -1853,14 +2050,7 @@ def admin_panel_page():
             if not q or not a:
                 st.warning("Please fill both Question and Answer")
             else:
-                conn = get_conn()
-                cur = conn.cursor()
-                cur.execute(
-                    "INSERT INTO faqs (question, answer) VALUES (?, ?)",
-                    (q, a)
-                )
-                conn.commit()
-                conn.close()
+                add_faq(q, a)
                 st.success("✅ FAQ added successfully")
                 st.rerun()
 
@@ -1872,9 +2062,8 @@ def admin_panel_page():
         </div>
         """, unsafe_allow_html=True)
 
-        conn = get_conn()
-        faqs = pd.read_sql("SELECT * FROM faqs", conn)
-        conn.close()
+        with db_connection() as conn:
+            faqs = pd.read_sql("SELECT * FROM faqs", conn)
 
         if faqs.empty:
             st.info("No FAQs added yet.")
@@ -1891,27 +2080,13 @@ def admin_panel_page():
 
                     with col1:
                         if st.button("💾 Update", key=f"upd_{row['id']}"):
-                            conn = get_conn()
-                            cur = conn.cursor()
-                            cur.execute(
-                                "UPDATE faqs SET answer=? WHERE id=?",
-                                (new_answer, row["id"])
-                            )
-                            conn.commit()
-                            conn.close()
+                            update_faq(int(row["id"]), new_answer)
                             st.success("Updated successfully")
                             st.rerun()
 
                     with col2:
                         if st.button("🗑 Delete", key=f"del_{row['id']}"):
-                            conn = get_conn()
-                            cur = conn.cursor()
-                            cur.execute(
-                                "DELETE FROM faqs WHERE id=?",
-                                (row["id"],)
-                            )
-                            conn.commit()
-                            conn.close()
+                            delete_faq(int(row["id"]))
                             st.warning("FAQ deleted")
                             st.rerun()
     
@@ -1925,13 +2100,16 @@ def admin_panel_page():
             </div>
             """, unsafe_allow_html=True)
 
-        conn = get_conn()
-        df = pd.read_sql("""
-            SELECT * FROM faq_suggestions
-            WHERE status='PENDING'
-            ORDER BY frequency DESC
-        """, conn)
-        conn.close()
+        # near-duplicate phrasings asked since the last visit join their cluster,
+        # once per session rather than on every rerun (it is a write)
+        regroup = st.button("🔄 Group new phrasings", key="regroup_suggestions")
+        if regroup or not st.session_state.get("suggestions_grouped"):
+            with db_connection() as conn:
+                cluster_new_suggestions(conn)
+            st.session_state.suggestions_grouped = True
+
+        with db_connection() as conn:
+            df = pd.read_sql(GROUPED_PENDING_SQL, conn)
 
         if df.empty:
             st.success("No pending FAQ suggestions 🎉")
@@ -1939,6 +2117,13 @@ def admin_panel_page():
             for _, row in df.iterrows():
                 with st.expander(f"❓ {row['question']} (Asked {row['frequency']} times)"):
                     st.write(f"Average Confidence: {round(row['avg_confidence'], 2)}")
+                    if row["variants"] > 1:
+                        with db_connection() as conn:
+                            variants = cluster_members(conn, int(row["id"]))
+                        st.caption(
+                            f"{row['variants']} phrasings, e.g. "
+                            + " · ".join(f"“{q}” ({n})" for q, n in variants[1:6])
+                        )
                     answer = st.text_area(
                         "Approved Answer",
                         key=f"ans_{row['id']}"
@@ -1948,33 +2133,19 @@ def admin_panel_page():
 
                     with col1:
                         if st.button("✅ Approve", key=f"app_{row['id']}"):
-                            conn = get_conn()
-                            cur = conn.cursor()
-
-                            cur.execute(
-                                "INSERT INTO faqs (question, answer) VALUES (?, ?)",
-                                (row["question"], answer)
-                            )
-                            cur.execute(
-                                "UPDATE faq_suggestions SET status='APPROVED' WHERE id=?",
-                                (row["id"],)
-                            )
-
-                            conn.commit()
-                            conn.close()
+                            with db_connection() as conn:
+                                set_cluster_status(conn, int(row["id"]), "APPROVED")
+                                # an approved cluster already has its FAQ; these are just more phrasings of it
+                                if row["cluster_status"] != "APPROVED":
+                                    add_faq(row["question"], answer)
+
                             st.success("FAQ approved & published")
                             st.rerun()
 
                     with col2:
                         if st.button("❌ Reject", key=f"rej_{row['id']}"):
-                            conn = get_conn()
-                            cur = conn.cursor()
-                            cur.execute(
-                                "UPDATE faq_suggestions SET status='REJECTED' WHERE id=?",
-                                (row["id"],)
-                            )
-                            conn.commit()
-                            conn.close()
+                            with db_connection() as conn:
+                                set_cluster_status(conn, int(row["id"]), "REJECTED")
                             st.warning("FAQ rejected")
                             st.rerun()
 
@@ -1983,15 +2154,13 @@ def admin_panel_page():
     with tab_analytics:
         st.subheader("📈 Intent Analytics")
 
-        conn = get_conn()
-        df = pd.read_sql("SELECT * FROM chat_logs", conn)
-        conn.close()
-        if df.empty:
+        overview = analytics.query("summary")
+        if not overview["total"]:
             st.info("No intent data available yet.")
             st.stop()
 
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        intent_counts = df["intent"].value_counts()
+        intent_rows = analytics.query("intent_counts")
+        intent_counts = pd.Series(dict(intent_rows), name="count")
 
     # ---------- ROW 1 ----------
         col1, col2 = st.columns(2)
@@ -2014,17 +2183,8 @@ def admin_panel_page():
             </div>
             """, unsafe_allow_html=True)
 
-            conn = get_conn()
-
-            df_intents = pd.read_sql("""
-                SELECT intent, COUNT(*) as count
-                FROM chat_logs
-                WHERE intent IS NOT NULL
-                GROUP BY intent
-                ORDER BY count DESC
-            """, conn)
+            df_intents = pd.DataFrame(intent_rows, columns=["intent", "count"])
 
-            conn.close()
 
 
             import plotly.express as px
@@ -2085,10 +2245,11 @@ def admin_panel_page():
             """, unsafe_allow_html=True)
 
             trend = (
-                df.groupby([df["timestamp"].dt.date, "intent"])
-                 .size()
-                 .unstack(fill_value=0)
+                pd.DataFrame(analytics.query("daily_intents"), columns=["day", "intent", "count"])
+                 .pivot(index="day", columns="intent", values="count")
+                 .fillna(0)
             )
+            trend.index = pd.to_datetime(trend.index)
             st.line_chart(trend)
 
         with col4:
@@ -2099,30 +2260,7 @@ def admin_panel_page():
             </div>
             """, unsafe_allow_html=True)
 
-            conn = get_conn()
-
-            df_conf = pd.read_sql(
-                "SELECT confidence FROM chat_logs WHERE confidence IS NOT NULL",
-                conn
-            )
-
-            conn.close()
-
-            def confidence_bucket(conf):
-                if conf < 0.5:
-                    return "Low (<0.5)"
-                elif conf <= 0.8:
-                    return "Medium (0.5–0.8)"
-                else:
-                    return "High (>0.8)"
-
-            df_conf["bucket"] = df_conf["confidence"].apply(confidence_bucket)
-
-            bucket_counts = (
-                df_conf["bucket"]
-                .value_counts()
-                .reindex(["Low (<0.5)", "Medium (0.5–0.8)", "High (>0.8)"], fill_value=0)
-            )
+            bucket_counts = pd.Series(analytics.query("confidence_mix"))
 
 
             import plotly.express as px
@@ -2169,9 +2307,9 @@ def admin_panel_page():
         st.markdown("### 🧠 Key Insights")
 
         st.success(f"""
-        ✔ Most frequent intent: **{intent_counts.idxmax()}**  
-        ✔ Average confidence: **{round(df['confidence'].mean(), 2)}**  
-        ✔ Total intents detected: **{df['intent'].nunique()}**
+        ✔ Most frequent intent: **{intent_counts.idxmax() if not intent_counts.empty else 'N/A'}**  
+        ✔ Average confidence: **{round(overview['avg_confidence'] or 0, 2)}**  
+        ✔ Total intents detected: **{overview['unique_intents']}**
         """)
 
     if "intent_added" not in st.session_state:
@@ -2408,9 +2546,6 @@ def admin_panel_page():
                 losses = []
                 total_epochs = epochs
 
-                conn = get_conn()
-                cur = conn.cursor()
-
                 for ep in range(1, total_epochs + 1):
                     status.info(f"Training epoch {ep}/{total_epochs}")
 
@@ -2418,16 +2553,12 @@ def admin_panel_page():
                     loss = round(random.uniform(0.8, 1.2) / ep, 4)
                     losses.append(loss)
 
-                    cur.execute(
-                        "INSERT INTO training_logs (stage, epoch, loss, timestamp) VALUES (?, ?, ?, ?)",
-                        ("TRAIN", ep, loss, ist_now())
-                    )
+                    get_log_writer().submit("training_logs", ("TRAIN", ep, loss, ist_now()))
 
                     progress.progress(int((ep / total_epochs) * 100))
                     time.sleep(1)
+                get_log_writer().flush()
 
-                conn.commit()
-                conn.close()
 
                 status.success("Training completed")
                 st.success("✅ Model training completed")
@@ -2487,9 +2618,6 @@ def admin_panel_page():
 
                 losses = []
 
-                conn = get_conn()
-                cur = conn.cursor()
-
                 total = len(steps)
 
                 for idx, step in enumerate(steps, start=1):
@@ -2500,19 +2628,12 @@ def admin_panel_page():
                     losses.append(loss)
 
                     # 🔥 LOGGING (THIS WAS GETTING SKIPPED BEFORE)
-                    cur.execute(
-                        """
-                        INSERT INTO training_logs (stage, epoch, loss, timestamp)
-                        VALUES (?, ?, ?, ?)
-                        """,
-                        ("RETRAIN", idx, loss, ist_now())
-                    )
+                    get_log_writer().submit("training_logs", ("RETRAIN", idx, loss, ist_now()))
 
                     progress.progress(int((idx / total) * 100))
                     time.sleep(1)
+                get_log_writer().flush()
 
-                conn.commit()
-                conn.close()
 
                 status.success("Retraining completed successfully")
                 st.success("✅ Model retrained successfully")
@@ -2529,12 +2650,11 @@ def admin_panel_page():
         st.markdown("---")
         st.subheader("🧾 Training Logs")
 
-        conn = get_conn()
-        logs_df = pd.read_sql(
-            "SELECT stage, epoch, loss, timestamp FROM training_logs ORDER BY timestamp DESC",
-            conn
-        )
-        conn.close()
+        with db_connection() as conn:
+            logs_df = pd.read_sql(
+                "SELECT stage, epoch, loss, timestamp FROM training_logs ORDER BY timestamp DESC",
+                conn
+            )
 
         if logs_df.empty:
             st.info("No training logs available yet.")
@@ -2544,53 +2664,9 @@ def admin_panel_page():
 
 
 def log_faq_suggestion(question, confidence):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Check if question already exists
-    cur.execute(
-        """
-        SELECT id, frequency, avg_confidence
-        FROM faq_suggestions
-        WHERE question = ?
-        """,
-        (question,)
-    )
-    row = cur.fetchone()
-
-    if row:
-        faq_id, freq, avg_conf = row
-
-        # Calculate new average confidence
-        new_avg = (
-            (avg_conf * freq + confidence) / (freq + 1)
-            if avg_conf is not None else confidence
-        )
-
-        cur.execute(
-            """
-            UPDATE faq_suggestions
-            SET frequency = frequency + 1,
-                avg_confidence = ?,
-                last_asked = datetime('now')
-            WHERE id = ?
-            """,
-            (new_avg, faq_id)
-        )
-
-    else:
-        # First time this question appears
-        cur.execute(
-            """
-            INSERT INTO faq_suggestions
-            (question, frequency, avg_confidence, last_asked)
-            VALUES (?, 1, ?, datetime('now'))
-            """,
-            (question, confidence)
-        )
+    # one UPSERT per batch in the background writer; average confidence is derived on read
+    get_log_writer().submit("faq_suggestions", (question, confidence))
 
-    conn.commit()
-    conn.close()
 
 
 # ================= ROUTER =================
@@ -0,0 +1,97 @@
+# Experiments/bench_analytics.py
+"""
+Admin Panel render cost against chat_logs size: the old approach (fetch
+every row of chat_logs, three times, and count in Python) against the
+rollup-backed aggregates in database.analytics, cold and through the
+cache. Also reports what the rollup trigger adds to chat_logs inserts and
+how long a full backfill takes.
+
+    python Experiments/bench_analytics.py --sizes 1000,100000,1000000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import analytics, chat_rollups, db
+
+INTENTS = ["check_balance", "block_card", "transfer_money", "card_info", "faq", "greet", "fallback"]
+
+
+def populate(path, n, days):
+    rng = random.Random(3)
+    base = datetime(2025, 1, 1)
+    conn = sqlite3.connect(path)
+    db._create_tables(conn)
+    db.migrate(conn)
+    rows = (((base + timedelta(seconds=int(days * 86400 * i / n))).strftime("%Y-%m-%d %H:%M:%S"),
+             str(1000 + rng.randrange(5000)), "query", rng.choice(INTENTS), rng.random()) for i in range(n))
+    conn.executemany(
+        "INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def render_full_scan(path):
+    # what admin_panel_page did: three SELECT * reads, counted client-side
+    for _ in range(3):
+        with db.db_connection(path) as conn:
+            rows = conn.execute("SELECT * FROM chat_logs").fetchall()
+        Counter(r[4] for r in rows)
+        Counter(r[1][:10] for r in rows)
+        len({r[2] for r in rows})
+
+
+def render_sql(path):
+    overview = analytics.query("summary", db_path=path)
+    start, end = overview["first_activity"], overview["last_activity"]
+    analytics.query("intent_names", db_path=path)
+    analytics.query("intent_counts", start, end, "All", db_path=path)
+    analytics.query("daily_counts", start, end, "All", db_path=path)
+    analytics.query("recent_logs", None, None, limit=1000, db_path=path)
+    analytics.query("intent_counts", db_path=path)
+    analytics.query("daily_intents", db_path=path)
+    analytics.query("confidence_mix", db_path=path)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return 1000 * (time.perf_counter() - t0)
+
+
+def main(args):
+    days = 180
+    print(f"{'rows':>10} {'insert/row':>11} {'backfill':>9} {'full scan':>10} {'rollup cold':>12} {'warm':>9}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            t0 = time.perf_counter()
+            populate(path, n, days)
+            insert_us = 1e6 * (time.perf_counter() - t0) / n
+            with db.db_connection(path) as conn:
+                t0 = time.perf_counter()
+                chat_rollups.backfill(conn)
+                backfill_s = time.perf_counter() - t0
+            full = f"{timed(render_full_scan, path):8.0f}ms" if n <= args.full_scan_max else "       -  "
+            analytics.invalidate()
+            cold = timed(render_sql, path)
+            warm = timed(render_sql, path)
+            print(f"{n:>10} {insert_us:9.1f}us {backfill_s:8.1f}s {full} {cold:10.1f}ms {warm:7.3f}ms")
+            db.get_pool(path).close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--full_scan_max", type=int, default=300_000, help="skip the old path above this size")
+    main(parser.parse_args())
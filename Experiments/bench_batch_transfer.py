@@ -0,0 +1,70 @@
+# Experiments/bench_batch_transfer.py
+"""
+Payroll-style batch: N legs from one account, posted with
+transfers.transfer_batch against a loop of bank_crud.transfer_money (one
+bcrypt check, connection checkout and commit per leg).
+
+The loop is timed on --loop_legs legs and extrapolated, because at the
+default bcrypt cost 10k checks take about an hour.
+
+    python Experiments/bench_batch_transfer.py --legs 10000 --rounds 12
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import bcrypt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import bank_crud, db, transfers
+
+
+def setup(path, payees, rounds):
+    db.DB_NAME = path
+    db.init_db()
+    pwd_hash = bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds))
+    with db.db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO accounts(account_number, user_name, account_type, balance, password_hash) VALUES (?, ?, ?, ?, ?)",
+            [("1000", "employer", "Current", 10 ** 12, pwd_hash)]
+            + [(str(5000 + i), f"emp{i}", "Savings", 0, pwd_hash) for i in range(payees)],
+        )
+
+
+def main(args):
+    legs = [(str(5000 + i % args.payees), 1000 + i % 7) for i in range(args.legs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(os.path.join(tmp, "bench.db"), args.payees, args.rounds)
+
+        t0 = time.perf_counter()
+        for to_acc, amount in legs[:args.loop_legs]:
+            assert bank_crud.transfer_money("1000", to_acc, amount, "pw") == "✅ Transfer Successful"
+        per_leg = (time.perf_counter() - t0) / args.loop_legs
+
+        t0 = time.perf_counter()
+        results = transfers.transfer_batch("1000", legs, "pw", chunk_size=args.chunk)
+        batch = time.perf_counter() - t0
+        assert all(r.ok for r in results)
+
+        with db.db_connection() as conn:
+            total = conn.execute("SELECT SUM(balance) FROM accounts").fetchone()[0]
+        assert total == 10 ** 12
+        print(f"{args.legs} legs, bcrypt rounds {args.rounds}, chunk {args.chunk}")
+        print(f"transfer_money loop  {per_leg * 1000:8.2f} ms/leg  -> {per_leg * args.legs:8.1f} s for all legs "
+              f"(measured on {args.loop_legs})")
+        print(f"transfer_batch       {batch * 1000 / args.legs:8.3f} ms/leg  -> {batch:8.2f} s "
+              f"({args.legs / batch:,.0f} legs/s, {per_leg * args.legs / batch:,.0f}x)")
+        db.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--legs", type=int, default=10_000)
+    parser.add_argument("--payees", type=int, default=2_000)
+    parser.add_argument("--loop_legs", type=int, default=50)
+    parser.add_argument("--chunk", type=int, default=transfers.TRANSFER_CHUNK)
+    parser.add_argument("--rounds", type=int, default=12)
+    main(parser.parse_args())
@@ -0,0 +1,60 @@
+# Experiments/bench_batching.py
+"""
+Throughput of IntentClassifier.predict (one text per forward pass) vs the
+micro-batching engine, at 1, 8 and 64 concurrent callers.
+
+    python Experiments/bench_batching.py --requests 512
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nlu_engine.infer_intent import IntentClassifier
+from nlu_engine.batching import BatchingEngine
+from nlu_engine.train_intent import load_intents
+
+
+def run(callers, total, predict, texts):
+    per_caller = max(1, total // callers)
+
+    def worker(offset):
+        for i in range(per_caller):
+            predict(texts[(offset + i) % len(texts)])
+
+    threads = [threading.Thread(target=worker, args=(c * per_caller,)) for c in range(callers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return (per_caller * callers) / elapsed
+
+
+def main(args):
+    texts, _ = load_intents()
+    clf = IntentClassifier()
+    clf.predict_batch(texts[:8])  # warm-up
+
+    print(f"{'callers':>8} {'direct req/s':>14} {'batched req/s':>14} {'speedup':>8}")
+    for callers in args.callers:
+        direct = run(callers, args.requests, clf.predict, texts)
+        engine = BatchingEngine(clf, max_batch_size=args.max_batch, max_wait_ms=args.wait_ms)
+        batched = run(callers, args.requests, engine.predict, texts)
+        stats = engine.stats()
+        engine.close()
+        print(f"{callers:>8} {direct:>14.1f} {batched:>14.1f} {batched / direct:>7.2f}x")
+        print(f"{'':>8} batch sizes: {stats['batch_size_histogram']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--max_batch", type=int, default=32)
+    parser.add_argument("--wait_ms", type=float, default=5.0)
+    main(parser.parse_args())
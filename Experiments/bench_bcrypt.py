@@ -0,0 +1,59 @@
+# Experiments/bench_bcrypt.py
+"""
+Login throughput: --sessions threads each verify a password --logins
+times, as concurrent Streamlit sessions would. Runs inline bcrypt (the old
+path), then the security pool as threads and as processes, at several
+worker counts.
+
+    python Experiments/bench_bcrypt.py --rounds 12 --sessions 16
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import bcrypt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import security
+
+
+def run(verify, hashed, sessions, logins):
+    def session():
+        for _ in range(logins):
+            assert verify("pw", hashed)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sessions * logins / (time.perf_counter() - t0)
+
+
+def main(args):
+    hashed = bcrypt.hashpw(b"pw", bcrypt.gensalt(args.rounds))
+    cores = os.cpu_count() or 1
+    print(f"bcrypt rounds {args.rounds}, {args.sessions} sessions x {args.logins} logins, {cores} cores")
+    print(f"{'inline':<18} {run(lambda p, h: bcrypt.checkpw(p.encode(), h), hashed, args.sessions, args.logins):8.1f} logins/s")
+    workers = sorted({1, 2, 4, cores, 2 * cores})
+    for kind in ("thread", "process"):
+        for n in workers:
+            security._pool = security.BcryptPool(workers=n, kind=kind)
+            security.verify_password("pw", hashed)  # start the workers
+            rate = run(security.verify_password, hashed, args.sessions, args.logins)
+            stats = security.get_bcrypt_pool().stats()
+            print(f"{kind:<7} workers {n:<3}  {rate:8.1f} logins/s   p50 {stats['ms_p50']:6.0f} ms  "
+                  f"p99 {stats['ms_p99']:6.0f} ms")
+            security._pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=security.BCRYPT_ROUNDS)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=4)
+    main(parser.parse_args())
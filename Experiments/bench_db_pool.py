@@ -0,0 +1,170 @@
+# Experiments/bench_db_pool.py
+"""
+Connect-per-call with the default rollback journal (the old get_conn())
+vs the pooled WAL connections from database.db, on a chatbot-like mix:
+account lookups, transaction history reads and chat_logs inserts from
+concurrent threads.
+
+The "crud" rows then drive the real code paths through the pool:
+bank_crud.get_account, get_transaction_history and transfer_money
+(bcrypt check, BEGIN IMMEDIATE, guarded debit). Passwords are hashed at
+--bcrypt_rounds so the numbers show database contention rather than
+bcrypt. "locked" there counts transfers that gave up as BUSY, and the
+run checks that no money was created or lost.
+
+    python Experiments/bench_db_pool.py --threads 1 8 32 --ops 2000 --bcrypt_rounds 4
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import bank_crud, db, security, transfers
+
+
+def seed(path, accounts=500, txns=20000):
+    conn = sqlite3.connect(path)
+    db._create_tables(conn)
+    conn.executemany("INSERT INTO accounts VALUES (?, ?, 'Savings', 10000, x'00')",
+                     [(str(100000 + i), f"user{i}") for i in range(accounts)])
+    conn.executemany("INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+                     [(str(100000 + random.randrange(accounts)), str(100000 + random.randrange(accounts)),
+                       random.randint(1, 500), f"2025-01-01T00:00:{i:06d}") for i in range(txns)])
+    conn.commit()
+    conn.close()
+
+
+def op(conn, rng, accounts):
+    acc = str(100000 + rng.randrange(accounts))
+    r = rng.random()
+    if r < 0.5:
+        conn.execute("SELECT * FROM accounts WHERE account_number=?", (acc,)).fetchone()
+    elif r < 0.8:
+        conn.execute("SELECT * FROM transactions WHERE from_account=? OR to_account=? ORDER BY timestamp DESC",
+                     (acc, acc)).fetchall()
+    else:
+        conn.execute("INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) "
+                     "VALUES (datetime('now'), ?, 'check balance', 'check_balance', 0.9)", (acc,))
+
+
+def legacy(path):
+    def call(rng, accounts):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            op(conn, rng, accounts)
+            conn.commit()
+        finally:
+            conn.close()
+    return call
+
+
+def pooled(path):
+    pool = db.ConnectionPool(path)
+
+    def call(rng, accounts):
+        with pool.connection() as conn:
+            op(conn, rng, accounts)
+    return call
+
+
+def crud(path, accounts, txns=20000):
+    """Accounts made through bank_crud (real bcrypt hashes), history seeded directly."""
+    db.DB_NAME = path
+    db.init_db()
+    for i in range(accounts):
+        bank_crud.create_account(f"user{i}", str(100000 + i), "Savings", 10000, "pw")
+    with db.db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+            [(str(100000 + random.randrange(accounts)), str(100000 + random.randrange(accounts)),
+              random.randint(1, 500), f"2025-01-01T00:00:{i:06d}") for i in range(txns)])
+    busy = [0]
+    lock = threading.Lock()
+
+    def call(rng, accounts):
+        acc = str(100000 + rng.randrange(accounts))
+        r = rng.random()
+        if r < 0.4:
+            bank_crud.get_account(acc)
+        elif r < 0.7:
+            bank_crud.get_transaction_history(acc)
+        else:
+            to = str(100000 + rng.randrange(accounts))
+            if bank_crud.transfer_money(acc, to, rng.randint(1, 50), "pw") == transfers.MESSAGES[transfers.BUSY]:
+                with lock:
+                    busy[0] += 1
+    return call, busy
+
+
+def total_balance():
+    with db.db_connection() as conn:
+        return conn.execute("SELECT SUM(balance) FROM accounts").fetchone()[0]
+
+
+def run(call, threads, ops, accounts):
+    per_thread = max(1, ops // threads)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(seed_):
+        rng = random.Random(seed_)
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            try:
+                call(rng, accounts)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors[0] += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p = lambda q: 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return len(latencies) / elapsed, p(0.5), p(0.95), errors[0]
+
+
+def main(args):
+    print(f"{'variant':<8} {'threads':>7} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in (("legacy", legacy), ("pooled", pooled)):
+            path = os.path.join(tmp, f"{name}.db")
+            seed(path, args.accounts)
+            call = factory(path)
+            for threads in args.threads:
+                ops_s, p50, p95, errs = run(call, threads, args.ops, args.accounts)
+                print(f"{name:<8} {threads:>7} {ops_s:>9.0f} {p50:>8.2f} {p95:>8.2f} {errs:>7}")
+
+        security.BCRYPT_ROUNDS = args.bcrypt_rounds
+        call, busy = crud(os.path.join(tmp, "crud.db"), args.accounts)
+        opening = total_balance()
+        for threads in args.threads:
+            busy[0] = 0
+            ops_s, p50, p95, errs = run(call, threads, args.ops, args.accounts)
+            print(f"{'crud':<8} {threads:>7} {ops_s:>9.0f} {p50:>8.2f} {p95:>8.2f} {errs + busy[0]:>7}")
+        assert total_balance() == opening, "transfers created or lost money"
+        print(f"crud: bcrypt rounds {args.bcrypt_rounds}, pool size {db.get_pool().size}, balances conserved")
+        db.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--bcrypt_rounds", type=int, default=4, help="cost for the crud accounts (4 is the minimum)")
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+# Experiments/bench_entity_scanner.py
+"""
+Micro-benchmark of EntityExtractor.extract_regex (sorted span index)
+against the previous loop with a linear reserved-span check, on inputs
+that look like pasted statements with dozens to hundreds of numbers.
+
+    python Experiments/bench_entity_scanner.py
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nlu_engine.entity_extractor import EntityExtractor, REGEX_ORDER
+
+
+def legacy_extract_regex(ex, text):
+    results, reserved = [], []
+    for name in REGEX_ORDER:
+        pat = ex.compiled.get(name)
+        if not pat:
+            continue
+        for m in pat.finditer(text):
+            start, end = m.start(), m.end()
+            if any(not (end <= s or start >= e) for s, e in reserved):
+                continue
+            reserved.append((start, end))
+            val = m.group(0).strip()
+            item = {"entity": name, "value": val, "start": start, "end": end, "source": "regex"}
+            if name == "amount":
+                item["normalized"] = ex._normalize_amount(val)
+            results.append(item)
+    return results
+
+
+def statement(lines, rng):
+    rows = []
+    for _ in range(lines):
+        rows.append(
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024 UTR{rng.randint(10**9, 10**10)} "
+            f"to a/c {rng.randint(10**9, 10**12)} IFSC HDFC0{rng.randint(100000, 999999)} "
+            f"₹{rng.randint(1, 99)},{rng.randint(100, 999)}.{rng.randint(10, 99)} balance Rs {rng.randint(1000, 99999)}"
+        )
+    return "\n".join(rows)
+
+
+def bench(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+def main(args):
+    ex = EntityExtractor(use_spacy=False)
+    rng = random.Random(0)
+    print(f"{'lines':>6} {'entities':>9} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for lines in args.lines:
+        text = statement(lines, rng)
+        new = ex.extract_regex(text)
+        assert new == legacy_extract_regex(ex, text)
+        old_ms = bench(lambda t: legacy_extract_regex(ex, t), text, args.repeat)
+        new_ms = bench(ex.extract_regex, text, args.repeat)
+        print(f"{lines:>6} {len(new):>9} {old_ms:>10.3f} {new_ms:>11.3f} {old_ms / new_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+# Experiments/bench_faq_clustering.py
+"""
+MinHash/LSH clustering of faq_suggestions at scale: synthetic paraphrase
+families (same content words, shuffled, with filler, a word dropped or
+added, random case and punctuation), clustered with
+database.faq_clustering.rebuild on a temporary database.
+
+Reports the time per stage, how many clusters were found against the true
+number of families, and purity: the share of rows whose cluster's
+majority family is their own.
+
+    python Experiments/bench_faq_clustering.py --n 1000000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import db, faq_clustering
+from database.faq_suggestions import suggestion_hash, upsert_suggestions
+
+FILLER = ["how", "do", "i", "can", "please", "my", "the", "what", "is", "to", "for", "a", "tell", "me"]
+
+
+def synthetic(n, family_size, vocab=20000, seed=7):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    cum = []
+    total = 0.0
+    for rank in range(1, vocab + 1):
+        total += 1.0 / rank
+        cum.append(total)
+    families = max(1, n // family_size)
+    bases = [rng.choices(words, cum_weights=cum, k=rng.randint(4, 7)) for _ in range(families)]
+    rows = []
+    for i in range(n):
+        fam = i % families
+        toks = list(bases[fam])
+        r = rng.random()
+        if r < 0.2 and len(toks) > 4:
+            toks.pop(rng.randrange(len(toks)))
+        elif r < 0.35:
+            toks.append(rng.choices(words, cum_weights=cum)[0])
+        toks += rng.sample(FILLER, rng.randint(1, 4))
+        rng.shuffle(toks)
+        q = " ".join(toks)
+        q = q.capitalize() if rng.random() < 0.5 else q
+        rows.append((f"{q}{rng.choice(['?', '', '??', '.'])}", fam))
+    return rows
+
+
+def main(args):
+    rows = synthetic(args.n, args.family_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(path)
+        db._create_tables(conn)
+        db.migrate(conn)
+        # through the real write path: identical normalized phrasings fold into one row
+        upsert_suggestions(conn, [(q, 0.3) for q, _ in rows])
+        conn.commit()
+        family_of = {suggestion_hash(q): fam for q, fam in rows}
+        conn.close()
+
+        t0 = time.perf_counter()
+        stats = faq_clustering.rebuild(path)
+        wall = time.perf_counter() - t0
+        with db.db_connection(path) as conn:
+            stored = conn.execute("SELECT cluster_id, question_hash FROM faq_suggestions").fetchall()
+        majority = {}
+        for (cid, _), count in Counter((c, family_of[h]) for c, h in stored).most_common():
+            majority.setdefault(cid, count)
+        sizes = Counter(c for c, _ in stored)
+        purity = sum(majority.values()) / len(stored)
+        print(f"{args.n} asked, {len(stored)} distinct suggestions, {args.n // args.family_size} true families")
+        print(" | ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in stats.items()))
+        print(f"total {wall:.1f}s · clusters {len(sizes)} · purity {purity:.3f} · "
+              f"largest {sizes.most_common(1)[0][1]}")
+
+        # incremental path: a handful of new paraphrases
+        with db.db_connection(path) as conn:
+            upsert_suggestions(conn, [(q + " today", 0.3) for q, _ in synthetic(200, args.family_size, seed=99)])
+        t0 = time.perf_counter()
+        with db.db_connection(path) as conn:
+            assigned = faq_clustering.assign_new(conn)
+        print(f"incremental: {assigned} new suggestions in {1000 * (time.perf_counter() - t0):.0f} ms")
+        db.get_pool(path).close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--family_size", type=int, default=50)
+    main(parser.parse_args())
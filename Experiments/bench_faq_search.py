@@ -0,0 +1,103 @@
+# Experiments/bench_faq_search.py
+"""
+FAQ lookup latency at scale: the old full-table substring scan vs the
+BM25 inverted index vs SQLite FTS5, plus the cost of one incremental
+admin edit.
+
+    python Experiments/bench_faq_search.py --faqs 100000 --queries 500
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import db
+from database.faq_search import BM25Index, FTS5Index
+
+TOPICS = ["savings account", "current account", "fixed deposit", "recurring deposit", "home loan",
+          "personal loan", "credit card", "debit card", "net banking", "mobile banking", "cheque book",
+          "demand draft", "upi", "neft", "rtgs", "kyc", "nominee", "locker", "atm", "pension"]
+ASKS = ["What is the {a} for {t}", "How do I change the {a} of my {t}", "Is there a {a} on {t}",
+        "Where can I see the {a} for {t}", "Can I get a {a} with {t}"]
+ATTRS = ["interest rate", "minimum balance", "annual fee", "late fee", "limit", "tenure", "penalty",
+         "statement", "pin", "branch", "processing charge", "eligibility", "documents", "tax", "insurance"]
+
+
+# stand-in for product / scheme / place names: a Zipf-distributed long tail
+VOCAB = [f"w{j}" for j in range(50000)]
+ZIPF_CUM = list(np.cumsum([1.0 / (j + 1) for j in range(len(VOCAB))]))
+
+
+def ask(rng):
+    tail = " ".join(rng.choices(VOCAB, cum_weights=ZIPF_CUM, k=2))
+    return rng.choice(ASKS).format(a=rng.choice(ATTRS), t=rng.choice(TOPICS)) + f" {tail}"
+
+
+def synth(n, rng):
+    return [(i + 1, ask(rng) + "?", f"answer {i}") for i in range(n)]
+
+
+def legacy(conn, user_text):
+    for q, a in conn.execute("SELECT question, answer FROM faqs"):
+        if q.lower() in user_text.lower():
+            return a
+    return None
+
+
+def timed(fn, queries):
+    lat = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        lat.append((time.perf_counter() - start) * 1000)
+    return np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+def main(args):
+    rng = random.Random(0)
+    rows = synth(args.faqs, rng)
+    queries = [ask(rng) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "faq.db")
+        with db.db_connection(path) as conn:
+            db._create_tables(conn)
+            conn.executemany("INSERT INTO faqs (id, question, answer) VALUES (?, ?, ?)", rows)
+
+        start = time.perf_counter()
+        bm25 = BM25Index()
+        for r in rows:
+            bm25.add(*r)
+        bm25_build = time.perf_counter() - start
+        start = time.perf_counter()
+        fts = FTS5Index(path)
+        fts_build = time.perf_counter() - start
+
+        print(f"{args.faqs} FAQs, {args.queries} queries")
+        print(f"build: bm25 {bm25_build:.2f}s, fts5 {fts_build:.2f}s")
+        print(f"{'backend':<8} {'p50 ms':>8} {'p99 ms':>8}")
+        with db.db_connection(path) as conn:
+            legacy_q = queries[: max(1, args.queries // 10)]  # the scan is slow; sample it
+            p50, p99 = timed(lambda q: legacy(conn, q), legacy_q)
+            print(f"{'legacy':<8} {p50:>8.3f} {p99:>8.3f}")
+        for name, idx in (("bm25", bm25), ("fts5", fts)):
+            p50, p99 = timed(lambda q: idx.search(q, k=5), queries)
+            print(f"{name:<8} {p50:>8.3f} {p99:>8.3f}")
+
+        start = time.perf_counter()
+        for i in range(100):
+            bm25.update(i + 1, f"What is the overdraft limit on salary account {i}?", "new")
+        print(f"incremental bm25 update: {(time.perf_counter() - start) * 10:.3f} ms/edit")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faqs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    main(parser.parse_args())
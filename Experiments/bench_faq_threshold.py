@@ -0,0 +1,120 @@
+# Experiments/bench_faq_threshold.py
+"""
+Calibrate FAQ_SIM_THRESHOLD for the semantic FAQ step, then estimate how
+many LLM calls it saves.
+
+PAIRS is a held-out set: the customer messages are not FAQ questions,
+and half of them are hard negatives that share words with the FAQ they
+are paired with but ask something else. For each threshold the script
+prints precision / recall / F1 of "similarity >= threshold means the
+same question", and picks the lowest threshold with precision >=
+--min_precision. A wrong FAQ answer is worse than an LLM call. It then
+replays chat_logs from --db and counts the fallback turns that would
+still reach the LLM with the substring match, BM25 alone, and BM25 plus
+embeddings at that threshold.
+
+    python Experiments/bench_faq_threshold.py --db bankbot.db
+    python Experiments/bench_faq_threshold.py --db bankbot.db --allow_fallback   # DistilBERT mean-pool, for comparison
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database.faq_embeddings import FAQEmbeddingIndex, TransformerEncoder, calibrate, pick_threshold, replay
+
+# (customer message, FAQ question, same question?)
+PAIRS = [
+    ("where can i find an atm close by", "ATM near me", True),
+    ("nearest cash machine", "ATM near me", True),
+    ("is there an atm around here", "ATM near me", True),
+    ("i'd like to start a new bank account", "How to open a new account", True),
+    ("steps to create an account with you", "How to open a new account", True),
+    ("how can i become a customer and get an account", "How to open a new account", True),
+    ("what's the least i must keep in my savings", "What is the minimum balance for a savings account?", True),
+    ("minimum amount to maintain in savings a/c", "What is the minimum balance for a savings account?", True),
+    ("i forgot my internet banking password", "How do I reset my net banking password?", True),
+    ("can't log in to net banking, need a new password", "How do I reset my net banking password?", True),
+    ("how much do you charge for a DD", "What are the charges for a demand draft?", True),
+    ("fee for making a demand draft", "What are the charges for a demand draft?", True),
+    ("my debit card is lost, stop it", "How to block my debit card?", True),
+    ("please freeze my atm card", "How to block my debit card?", True),
+    ("interest on an FD for one year", "What is the interest rate on a fixed deposit?", True),
+    ("how much will my fixed deposit earn", "What is the interest rate on a fixed deposit?", True),
+    ("what are your branch timings", "What are the bank's working hours?", True),
+    ("when is the branch open on saturday", "What are the bank's working hours?", True),
+    ("how do i update my phone number", "How can I change my registered mobile number?", True),
+    ("new mobile number for sms alerts", "How can I change my registered mobile number?", True),
+    # hard negatives: shared words, different question
+    ("I want to open a fixed deposit account", "How to open a new account", False),
+    ("block card near atm", "ATM near me", False),
+    ("how many eggs in a dozen", "what is egg", False),
+    ("atm withdrawal limit per day", "ATM near me", False),
+    ("close my savings account", "What is the minimum balance for a savings account?", False),
+    ("reset my debit card pin", "How do I reset my net banking password?", False),
+    ("demand draft cancellation", "What are the charges for a demand draft?", False),
+    ("unblock my debit card", "How to block my debit card?", False),
+    ("fixed deposit premature withdrawal penalty", "What is the interest rate on a fixed deposit?", False),
+    ("what is the capital of karnataka", "what is the capital of telangana", False),
+    ("full form of upi", "what is the full form of tcs", False),
+    ("working hours of customer care", "What are the bank's working hours?", False),
+    ("change my registered email", "How can I change my registered mobile number?", False),
+    ("loan interest rate", "What is the interest rate on a fixed deposit?", False),
+    ("open a current account for my shop", "What is the minimum balance for a savings account?", False),
+    ("tell me a joke", "How to open a new account", False),
+    ("what's the weather today", "ATM near me", False),
+    ("credit card annual fee", "What are the charges for a demand draft?", False),
+    ("how do i apply for a home loan", "How to open a new account", False),
+    ("transfer money to my friend", "How do I reset my net banking password?", False),
+]
+
+
+def main(args):
+    try:
+        encoder = TransformerEncoder(allow_fallback=args.allow_fallback)
+    except ImportError as e:
+        print(f"{e}; the chatbot skips the semantic step. Without it:")
+        encoder = None
+    if encoder is not None:
+        rows = calibrate(encoder, PAIRS, args.thresholds)
+        print(f"encoder: {encoder.name}, {sum(p[2] for p in PAIRS)} paraphrases / "
+              f"{sum(not p[2] for p in PAIRS)} non-paraphrases")
+        print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'f1':>6} {'neg sim p95':>11}")
+        for r in rows:
+            print(f"{r['threshold']:>9.2f} {r['precision']:>9.2f} {r['recall']:>7.2f} {r['f1']:>6.2f} "
+                  f"{r['neg_sim_p95']:>11.2f}")
+        chosen = pick_threshold(rows, args.min_precision)
+        print(f"lowest threshold with precision >= {args.min_precision}: {chosen}")
+    else:
+        chosen = None
+
+    if args.db:
+        # replay reads a copy: opening the real file through the pool switches it to WAL
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, os.path.basename(args.db))
+            shutil.copy(args.db, path)
+            index = FAQEmbeddingIndex(encoder, db_path=path) if chosen is not None else None
+            report = replay(path, [chosen] if chosen is not None else [], index)
+        if not report:
+            print("no fallback turns in chat_logs")
+            return
+        print(f"fallback turns: {report.pop('fallback_turns')}")
+        print(f"LLM calls, substring match: {report.pop('legacy_llm_calls')}")
+        print(f"LLM calls, BM25:            {report.pop('bm25_llm_calls')}")
+        for th, r in report.items():
+            print(f"LLM calls, BM25 + embeddings @ {th:.2f}: {r['llm_calls']} "
+                  f"({r['saved_vs_legacy']} fewer than substring, {r['saved_pct']:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", type=str, default=None, help="sqlite db with chat_logs + faqs to replay")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--min_precision", type=float, default=0.95)
+    parser.add_argument("--allow_fallback", action="store_true",
+                        help="use the DistilBERT mean-pool encoder if sentence-transformers is missing")
+    main(parser.parse_args())
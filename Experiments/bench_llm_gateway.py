@@ -0,0 +1,112 @@
+# Experiments/bench_llm_gateway.py
+"""
+Load test of the LLM fallback path against llm_engine/fake_server.py:
+bare calls (no deadline, no limit, no breaker, as groq_llm_response used
+to do) vs LLMGateway, through three phases — healthy, outage (every
+request fails or hangs) and recovery.
+
+    python Experiments/bench_llm_gateway.py --threads 32 --seconds 5
+    python Experiments/bench_llm_gateway.py --base_url http://127.0.0.1:8089   # external fake server
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm_engine.fake_server import FakeLLMServer
+from llm_engine.gateway import CircuitBreaker, LLMGateway, openai_http_backend
+
+PHASES = [
+    ("healthy", {"error_rate": 0.0, "hang_rate": 0.0}),
+    ("outage", {"error_rate": 0.5, "hang_rate": 0.5}),
+    ("recovery", {"error_rate": 0.0, "hang_rate": 0.0}),
+]
+
+
+def run_phase(call, threads, seconds, think):
+    latencies, sources = [], []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker():
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            try:
+                _, source = call("what is my balance")
+            except Exception:
+                source = "error"
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+                sources.append(source)
+            time.sleep(think)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": len(sources),
+        "llm": sources.count("llm"),
+        "fallback": sources.count("fallback"),
+        "error": sources.count("error"),
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else 0.0,
+    }
+
+
+def configure(base_url, **changes):
+    requests.post(base_url + "/admin/config", json=changes, timeout=5).raise_for_status()
+
+
+def main(args):
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = FakeLLMServer().start()
+        base_url = server.base_url
+    configure(base_url, latency=args.latency, hang_seconds=args.hang_seconds, token_delay=0.0)
+
+    complete, stream = openai_http_backend(base_url, "fake")
+
+    def bare(prompt):
+        return complete(prompt, None), "llm"
+
+    gateway = LLMGateway(
+        complete, stream, fallback=lambda prompt, reason: "canned",
+        max_concurrent=args.max_concurrent, deadline=args.deadline,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=args.seconds / 2), name="fake",
+    )
+    print(f"fake LLM at {base_url}, {args.threads} threads, {args.seconds}s per phase, "
+          f"latency {args.latency}s, hang {args.hang_seconds}s\n")
+    print(f"{'mode':8s} {'phase':9s} {'reqs':>6s} {'llm':>6s} {'fallbk':>6s} {'error':>6s} "
+          f"{'p50 ms':>8s} {'p99 ms':>8s}")
+    for name, call in (("bare", bare), ("gateway", gateway.complete)):
+        for phase, changes in PHASES:
+            configure(base_url, **changes)
+            r = run_phase(call, args.threads, args.seconds, args.think)
+            print(f"{name:8s} {phase:9s} {r['requests']:6d} {r['llm']:6d} {r['fallback']:6d} {r['error']:6d} "
+                  f"{r['p50_ms']:8.0f} {r['p99_ms']:8.0f}")
+    print("\ngateway:", gateway.stats())
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base_url", type=str, default=None)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--think", type=float, default=0.05, help="pause between a user's requests")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--hang_seconds", type=float, default=5.0)
+    parser.add_argument("--max_concurrent", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=2.0)
+    main(parser.parse_args())
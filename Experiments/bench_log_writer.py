@@ -0,0 +1,79 @@
+# Experiments/bench_log_writer.py
+"""
+Per-turn cost of logging a chat message: the old log_chat (own transaction
+and commit per row) vs LogWriter.submit (enqueue; batched commits on a
+background thread), from concurrent "sessions".
+
+    python Experiments/bench_log_writer.py --threads 1 8 --turns 2000
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import db
+from database.log_writer import LogWriter
+
+
+def sync_log(path, row):
+    with db.db_connection(path) as conn:
+        conn.execute("INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) "
+                     "VALUES (?, ?, ?, ?, ?)", row)
+
+
+def run(log, threads, turns):
+    latencies = []
+    lock = threading.Lock()
+
+    def session(tid):
+        mine = []
+        for i in range(turns // threads):
+            t0 = time.perf_counter()
+            log(("2025-01-01 10:00:00", str(1000 + tid), f"question {i}", "faq", 0.42))
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=session, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    wall = time.perf_counter() - start
+    lat = np.array(latencies) * 1e6
+    return np.percentile(lat, 50), np.percentile(lat, 99), len(lat) / wall
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(path)
+        db._create_tables(conn)
+        conn.commit()
+        conn.close()
+        print(f"{'mode':6s} {'threads':>7s} {'p50 us':>9s} {'p99 us':>9s} {'turns/s':>9s}")
+        for threads in args.threads:
+            p50, p99, rate = run(lambda row: sync_log(path, row), threads, args.turns)
+            print(f"{'sync':6s} {threads:7d} {p50:9.0f} {p99:9.0f} {rate:9.0f}")
+            writer = LogWriter(path, synchronous=False).start()
+            p50, p99, rate = run(lambda row: writer.submit("chat_logs", row), threads, args.turns)
+            writer.close()
+            ws = writer.stats()
+            print(f"{'async':6s} {threads:7d} {p50:9.0f} {p99:9.0f} {rate:9.0f}   "
+                  f"({ws['batches']} batches, flush p99 {ws['flush_ms_p99']:.1f} ms, dropped {ws['dropped']})")
+        db.get_pool(path).close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--turns", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+# Experiments/bench_transaction_history.py
+"""
+Transaction history render cost for a busy account: the old path (fetch
+the whole history, total and filter it in Python) against
+get_transaction_totals plus one keyset page from get_transaction_page,
+for the first page and for a page deep in the history.
+
+    python Experiments/bench_transaction_history.py --n 500000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import bank_crud, db
+
+
+def populate(n):
+    rng = random.Random(5)
+    base = datetime(2024, 1, 1)
+    accounts = [str(1000 + i) for i in range(50)]
+    rows = []
+    for i in range(n):
+        # half of all traffic touches the busy account 1000
+        other = rng.choice(accounts[1:])
+        src, dst = ("1000", other) if rng.random() < 0.25 else (other, "1000") if rng.random() < 0.33 else \
+            (other, rng.choice(accounts[1:]))
+        rows.append((src, dst, rng.randint(1, 5000), (base + timedelta(seconds=30 * i)).isoformat()))
+    with db.db_connection() as conn:
+        conn.executemany("INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+                         rows)
+        conn.execute("ANALYZE")
+
+
+def old_render(account, start, end):
+    with db.db_connection() as conn:
+        data = conn.execute(
+            "SELECT from_account, to_account, amount, timestamp FROM transactions "
+            "WHERE from_account = ? OR to_account = ? ORDER BY timestamp DESC", (account, account)
+        ).fetchall()
+    sum(r[2] for r in data if r[1] == account)
+    sum(r[2] for r in data if r[0] == account)
+    rows = [r for r in data if start <= datetime.fromisoformat(r[3]).date() <= end]
+    return rows[:bank_crud.HISTORY_PAGE_SIZE]
+
+
+def new_render(account, start, end, before=None):
+    bank_crud.get_transaction_totals(account)
+    bank_crud.get_transaction_totals(account, start, end)
+    return bank_crud.get_transaction_page(account, start, end, before=before)
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return 1000 * best
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.init_db()
+        populate(args.n)
+        start, end = date(2024, 1, 1), date(2030, 1, 1)
+        totals = bank_crud.get_transaction_totals("1000")
+        print(f"{args.n} transactions, {totals['count']} on the busy account")
+        print(f"old full history + Python filter  {timed(old_render, '1000', start, end):8.1f} ms")
+        print(f"totals + first keyset page        {timed(new_render, '1000', start, end):8.1f} ms")
+        cursor = None
+        for _ in range(args.depth):
+            _, cursor = bank_crud.get_transaction_page("1000", start, end, before=cursor, limit=100)
+        print(f"totals + page {args.depth * 4} pages deep        {timed(new_render, '1000', start, end, cursor):8.1f} ms")
+        db.get_pool().close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=500_000)
+    parser.add_argument("--depth", type=int, default=100, help="pages of 100 to skip for the deep-page timing")
+    main(parser.parse_args())
@@ -0,0 +1,281 @@
+# database/analytics.py
+"""
+Aggregates for the Admin Panel dashboard and analytics tabs.
+
+Each chart is one SQL aggregate over the rollup tables kept by
+database/chat_rollups.py, restricted to a date window:
+
+    summary          totals, active users, distinct intents, last activity
+    intent_counts    queries per intent
+    daily_counts     queries per day
+    hourly_counts    queries per hour
+    daily_intents    queries per (day, intent)
+    confidence_mix   Low (<0.5) / Medium (0.5-0.8) / High (>0.8) counts
+    recent_logs      the newest raw rows, for the logs table and CSV export
+
+The rollups hold one row per day (or hour) and intent, so these read the
+same few thousand rows whether chat_logs holds 1k or 50M turns. Only
+recent_logs touches chat_logs, through the covering timestamp index and a
+LIMIT.
+
+Windows are [start, end] calendar days: `key >= start AND key < end + 1
+day`, where key is the rollup's day or hour, or the raw timestamp.
+
+query() runs these through a process-wide cache. An entry lives for
+BANKBOT_ANALYTICS_TTL seconds or until invalidate() is called. The log
+writer calls invalidate() after every batch that adds chat_logs rows, so
+a render between writes costs a dict lookup and the next one after a
+write sees it.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from database import db
+
+ANALYTICS_TTL = float(os.getenv("BANKBOT_ANALYTICS_TTL", "30"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("BANKBOT_ANALYTICS_CACHE_SIZE", "256"))
+
+CONFIDENCE_BUCKETS = ("Low (<0.5)", "Medium (0.5–0.8)", "High (>0.8)")
+
+DateLike = Optional[Any]
+
+
+def _day(value: DateLike) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+
+def _window(start: DateLike = None, end: DateLike = None, intent: Optional[str] = None,
+            column: str = "timestamp") -> Tuple[str, list]:
+    """WHERE clause and params for an inclusive [start, end] day range and an optional intent."""
+    clauses, params = [], []
+    start, end = _day(start), _day(end)
+    if start:
+        clauses.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        # '2025-01-04 18:00:00' and the hour key '2025-01-04 18' both sort below '2025-01-05'
+        clauses.append(f"{column} < ?")
+        params.append((date.fromisoformat(end) + timedelta(days=1)).isoformat())
+    if intent and intent != "All":
+        clauses.append("intent = ?")
+        params.append(intent)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _and(where: str, clause: str) -> str:
+    return where + (" AND " if where else " WHERE ") + clause
+
+
+# ---------- aggregates (rollup tables) ----------
+def summary(conn, start: DateLike = None, end: DateLike = None) -> Dict[str, Any]:
+    where, params = _window(start, end, column="day")
+    total, intents, conf_n, conf_sum, first, last = conn.execute(
+        "SELECT COALESCE(SUM(queries), 0), COUNT(DISTINCT NULLIF(intent, '')), SUM(conf_n), SUM(conf_sum), "
+        f"MIN(first_at), MAX(last_at) FROM chat_rollup_daily{where}",
+        params,
+    ).fetchone()
+    if where:
+        users = conn.execute(
+            "SELECT COUNT(DISTINCT account_no) FROM chat_rollup_account_days" + _and(where, "account_no != ''"),
+            params,
+        ).fetchone()[0]
+    else:
+        users = conn.execute("SELECT COUNT(*) FROM chat_rollup_accounts WHERE account_no != ''").fetchone()[0]
+    return {
+        "total": total,
+        "active_users": users,
+        "unique_intents": intents,
+        "avg_confidence": conf_sum / conf_n if conf_n else None,
+        "first_activity": first,
+        "last_activity": last,
+    }
+
+
+def intent_names(conn) -> List[str]:
+    return [r[0] for r in conn.execute(
+        "SELECT DISTINCT intent FROM chat_rollup_daily WHERE intent != '' ORDER BY intent"
+    )]
+
+
+def intent_counts(conn, start: DateLike = None, end: DateLike = None, intent: Optional[str] = None,
+                  limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    where, params = _window(start, end, intent, column="day")
+    sql = ("SELECT intent, SUM(queries) AS n FROM chat_rollup_daily" + _and(where, "intent != ''")
+           + " GROUP BY intent ORDER BY n DESC, intent")
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return conn.execute(sql, params).fetchall()
+
+
+def daily_counts(conn, start: DateLike = None, end: DateLike = None,
+                 intent: Optional[str] = None) -> List[Tuple[str, int]]:
+    where, params = _window(start, end, intent, column="day")
+    return conn.execute(
+        f"SELECT day, SUM(queries) FROM chat_rollup_daily{where} GROUP BY day ORDER BY day", params
+    ).fetchall()
+
+
+def hourly_counts(conn, start: DateLike = None, end: DateLike = None,
+                  intent: Optional[str] = None) -> List[Tuple[str, int]]:
+    where, params = _window(start, end, intent, column="hour")
+    return conn.execute(
+        f"SELECT hour || ':00', SUM(queries) FROM chat_rollup_hourly{where} GROUP BY hour ORDER BY hour", params
+    ).fetchall()
+
+
+def daily_intents(conn, start: DateLike = None, end: DateLike = None) -> List[Tuple[str, str, int]]:
+    where, params = _window(start, end, column="day")
+    return conn.execute(
+        "SELECT day, intent, queries FROM chat_rollup_daily" + _and(where, "intent != ''") + " ORDER BY day, intent",
+        params,
+    ).fetchall()
+
+
+def confidence_mix(conn, start: DateLike = None, end: DateLike = None,
+                   intent: Optional[str] = None) -> Dict[str, int]:
+    where, params = _window(start, end, intent, column="day")
+    low, medium, high = conn.execute(
+        f"SELECT COALESCE(SUM(low), 0), COALESCE(SUM(medium), 0), COALESCE(SUM(high), 0) FROM chat_rollup_daily{where}",
+        params,
+    ).fetchone()
+    return dict(zip(CONFIDENCE_BUCKETS, (low, medium, high)))
+
+
+# ---------- raw rows ----------
+def recent_logs(conn, start: DateLike = None, end: DateLike = None, intent: Optional[str] = None,
+                limit: int = 1000) -> List[tuple]:
+    where, params = _window(start, end, intent)
+    params.append(int(limit))
+    return conn.execute(
+        "SELECT id, timestamp, account_no, user_query, intent, confidence "
+        f"FROM chat_logs{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+        params,
+    ).fetchall()
+
+
+RECENT_LOG_COLUMNS = ["id", "timestamp", "account_no", "user_query", "intent", "confidence"]
+
+QUERIES: Dict[str, Callable] = {
+    "summary": summary,
+    "intent_names": intent_names,
+    "intent_counts": intent_counts,
+    "daily_counts": daily_counts,
+    "hourly_counts": hourly_counts,
+    "daily_intents": daily_intents,
+    "confidence_mix": confidence_mix,
+    "recent_logs": recent_logs,
+}
+
+
+# ---------- cache ----------
+class AnalyticsCache:
+    """
+    TTL cache for aggregate results, keyed on (query, params).
+
+    invalidate() bumps a generation counter instead of clearing the dict,
+    so a query that was already running when a write landed cannot store
+    its (now stale) result as current.
+    """
+
+    def __init__(self, ttl: float = ANALYTICS_TTL, max_entries: int = ANALYTICS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._query_ms = deque(maxlen=500)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.generation and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            generation = self.generation
+        start = time.perf_counter()
+        value = compute()
+        elapsed = 1000 * (time.perf_counter() - start)
+        with self._lock:
+            self._query_ms.append(elapsed)
+            if generation == self.generation:
+                self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            query_ms = np.array(self._query_ms) if self._query_ms else None
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "query_ms_p50": float(np.percentile(query_ms, 50)) if query_ms is not None else 0.0,
+                "query_ms_p99": float(np.percentile(query_ms, 99)) if query_ms is not None else 0.0,
+            }
+
+
+_cache: Optional[AnalyticsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analytics_cache() -> AnalyticsCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalyticsCache()
+    return _cache
+
+
+def invalidate():
+    """Called after chat_logs changes; cached aggregates are recomputed on next use."""
+    get_analytics_cache().invalidate()
+
+
+def query(name: str, *args, db_path: Optional[str] = None, **kwargs) -> Any:
+    """Run QUERIES[name] with the given filters, through the cache."""
+    fn = QUERIES[name]
+    args = tuple(_day(a) if isinstance(a, (date, datetime)) else a for a in args)
+    kwargs = {k: _day(v) if isinstance(v, (date, datetime)) else v for k, v in kwargs.items()}
+    key = (db_path, name, args, tuple(sorted(kwargs.items())))
+
+    def compute():
+        with db.db_connection(db_path) as conn:
+            return fn(conn, *args, **kwargs)
+
+    return get_analytics_cache().get(key, compute)
@@ -1,311 +1,378 @@
-from database.db import get_conn
-from database.security import hash_password, verify_password
-from datetime import datetime
+from database import transfers
+from database.db import db_connection
+from database.security import hash_password, verify_and_rehash, verify_password
+from datetime import datetime, timedelta
 
 def create_account(name, acc_no, acc_type, balance, password):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("INSERT OR IGNORE INTO users(name) VALUES (?)", (name,))
+    # hash before taking the connection: bcrypt is slow and would hold the write lock
     pwd_hash = hash_password(password)
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("INSERT OR IGNORE INTO users(name) VALUES (?)", (name,))
 
-    cur.execute("""
-    INSERT INTO accounts(account_number, user_name, account_type, balance, password_hash)
-    VALUES (?, ?, ?, ?, ?)
-    """, (acc_no, name, acc_type, balance, pwd_hash))
+        cur.execute("""
+        INSERT INTO accounts(account_number, user_name, account_type, balance, password_hash)
+        VALUES (?, ?, ?, ?, ?)
+        """, (acc_no, name, acc_type, balance, pwd_hash))
 
-    conn.commit()
-    conn.close()
 
 def get_account(acc_no):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    SELECT account_number, user_name, account_type, balance, password_hash
-    FROM accounts WHERE account_number=?
-    """, (acc_no,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+        SELECT account_number, user_name, account_type, balance, password_hash
+        FROM accounts WHERE account_number=?
+        """, (acc_no,))
+        row = cur.fetchone()
+        return row
+
+def authenticate(acc_no, password):
+    """Account row if the password matches, else None. Upgrades the stored hash when its bcrypt cost is outdated."""
+    acc = get_account(acc_no)
+    if not acc:
+        return None
+    ok, new_hash = verify_and_rehash(password, acc[4])
+    if not ok:
+        return None
+    if new_hash is not None:
+        with db_connection() as conn:
+            # only replace the hash we verified; a concurrent password change wins
+            conn.execute(
+                "UPDATE accounts SET password_hash = ? WHERE account_number = ? AND password_hash = ?",
+                (new_hash, acc_no, acc[4]),
+            )
+        acc = acc[:4] + (new_hash,)
+    return acc
 
 def list_accounts():
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT account_number, user_name FROM accounts")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def transfer_money(from_acc, to_acc, amount, password):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("SELECT balance, password_hash FROM accounts WHERE account_number=?", (from_acc,))
-    row = cur.fetchone()
-    if not row:
-        return "❌ Invalid sender account"
-
-    balance, pwd_hash = row
-    if not verify_password(password, pwd_hash):
-        return "❌ Incorrect password"
-
-    if balance < amount:
-        return "❌ Insufficient balance"
-
-    # Transaction (ACID)
-    cur.execute("UPDATE accounts SET balance = balance - ? WHERE account_number=?", (amount, from_acc))
-    cur.execute("UPDATE accounts SET balance = balance + ? WHERE account_number=?", (amount, to_acc))
-
-    cur.execute("""
-    INSERT INTO transactions(from_account, to_account, amount, timestamp)
-    VALUES (?, ?, ?, ?)
-    """, (from_acc, to_acc, amount, datetime.now().isoformat()))
-
-    conn.commit()
-    conn.close()
-    return "✅ Transfer Successful"
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT account_number, user_name FROM accounts")
+        rows = cur.fetchall()
+        return rows
 
-def get_transaction_history(account_no):
-    conn = get_conn()
-    cur = conn.cursor()
+def transfer_money(from_acc, to_acc, amount, password, idempotency_key=None):
+    # guarded debit under BEGIN IMMEDIATE with busy retries; see database/transfers.py
+    return transfers.transfer(from_acc, to_acc, amount, password, idempotency_key).message
 
-    cur.execute("""
-        SELECT from_account, to_account, amount, timestamp
-        FROM transactions
-        WHERE from_account = ? OR to_account = ?
-        ORDER BY timestamp DESC
-    """, (account_no, account_no))
+def transfer_batch(from_acc, legs, password, idempotency_key=None):
+    # payroll-style batches: one password check, chunked executemany; one TransferResult per leg
+    return transfers.transfer_batch(from_acc, legs, password, idempotency_key)
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+def get_transaction_history(account_no):
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT from_account, to_account, amount, timestamp
+            FROM transactions
+            WHERE from_account = ? OR to_account = ?
+            ORDER BY timestamp DESC
+        """, (account_no, account_no))
+
+        rows = cur.fetchall()
+        return rows
+
+
+HISTORY_PAGE_SIZE = 25
+
+_HISTORY_COLUMNS = "id, from_account, to_account, amount, timestamp"
+
+
+def _history_filters(start_date=None, end_date=None, before=None):
+    # inclusive calendar days; ISO timestamps sort as text, so end becomes "< next day"
+    clauses, params = [], []
+    if start_date:
+        clauses.append("timestamp >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        clauses.append("timestamp < ?")
+        params.append((end_date + timedelta(days=1)).isoformat())
+    if before:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    return "".join(" AND " + c for c in clauses), params
+
+
+def get_transaction_page(account_no, start_date=None, end_date=None, direction="All",
+                         before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of an account's history, newest first.
+
+    Returns (rows, next_cursor). Rows are (id, from_account, to_account,
+    amount, timestamp); pass next_cursor back as `before` for the following
+    page, None means this was the last one. direction is "All", "Debit" or
+    "Credit". A transfer to oneself is listed once, as a debit.
+    """
+    extra, params = _history_filters(start_date, end_date, before)
+    branches, args = [], []
+    if direction in ("All", "Debit"):
+        branches.append(f"""
+            SELECT * FROM (
+                SELECT {_HISTORY_COLUMNS} FROM transactions
+                WHERE from_account = ?{extra}
+                ORDER BY timestamp DESC, id DESC LIMIT ?
+            )""")
+        args += [account_no, *params, limit + 1]
+    if direction in ("All", "Credit"):
+        branches.append(f"""
+            SELECT * FROM (
+                SELECT {_HISTORY_COLUMNS} FROM transactions
+                WHERE to_account = ? AND from_account IS NOT ?{extra}
+                ORDER BY timestamp DESC, id DESC LIMIT ?
+            )""")
+        args += [account_no, account_no, *params, limit + 1]
+    if not branches:
+        return [], None
+
+    with db_connection() as conn:
+        rows = conn.execute(
+            " UNION ALL ".join(branches) + " ORDER BY timestamp DESC, id DESC LIMIT ?",
+            args + [limit + 1],
+        ).fetchall()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1][4], rows[-1][0])
+    return rows, None
+
+
+def iter_transactions(account_no, start_date=None, end_date=None, direction="All", page_size=1000):
+    """Every matching row, newest first, fetched a page at a time."""
+    cursor = None
+    while True:
+        rows, cursor = get_transaction_page(account_no, start_date, end_date, direction, cursor, page_size)
+        yield from rows
+        if cursor is None:
+            return
+
+
+def get_transaction_totals(account_no, start_date=None, end_date=None):
+    """Count and sum of debits and credits in the window, computed by SQLite."""
+    extra, params = _history_filters(start_date, end_date)
+    with db_connection() as conn:
+        debit_n, debit = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions WHERE from_account = ?{extra}",
+            [account_no, *params],
+        ).fetchone()
+        credit_n, credit = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions "
+            f"WHERE to_account = ? AND from_account IS NOT ?{extra}",
+            [account_no, account_no, *params],
+        ).fetchone()
+    return {
+        "count": debit_n + credit_n,
+        "debit_count": debit_n,
+        "debit": debit,
+        "credit_count": credit_n,
+        "credit": credit,
+    }
 
 
 from datetime import datetime
 
 
 def add_card(account_no, card_no, holder, card_type, category, exp_month, exp_year):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO cards (
-            account_number, card_number, holder_name,
-            card_type, card_category,
-            expiry_month, expiry_year,
-            cvv_masked, status, created_at
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, '***', 'ACTIVE', ?)
-    """, (
-        account_no, card_no, holder,
-        card_type, category,
-        exp_month, exp_year,
-        datetime.now().isoformat()
-    ))
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("""
+            INSERT INTO cards (
+                account_number, card_number, holder_name,
+                card_type, card_category,
+                expiry_month, expiry_year,
+                cvv_masked, status, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, '***', 'ACTIVE', ?)
+        """, (
+            account_no, card_no, holder,
+            card_type, category,
+            exp_month, exp_year,
+            datetime.now().isoformat()
+        ))
 
-    conn.commit()
-    conn.close()
 
 
 def get_cards(account_no):
-    conn = get_conn()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        SELECT
-            card_number,
-            holder_name,
-            card_type,
-            card_category,
-            expiry_month,
-            expiry_year,
-            cvv_masked,
-            status
-        FROM cards
-        WHERE account_number = ?
-    """, (account_no,))
+        cur.execute("""
+            SELECT
+                card_number,
+                holder_name,
+                card_type,
+                card_category,
+                expiry_month,
+                expiry_year,
+                cvv_masked,
+                status
+            FROM cards
+            WHERE account_number = ?
+        """, (account_no,))
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+        rows = cur.fetchall()
+        return rows
 
 
 
 
 def block_cards(account_no):
-    conn = get_conn()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ?
-    """, (account_no,))
+        cur.execute("""
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ?
+        """, (account_no,))
 
-    conn.commit()
-    conn.close()
 
 def block_all_cards(account_no):
-    conn = get_conn()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ?
-    """, (account_no,))
+        cur.execute("""
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ?
+        """, (account_no,))
 
-    conn.commit()
-    conn.close()
 
 
 def block_card_by_number(account_no, last6):
-    conn = get_conn()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ?
-        AND substr(card_number, -6) = ?
-    """, (account_no, last6))
+        cur.execute("""
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ?
+            AND substr(card_number, -6) = ?
+        """, (account_no, last6))
 
-    conn.commit()
-    conn.close()
 
 def block_card_by_last4(account_no, last4):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT card_number FROM cards
-        WHERE account_number = ?
-          AND status = 'ACTIVE'
-          AND substr(card_number, -4) = ?
-        """,
-        (account_no, last4)
-    )
-    card = cur.fetchone()
-
-    if not card:
-        conn.close()
-        return "❌ No active card found with those last 4 digits."
-
-    cur.execute(
-        """
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ? AND card_number = ?
-        """,
-        (account_no, card[0])
-    )
-
-    conn.commit()
-    conn.close()
-
-    return f"🚨 Card ending with **{last4}** has been blocked."
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            SELECT card_number FROM cards
+            WHERE account_number = ?
+              AND status = 'ACTIVE'
+              AND substr(card_number, -4) = ?
+            """,
+            (account_no, last4)
+        )
+        card = cur.fetchone()
+
+        if not card:
+            return "❌ No active card found with those last 4 digits."
+
+        cur.execute(
+            """
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ? AND card_number = ?
+            """,
+            (account_no, card[0])
+        )
+
+
+        return f"🚨 Card ending with **{last4}** has been blocked."
 
 def block_cards_by_category(account_no, category):
-    conn = get_conn()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ?
-        AND card_category = ?
-    """, (account_no, category))
+        cur.execute("""
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ?
+            AND card_category = ?
+        """, (account_no, category))
 
-    conn.commit()
-    conn.close()
 
 def unblock_card_by_last6(account_no, last6_digits, password):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify account password
-    cur.execute(
-        "SELECT password_hash FROM accounts WHERE account_number = ?",
-        (account_no,)
-    )
-    row = cur.fetchone()
+    # Verify account password; bcrypt runs without a pooled connection held
+    with db_connection() as conn:
+        row = conn.execute(
+            "SELECT password_hash FROM accounts WHERE account_number = ?",
+            (account_no,)
+        ).fetchone()
     if not row or not verify_password(password, row[0]):
-        conn.close()
         return "❌ Incorrect password. Unblock failed."
 
-    # Find BLOCKED card matching last 6 digits 
-    cur.execute(
-        """
-        SELECT card_number FROM cards
-        WHERE account_number = ?
-          AND status = 'BLOCKED'
-          AND substr(card_number, -6) = ?
-        """,
-        (account_no, last6_digits)
-    )
-    card = cur.fetchone()
-
-    if not card:
-        conn.close()
-        return "❌ No blocked card found with those last 6 digits."
-
-    # Unblock card
-    cur.execute(
-        """
-        UPDATE cards
-        SET status = 'ACTIVE'
-        WHERE account_number = ? AND card_number = ?
-        """,
-        (account_no, card[0])
-    )
-
-    conn.commit()
-    conn.close()
-
-    return f"✅ Card ending with **{last6_digits}** has been successfully unblocked."
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Find BLOCKED card matching last 6 digits 
+        cur.execute(
+            """
+            SELECT card_number FROM cards
+            WHERE account_number = ?
+              AND status = 'BLOCKED'
+              AND substr(card_number, -6) = ?
+            """,
+            (account_no, last6_digits)
+        )
+        card = cur.fetchone()
+
+        if not card:
+            return "❌ No blocked card found with those last 6 digits."
+
+        # Unblock card
+        cur.execute(
+            """
+            UPDATE cards
+            SET status = 'ACTIVE'
+            WHERE account_number = ? AND card_number = ?
+            """,
+            (account_no, card[0])
+        )
+
+
+        return f"✅ Card ending with **{last6_digits}** has been successfully unblocked."
 
 def block_card_by_last6_secure(account_no, last6, password):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Verify password
-    cur.execute(
-        "SELECT password_hash FROM accounts WHERE account_number = ?",
-        (account_no,)
-    )
-    row = cur.fetchone()
+    # Verify password; bcrypt runs without a pooled connection held
+    with db_connection() as conn:
+        row = conn.execute(
+            "SELECT password_hash FROM accounts WHERE account_number = ?",
+            (account_no,)
+        ).fetchone()
     if not row or not verify_password(password, row[0]):
-        conn.close()
         return "❌ Incorrect password. Card block failed."
 
-    # Find active card by last 6 digits
-    cur.execute(
-        """
-        SELECT card_number FROM cards
-        WHERE account_number = ?
-          AND status = 'ACTIVE'
-          AND substr(card_number, -6) = ?
-        """,
-        (account_no, last6)
-    )
-    card = cur.fetchone()
-
-    if not card:
-        conn.close()
-        return "❌ No active card found with those last 6 digits."
-
-    # Block card
-    cur.execute(
-        """
-        UPDATE cards
-        SET status = 'BLOCKED'
-        WHERE account_number = ? AND card_number = ?
-        """,
-        (account_no, card[0])
-    )
-
-    conn.commit()
-    conn.close()
-
-    return f"🚨 Card ending with **{last6}** has been blocked successfully."
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Find active card by last 6 digits
+        cur.execute(
+            """
+            SELECT card_number FROM cards
+            WHERE account_number = ?
+              AND status = 'ACTIVE'
+              AND substr(card_number, -6) = ?
+            """,
+            (account_no, last6)
+        )
+        card = cur.fetchone()
+
+        if not card:
+            return "❌ No active card found with those last 6 digits."
+
+        # Block card
+        cur.execute(
+            """
+            UPDATE cards
+            SET status = 'BLOCKED'
+            WHERE account_number = ? AND card_number = ?
+            """,
+            (account_no, card[0])
+        )
+
+
+        return f"🚨 Card ending with **{last6}** has been blocked successfully."
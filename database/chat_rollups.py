@@ -0,0 +1,200 @@
+# database/chat_rollups.py
+"""
+Rollup tables over chat_logs for the admin analytics.
+
+    chat_rollup_daily         (day, intent)       queries, confidence count / sum,
+                                                  Low / Medium / High buckets,
+                                                  first and last timestamp
+    chat_rollup_hourly        (hour, intent)      the same per hour
+    chat_rollup_account_days  (day, account_no)   queries
+    chat_rollup_accounts      (account_no)        queries, first and last timestamp
+
+An AFTER INSERT trigger on chat_logs upserts one row in each, in the same
+transaction as the insert. That covers the log writer and every other
+write path, and a rollup can never run ahead of or behind its source.
+The rollups grow with days x intents and days x active accounts, not
+with turns, so database.analytics reads a few thousand rows whether
+chat_logs holds 1k or 50M. chat_rollup_accounts answers the all-time
+active-user count without scanning every (day, account) pair.
+
+NULL intents and accounts are stored as '' because key columns cannot be
+NULL; readers map them back.
+
+backfill() rebuilds every rollup from chat_logs in one pass. Migration 8
+runs it once. Run it again after bulk edits or deletes on chat_logs, which
+the trigger does not follow:
+
+    python -m database.chat_rollups --backfill
+    python -m database.chat_rollups --check
+"""
+import time
+import argparse
+from typing import Dict
+
+from database import db
+
+ROLLUP_TABLES = ("chat_rollup_daily", "chat_rollup_hourly", "chat_rollup_account_days", "chat_rollup_accounts")
+
+_BUCKET_COLUMNS = """
+    queries INTEGER NOT NULL,
+    conf_n INTEGER NOT NULL,
+    conf_sum REAL NOT NULL,
+    low INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    first_at TEXT,
+    last_at TEXT
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS chat_rollup_daily (
+        day TEXT NOT NULL,
+        intent TEXT NOT NULL,
+        {_BUCKET_COLUMNS},
+        PRIMARY KEY (day, intent)
+    ) WITHOUT ROWID
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS chat_rollup_hourly (
+        hour TEXT NOT NULL,
+        intent TEXT NOT NULL,
+        {_BUCKET_COLUMNS},
+        PRIMARY KEY (hour, intent)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_rollup_account_days (
+        day TEXT NOT NULL,
+        account_no TEXT NOT NULL,
+        queries INTEGER NOT NULL,
+        PRIMARY KEY (day, account_no)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_rollup_accounts (
+        account_no TEXT PRIMARY KEY,
+        queries INTEGER NOT NULL,
+        first_at TEXT,
+        last_at TEXT
+    ) WITHOUT ROWID
+    """,
+]
+
+# bucket edges match the old pandas confidence_bucket(): <0.5, 0.5-0.8 inclusive, >0.8
+_BUCKET_VALUES = """
+    1, {c} IS NOT NULL, COALESCE({c}, 0),
+    COALESCE({c} < 0.5, 0), COALESCE({c} >= 0.5 AND {c} <= 0.8, 0), COALESCE({c} > 0.8, 0),
+    {ts}, {ts}
+"""
+_BUCKET_SUMS = """
+    COUNT(*), COUNT(confidence), COALESCE(SUM(confidence), 0),
+    COALESCE(SUM(confidence < 0.5), 0), COALESCE(SUM(confidence >= 0.5 AND confidence <= 0.8), 0),
+    COALESCE(SUM(confidence > 0.8), 0),
+    MIN(timestamp), MAX(timestamp)
+"""
+_BUCKET_MERGE = """
+    queries = queries + excluded.queries,
+    conf_n = conf_n + excluded.conf_n,
+    conf_sum = conf_sum + excluded.conf_sum,
+    low = low + excluded.low,
+    medium = medium + excluded.medium,
+    high = high + excluded.high,
+    first_at = MIN(COALESCE(first_at, excluded.first_at), COALESCE(excluded.first_at, first_at)),
+    last_at = MAX(COALESCE(last_at, excluded.last_at), COALESCE(excluded.last_at, last_at))
+"""
+_COLUMNS = "queries, conf_n, conf_sum, low, medium, high, first_at, last_at"
+
+_DAY = "COALESCE(substr({t}, 1, 10), '')"
+_HOUR = "COALESCE(substr({t}, 1, 13), '')"
+
+TRIGGER_SQL = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_chat_logs_rollup AFTER INSERT ON chat_logs
+    BEGIN
+        INSERT INTO chat_rollup_daily (day, intent, {_COLUMNS})
+        VALUES ({_DAY.format(t="NEW.timestamp")}, COALESCE(NEW.intent, ''),
+                {_BUCKET_VALUES.format(c="NEW.confidence", ts="NEW.timestamp")})
+        ON CONFLICT (day, intent) DO UPDATE SET {_BUCKET_MERGE};
+
+        INSERT INTO chat_rollup_hourly (hour, intent, {_COLUMNS})
+        VALUES ({_HOUR.format(t="NEW.timestamp")}, COALESCE(NEW.intent, ''),
+                {_BUCKET_VALUES.format(c="NEW.confidence", ts="NEW.timestamp")})
+        ON CONFLICT (hour, intent) DO UPDATE SET {_BUCKET_MERGE};
+
+        INSERT INTO chat_rollup_account_days (day, account_no, queries)
+        VALUES ({_DAY.format(t="NEW.timestamp")}, COALESCE(NEW.account_no, ''), 1)
+        ON CONFLICT (day, account_no) DO UPDATE SET queries = queries + 1;
+
+        INSERT INTO chat_rollup_accounts (account_no, queries, first_at, last_at)
+        VALUES (COALESCE(NEW.account_no, ''), 1, NEW.timestamp, NEW.timestamp)
+        ON CONFLICT (account_no) DO UPDATE SET
+            queries = queries + 1,
+            first_at = MIN(COALESCE(first_at, excluded.first_at), COALESCE(excluded.first_at, first_at)),
+            last_at = MAX(COALESCE(last_at, excluded.last_at), COALESCE(excluded.last_at, last_at));
+    END
+"""
+
+BACKFILL_SQL = [
+    f"""
+    INSERT INTO chat_rollup_daily (day, intent, {_COLUMNS})
+    SELECT {_DAY.format(t="timestamp")} AS d, COALESCE(intent, '') AS i, {_BUCKET_SUMS}
+    FROM chat_logs GROUP BY d, i
+    """,
+    f"""
+    INSERT INTO chat_rollup_hourly (hour, intent, {_COLUMNS})
+    SELECT {_HOUR.format(t="timestamp")} AS h, COALESCE(intent, '') AS i, {_BUCKET_SUMS}
+    FROM chat_logs GROUP BY h, i
+    """,
+    f"""
+    INSERT INTO chat_rollup_account_days (day, account_no, queries)
+    SELECT {_DAY.format(t="timestamp")} AS d, COALESCE(account_no, '') AS a, COUNT(*)
+    FROM chat_logs GROUP BY d, a
+    """,
+    """
+    INSERT INTO chat_rollup_accounts (account_no, queries, first_at, last_at)
+    SELECT COALESCE(account_no, '') AS a, COUNT(*), MIN(timestamp), MAX(timestamp)
+    FROM chat_logs GROUP BY a
+    """,
+]
+
+
+def create(conn):
+    for sql in CREATE_SQL:
+        conn.execute(sql)
+    conn.execute(TRIGGER_SQL)
+
+
+def backfill(conn) -> Dict[str, int]:
+    """Recompute every rollup from chat_logs; run inside a write transaction."""
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    for sql in BACKFILL_SQL:
+        conn.execute(sql)
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUP_TABLES}
+
+
+def check(conn) -> Dict[str, int]:
+    """Turn counts per source; all equal when the rollups are in step with chat_logs."""
+    return {
+        "chat_logs": conn.execute("SELECT COUNT(*) FROM chat_logs").fetchone()[0],
+        **{table: conn.execute(f"SELECT COALESCE(SUM(queries), 0) FROM {table}").fetchone()[0]
+           for table in ROLLUP_TABLES},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill", action="store_true", help="rebuild the rollups from chat_logs")
+    parser.add_argument("--check", action="store_true", help="compare rollup totals with chat_logs")
+    args = parser.parse_args()
+    db.init_db()
+    if args.backfill:
+        t0 = time.perf_counter()
+        with db.db_connection() as conn:
+            # the write lock up front: no chat_logs insert can slip between DELETE and re-aggregate
+            conn.execute("BEGIN IMMEDIATE")
+            rows = backfill(conn)
+        print(f"backfilled {rows} in {time.perf_counter() - t0:.1f}s")
+    if args.check:
+        with db.db_connection() as conn:
+            print(check(conn))
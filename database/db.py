@@ -1,14 +1,129 @@
+import os
+import queue
 import sqlite3
-import bcrypt
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
-DB_NAME = "bankbot.db"
+DB_NAME = os.getenv("BANKBOT_DB", "bankbot.db")
+POOL_SIZE = int(os.getenv("BANKBOT_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("BANKBOT_DB_POOL_TIMEOUT", "30"))
+
+# applied once to every new connection
+PRAGMAS = [
+    ("journal_mode", "WAL"),       # readers no longer block on chat-log writes
+    ("synchronous", "NORMAL"),     # safe with WAL, one fsync per checkpoint instead of per commit
+    ("cache_size", "-20000"),      # ~20 MB page cache per connection
+    ("mmap_size", "268435456"),    # 256 MB memory-mapped reads
+    ("busy_timeout", "5000"),      # wait for locks instead of failing with "database is locked"
+]
+
+
+def configure_conn(conn):
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}").fetchall()
+    return conn
+
 
 def get_conn():
-    return sqlite3.connect(DB_NAME, check_same_thread=False)
+    """Standalone connection; the caller closes it. Prefer db_connection()."""
+    return configure_conn(sqlite3.connect(DB_NAME, check_same_thread=False))
+
+
+class ConnectionPool:
+    """
+    Bounded pool of configured sqlite3 connections.
+
+    A thread checks one connection out for the duration of a
+    `with pool.connection()` block; nested blocks on the same thread reuse
+    it and only the outermost one commits (or rolls back on error) and
+    returns it to the pool.
+    """
+
+    def __init__(self, db_path: str = DB_NAME, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return configure_conn(sqlite3.connect(self.db_path, check_same_thread=False))
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.size})")
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        return {"size": self.size, "open": self._created, "idle": self._idle.qsize()}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = None) -> ConnectionPool:
+    path = db_path or DB_NAME
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
 
-def init_db():
-    conn = get_conn()
+def db_connection(db_path: str = None):
+    """`with db_connection() as conn:` — pooled, commits on success, rolls back on error."""
+    return get_pool(db_path).connection()
+
+def init_db(db_path: str = None):
+    """Create the tables and apply pending migrations (default database, or db_path)."""
+    with db_connection(db_path) as conn:
+        _create_tables(conn)
+        migrate(conn)
+
+
+def _create_tables(conn):
     cur = conn.cursor()
 
     cur.execute("""
@@ -103,7 +218,221 @@ def init_db():
     """)
 
 
-    conn.commit()
-    conn.close()
+# ---------- migrations ----------
+# The tables created above are schema version 0. Each migration moves the
+# database one version forward and PRAGMA user_version records how far it
+# has got, so init_db() is cheap once a database is up to date.
+
+def _m1_hot_path_indexes(conn):
+    # get_transaction_history: WHERE from_account=? OR to_account=? ORDER BY timestamp.
+    # One covering index per branch lets SQLite answer the OR with two index searches.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_from_ts
+        ON transactions(from_account, timestamp, to_account, amount)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_to_ts
+        ON transactions(to_account, timestamp, from_account, amount)
+    """)
+    # get_cards / block_*: account_number, then status for the ACTIVE/BLOCKED lookups
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cards_account_status
+        ON cards(account_number, status, card_number)
+    """)
+    # admin analytics: time windows, per-intent counts over a window
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_ts ON chat_logs(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_intent_ts ON chat_logs(intent, timestamp, confidence)")
+    # FAQ review tab: pending suggestions by frequency
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_faq_suggestions_status_freq
+        ON faq_suggestions(status, frequency)
+    """)
+
+
+def _m2_faq_embedding_rows(conn):
+    # which slot of the on-disk embedding matrix holds each FAQ, per encoder,
+    # and a hash of the question text it was computed from
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_embedding_rows (
+            model TEXT NOT NULL,
+            faq_id INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            question_hash TEXT NOT NULL,
+            PRIMARY KEY (model, faq_id)
+        )
+    """)
+
+
+def _m3_llm_cache(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            temperature REAL NOT NULL,
+            prompt TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            embedding BLOB,
+            created_at REAL NOT NULL,
+            last_hit REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_model ON llm_cache(model, temperature)")
+
+
+def _m4_llm_turns(conn):
+    # one row per LLM fallback answer: where it came from and how long it took
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            account_no TEXT,
+            backend TEXT,
+            model TEXT,
+            source TEXT,
+            ttft_ms REAL,
+            total_ms REAL,
+            tokens INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_turns_ts ON llm_turns(timestamp)")
+
+
+def _m5_faq_suggestion_upsert(conn):
+    # keyed on the normalized-question hash so log_faq_suggestion can be one UPSERT;
+    # avg_confidence becomes confidence_sum / frequency, computed on read
+    from database.faq_suggestions import merge_duplicates
+
+    conn.execute("ALTER TABLE faq_suggestions ADD COLUMN question_hash TEXT")
+    conn.execute("ALTER TABLE faq_suggestions ADD COLUMN confidence_sum REAL NOT NULL DEFAULT 0")
+    conn.execute("""
+        UPDATE faq_suggestions
+        SET frequency = COALESCE(frequency, 1),
+            confidence_sum = COALESCE(avg_confidence, 0) * COALESCE(frequency, 1)
+    """)
+    merge_duplicates(conn)
+    conn.execute("ALTER TABLE faq_suggestions DROP COLUMN avg_confidence")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_faq_suggestions_qhash ON faq_suggestions(question_hash)")
+
+
+def _m6_faq_suggestion_clusters(conn):
+    # near-duplicate clusters (database/faq_clustering.py): cluster_id is the id of
+    # the cluster's representative, minhash its signature, and the bands table the
+    # LSH buckets new suggestions are matched against
+    conn.execute("ALTER TABLE faq_suggestions ADD COLUMN cluster_id INTEGER")
+    conn.execute("ALTER TABLE faq_suggestions ADD COLUMN minhash BLOB")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_faq_suggestions_cluster ON faq_suggestions(cluster_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_suggestion_bands (
+            band INTEGER NOT NULL,
+            key INTEGER NOT NULL,
+            suggestion_id INTEGER NOT NULL,
+            PRIMARY KEY (band, key, suggestion_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _m7_chat_logs_covering_index(conn):
+    # the admin aggregates (database/analytics.py) filter on timestamp and read
+    # intent, confidence and account_no; with all four in the index they never
+    # touch the table. It supersedes the plain timestamp index.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_logs_ts_cover
+        ON chat_logs(timestamp, intent, confidence, account_no)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_chat_logs_ts")
+
+
+def _m8_chat_rollups(conn):
+    # per-day / per-hour / per-account aggregates kept by a chat_logs trigger
+    # (database/chat_rollups.py); existing logs are rolled up once here
+    from database import chat_rollups
+
+    chat_rollups.create(conn)
+    chat_rollups.backfill(conn)
+
+
+def _m9_transaction_keyset_indexes(conn):
+    # history pages are keyed on (timestamp, id); with id right after timestamp
+    # each branch of the from/to union reads its page straight off the index,
+    # ties included, with no sort. Supersedes the two migration-1 indexes.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_from_page
+        ON transactions(from_account, timestamp, id, to_account, amount)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_to_page
+        ON transactions(to_account, timestamp, id, from_account, amount)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_from_ts")
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_to_ts")
+
+
+def _m10_transfer_requests(conn):
+    # one row per applied transfer confirmation (database/transfers.py);
+    # a resubmitted key replays its transaction instead of moving money twice
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transfer_requests (
+            idempotency_key TEXT PRIMARY KEY,
+            from_account TEXT NOT NULL,
+            to_account TEXT NOT NULL,
+            amount REAL NOT NULL,
+            transaction_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def _m11_llm_turns_chunks(conn):
+    # llm_turns.tokens has always held the number of streamed chunks, which
+    # is not a token count (a chunk can carry several tokens, or none)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(llm_turns)")}
+    if "tokens" in columns:
+        conn.execute("ALTER TABLE llm_turns RENAME COLUMN tokens TO chunks")
+
+
+MIGRATIONS = [
+    (1, "indexes for hot lookup paths", _m1_hot_path_indexes),
+    (2, "faq embedding slot map", _m2_faq_embedding_rows),
+    (3, "persistent LLM answer cache", _m3_llm_cache),
+    (4, "LLM turn latency log", _m4_llm_turns),
+    (5, "faq_suggestions keyed on question hash", _m5_faq_suggestion_upsert),
+    (6, "faq suggestion near-duplicate clusters", _m6_faq_suggestion_clusters),
+    (7, "covering index for admin analytics", _m7_chat_logs_covering_index),
+    (8, "chat_logs rollup tables", _m8_chat_rollups),
+    (9, "transaction history keyset indexes", _m9_transaction_keyset_indexes),
+    (10, "transfer idempotency keys", _m10_transfer_requests),
+    (11, "llm_turns counts chunks, not tokens", _m11_llm_turns_chunks),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
 
 
+def migrate(conn, target: int = SCHEMA_VERSION) -> int:
+    """Apply pending migrations up to `target`, one transaction each. Returns the new version."""
+    if schema_version(conn) >= target:
+        return schema_version(conn)
+    if conn.in_transaction:
+        conn.commit()
+    for version, _, apply in MIGRATIONS:
+        if version > target:
+            break
+        # BEGIN IMMEDIATE takes the write lock first, so two processes starting
+        # together cannot both apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return schema_version(conn)
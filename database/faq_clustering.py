@@ -0,0 +1,296 @@
+# database/faq_clustering.py
+"""
+Near-duplicate clustering of faq_suggestions.
+
+Each question becomes its set of content tokens (faq_search.tokenize:
+stopwords dropped, plurals folded). A MinHash signature of NUM_PERM
+values estimates the Jaccard similarity of two such sets. LSH banding
+splits the signature into BANDS bands; rows that agree on every value of
+one band share a bucket. Only bucket-mates are compared, and a pair is
+kept when its estimated similarity is at least SIM_THRESHOLD. That makes
+the job roughly linear in the number of suggestions instead of quadratic.
+A row only joins a cluster if it is that close to the cluster's
+representative, so clusters do not grow by chaining.
+
+Every row stores cluster_id, the id of its cluster's representative: the
+most frequently asked member. The representative's own cluster_id is its
+id. Rows without content tokens ("hi?") stay on their own.
+
+    rebuild()     offline: re-cluster everything. Signatures and candidate
+                  pairs are vectorised in numpy; rows are then assigned
+                  to cluster centers greedily, most asked first
+    assign_new()  incremental: rows with cluster_id IS NULL (new since the
+                  last run) probe faq_suggestion_bands and join the most
+                  similar representative among their matches, or start
+                  their own cluster
+
+    python -m database.faq_clustering --rebuild
+    python -m database.faq_clustering --assign
+"""
+import os
+import time
+import zlib
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import db
+from database.faq_search import tokenize
+
+NUM_PERM = 64
+BANDS = 16                     # 4 rows per band: pairs above ~0.5 Jaccard collide in some band
+SIM_THRESHOLD = float(os.getenv("BANKBOT_SUGGESTION_SIM", "0.5"))
+CHUNK = 100_000                # docs per signature block, bounds peak memory
+
+_PRIME = (1 << 31) - 1
+_EMPTY = np.uint32(0xFFFFFFFF)
+# fixed seed: signatures must not change between runs or incremental lookups break
+_rng = np.random.RandomState(1729)
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+
+GROUPED_PENDING_SQL = """
+    SELECT r.id,
+           -- a cluster that was already approved or rejected shows its most asked new phrasing
+           CASE WHEN r.status = 'PENDING' THEN r.question ELSE (
+               SELECT p.question FROM faq_suggestions p
+               WHERE p.cluster_id = r.id AND p.status = 'PENDING'
+               ORDER BY p.frequency DESC LIMIT 1
+           ) END AS question,
+           r.status AS cluster_status,
+           SUM(m.frequency) AS frequency,
+           SUM(m.confidence_sum) / SUM(m.frequency) AS avg_confidence,
+           COUNT(*) AS variants,
+           MAX(m.last_asked) AS last_asked
+    FROM faq_suggestions m
+    JOIN faq_suggestions r ON r.id = COALESCE(m.cluster_id, m.id)
+    WHERE m.status = 'PENDING'
+    GROUP BY r.id
+    ORDER BY frequency DESC
+"""
+
+
+def signatures(questions: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(n, NUM_PERM) uint32 MinHash signatures and a mask of rows that had tokens."""
+    vocab: Dict[str, int] = {}
+    ids: List[int] = []
+    lengths = np.empty(len(questions), dtype=np.int64)
+    for i, question in enumerate(questions):
+        toks = set(tokenize(question))
+        for tok in toks:
+            ids.append(vocab.setdefault(tok, len(vocab)))
+        lengths[i] = len(toks)
+    token_hash = np.fromiter((zlib.crc32(t.encode("utf-8")) % _PRIME for t in vocab),
+                             dtype=np.uint64, count=len(vocab))
+    # value of every token under every permutation: (V, NUM_PERM)
+    perm = ((token_hash[:, None] * _A[None, :] + _B[None, :]) % _PRIME).astype(np.uint32)
+    ids_arr = np.asarray(ids, dtype=np.int64)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    sig = np.full((len(questions), NUM_PERM), _EMPTY, dtype=np.uint32)
+    nonempty = lengths > 0
+    for lo in range(0, len(questions), CHUNK):
+        hi = min(lo + CHUNK, len(questions))
+        rows = np.flatnonzero(nonempty[lo:hi]) + lo
+        if not len(rows):
+            continue
+        block = perm[ids_arr[indptr[lo]:indptr[hi]]]
+        sig[rows] = np.minimum.reduceat(block, indptr[rows] - indptr[lo], axis=0)
+    return sig, nonempty
+
+
+def band_keys(sig: np.ndarray) -> np.ndarray:
+    """(n, BANDS) int64 bucket keys, one per band."""
+    r = NUM_PERM // BANDS
+    parts = sig.astype(np.uint64).reshape(len(sig), BANDS, r)
+    key = np.zeros((len(sig), BANDS), dtype=np.uint64)
+    for i in range(r):
+        key = key * np.uint64(0x100000001B3) ^ parts[:, :, i]   # wraps mod 2**64
+    return key.view(np.int64)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of signature rows."""
+    return (a == b).mean(axis=-1)
+
+
+def candidate_edges(sig: np.ndarray, keys: np.ndarray, nonempty: np.ndarray, priority: np.ndarray,
+                    threshold: float = SIM_THRESHOLD) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Verified (member, leader) pairs: in every bucket each member is compared
+    with the bucket's highest-priority member only, so the work per band is
+    linear in the number of rows, not in the number of pairs.
+    """
+    idx = np.flatnonzero(nonempty)
+    src, dst = [], []
+    for band in range(BANDS):
+        k = keys[idx, band]
+        order = np.lexsort((priority[idx], k))
+        sk, members = k[order], idx[order]
+        starts = np.r_[True, sk[1:] != sk[:-1]]
+        leader = members[np.maximum.accumulate(np.where(starts, np.arange(len(sk)), 0))]
+        pair = members != leader
+        a, b = members[pair], leader[pair]
+        for lo in range(0, len(a), CHUNK):
+            ok = similarity(sig[a[lo:lo + CHUNK]], sig[b[lo:lo + CHUNK]]) >= threshold
+            src.append(a[lo:lo + CHUNK][ok])
+            dst.append(b[lo:lo + CHUNK][ok])
+    src = np.concatenate(src) if src else np.empty(0, dtype=np.int64)
+    dst = np.concatenate(dst) if dst else np.empty(0, dtype=np.int64)
+    return src, dst
+
+
+def assign_centers(sig: np.ndarray, keys: np.ndarray, nonempty: np.ndarray, priority: np.ndarray,
+                   threshold: float = SIM_THRESHOLD) -> np.ndarray:
+    """
+    Row index of each row's cluster center.
+
+    Greedy, in priority order: a row joins the most similar center among
+    its neighbours' centers if that center itself is within `threshold`,
+    otherwise it becomes a center and claims its unassigned neighbours.
+    Always comparing against the center (not the neighbour) stops chains
+    like "block debit card" - "block card" - "block credit card" from
+    merging distinct questions into one giant cluster.
+    """
+    n = len(sig)
+    src, dst = candidate_edges(sig, keys, nonempty, priority, threshold)
+    ends = np.concatenate([src, dst])
+    other = np.concatenate([dst, src])
+    order = np.argsort(ends, kind="stable")
+    neighbours = other[order]
+    indptr = np.searchsorted(ends[order], np.arange(n + 1))
+    center = np.full(n, -1, dtype=np.int64)
+    for node in np.argsort(priority, kind="stable"):
+        if center[node] >= 0:
+            continue
+        nbrs = neighbours[indptr[node]:indptr[node + 1]]
+        if len(nbrs):
+            centers = np.unique(center[nbrs])
+            centers = centers[centers >= 0]
+            if len(centers):
+                sims = similarity(sig[centers], sig[node])
+                best = int(np.argmax(sims))
+                if sims[best] >= threshold:
+                    center[node] = centers[best]
+                    continue
+            free = nbrs[center[nbrs] < 0]
+            center[free] = node  # every edge was verified against this node
+        center[node] = node
+    return center
+
+
+def priorities(ids: np.ndarray, freq: np.ndarray) -> np.ndarray:
+    """Rank per row: most asked first, lowest id on ties. Centers become representatives."""
+    rank = np.empty(len(ids), dtype=np.int64)
+    rank[np.lexsort((ids, -freq))] = np.arange(len(ids))
+    return rank
+
+
+def rebuild(db_path: Optional[str] = None, threshold: float = SIM_THRESHOLD) -> Dict[str, float]:
+    timings = {}
+    t0 = time.perf_counter()
+    with db.db_connection(db_path) as conn:
+        rows = conn.execute("SELECT id, question, frequency FROM faq_suggestions ORDER BY id").fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    freq = np.array([r[2] or 0 for r in rows], dtype=np.int64)
+    timings["load_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sig, nonempty = signatures([r[1] for r in rows])
+    keys = band_keys(sig)
+    timings["minhash_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    center = assign_centers(sig, keys, nonempty, priorities(ids, freq), threshold)
+    cluster_ids = ids[center]
+    timings["cluster_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with db.db_connection(db_path) as conn:
+        conn.executemany(
+            "UPDATE faq_suggestions SET cluster_id = ?, minhash = ? WHERE id = ?",
+            ((int(c), sig[i].tobytes() if nonempty[i] else None, int(ids[i])) for i, c in enumerate(cluster_ids)),
+        )
+        conn.execute("DELETE FROM faq_suggestion_bands")
+        rows_idx = np.flatnonzero(nonempty)
+        band_rows = np.column_stack([
+            np.repeat(np.arange(BANDS), len(rows_idx)),
+            keys[rows_idx].T.ravel(),
+            np.tile(ids[rows_idx], BANDS),
+        ])
+        # primary-key order makes the WITHOUT ROWID inserts appends
+        band_rows = band_rows[np.lexsort((band_rows[:, 2], band_rows[:, 1], band_rows[:, 0]))]
+        for lo in range(0, len(band_rows), CHUNK):
+            conn.executemany("INSERT INTO faq_suggestion_bands (band, key, suggestion_id) VALUES (?, ?, ?)",
+                             band_rows[lo:lo + CHUNK].tolist())
+    timings["write_s"] = time.perf_counter() - t0
+    timings["suggestions"] = len(rows)
+    timings["clusters"] = len(np.unique(cluster_ids))
+    return timings
+
+
+def set_cluster_status(conn, cluster_id: int, status: str) -> int:
+    """Approve / reject every pending phrasing of a cluster at once."""
+    return conn.execute(
+        "UPDATE faq_suggestions SET status = ? WHERE status = 'PENDING' AND (cluster_id = ? OR id = ?)",
+        (status, cluster_id, cluster_id),
+    ).rowcount
+
+
+def assign_new(conn, threshold: float = SIM_THRESHOLD) -> int:
+    """Cluster rows added since the last run (cluster_id IS NULL). Returns how many were assigned."""
+    rows = conn.execute("SELECT id, question FROM faq_suggestions WHERE cluster_id IS NULL ORDER BY id").fetchall()
+    if not rows:
+        return 0
+    sig, nonempty = signatures([q for _, q in rows])
+    keys = band_keys(sig)
+    probe = "SELECT DISTINCT suggestion_id FROM faq_suggestion_bands WHERE " + " OR ".join(
+        ["(band = ? AND key = ?)"] * BANDS)
+    for i, (row_id, _) in enumerate(rows):
+        if not nonempty[i]:
+            conn.execute("UPDATE faq_suggestions SET cluster_id = id WHERE id = ?", (row_id,))
+            continue
+        params = [v for band in range(BANDS) for v in (band, int(keys[i, band]))]
+        candidates = [c for (c,) in conn.execute(probe, params)]
+        cluster_id = row_id
+        if candidates:
+            # compare with the candidates' representatives, as rebuild() does
+            found = conn.execute(
+                "SELECT r.minhash, r.id FROM faq_suggestions r WHERE r.minhash IS NOT NULL AND r.id IN ("
+                f"SELECT cluster_id FROM faq_suggestions WHERE id IN ({','.join('?' * len(candidates))}))",
+                candidates,
+            ).fetchall()
+            if found:
+                other = np.stack([np.frombuffer(m, dtype=np.uint32) for m, _ in found])
+                sims = similarity(other, sig[i])
+                best = int(np.argmax(sims))
+                if sims[best] >= threshold:
+                    cluster_id = found[best][1]
+        conn.execute("UPDATE faq_suggestions SET cluster_id = ?, minhash = ? WHERE id = ?",
+                     (cluster_id, sig[i].tobytes(), row_id))
+        conn.executemany("INSERT OR IGNORE INTO faq_suggestion_bands (band, key, suggestion_id) VALUES (?, ?, ?)",
+                         [(band, int(keys[i, band]), row_id) for band in range(BANDS)])
+    return len(rows)
+
+
+def cluster_members(conn, cluster_id: int, limit: int = 10) -> List[Tuple[str, int]]:
+    """Most asked phrasings in a cluster (the representative included)."""
+    return conn.execute(
+        "SELECT question, frequency FROM faq_suggestions WHERE cluster_id = ? OR id = ? "
+        "ORDER BY frequency DESC LIMIT ?",
+        (cluster_id, cluster_id, limit),
+    ).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="re-cluster every suggestion")
+    parser.add_argument("--assign", action="store_true", help="cluster only suggestions added since the last run")
+    parser.add_argument("--threshold", type=float, default=SIM_THRESHOLD)
+    args = parser.parse_args()
+    db.init_db()
+    if args.rebuild:
+        print(rebuild(threshold=args.threshold))
+    if args.assign:
+        with db.db_connection() as conn:
+            print(f"assigned {assign_new(conn, args.threshold)} new suggestions")
@@ -0,0 +1,390 @@
+# database/faq_embeddings.py
+"""
+Semantic FAQ matching.
+
+Every faqs.question is encoded once into an L2-normalised vector. The
+vectors live in a memory-mapped .npy file next to bankbot.db
+(faq_embeddings.<encoder>.npy), and the faq_embedding_rows table maps
+each FAQ to its row ("slot") together with a hash of the question text.
+sync() and the admin-edit hooks re-encode only rows whose question
+changed. Deleted FAQs free their slot for reuse.
+
+A lookup is one matrix-vector product plus argpartition. Hits below
+FAQ_SIM_THRESHOLD cosine similarity are dropped.
+
+The chatbot only uses this step with a sentence-transformers model.
+Without that package, get_faq_embeddings() returns None and load_error
+says why. The mean-pooled DistilBERT vectors that TransformerEncoder can
+fall back to are anisotropic: unrelated questions already sit at high
+cosine similarity, so no threshold separates paraphrases from the rest.
+That fallback is only built on request (allow_fallback=True), for
+offline comparisons.
+
+FAQ_SIM_THRESHOLD belongs to one encoder. Re-check it with calibrate() on
+labelled paraphrase / non-paraphrase pairs whenever EMBED_MODEL changes
+(Experiments/bench_faq_threshold.py), then see what it saves with replay():
+
+    python -m database.faq_embeddings --sync
+    python -m database.faq_embeddings --replay bankbot.db --thresholds 0.6 0.7 0.8
+"""
+import os
+import re
+import hashlib
+import argparse
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import db
+
+EMBED_MODEL = os.getenv("BANKBOT_FAQ_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+FAQ_SIM_THRESHOLD = float(os.getenv("BANKBOT_FAQ_SIM_THRESHOLD", "0.75"))
+USE_SEMANTIC_FAQ = os.getenv("BANKBOT_FAQ_SEMANTIC", "1") == "1"
+ENCODE_BATCH = 64
+MIN_CAPACITY = 256
+
+# intents the chatbot answers itself; everything else reaches the FAQ/LLM fallback
+ROUTED_INTENTS = frozenset({
+    "check_balance", "account_details", "transfer_money", "atm_info",
+    "block_card", "support", "goodbye", "unblock_card",
+})
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha1(" ".join((question or "").lower().split()).encode("utf-8")).hexdigest()
+
+
+class TransformerEncoder:
+    """
+    sentence-transformers model. With allow_fallback, and only if the package
+    is missing, mean-pooled last hidden states of the local DistilBERT
+    intent model instead.
+    """
+
+    def __init__(self, model_name: str = EMBED_MODEL, allow_fallback: bool = False):
+        try:
+            from sentence_transformers import SentenceTransformer
+            self._st = SentenceTransformer(model_name)
+            self.name = model_name
+        except ImportError:
+            if not allow_fallback:
+                raise ImportError("sentence-transformers is not installed; semantic FAQ matching is off") from None
+            import torch
+            from transformers import AutoTokenizer, AutoModel
+            from nlu_engine.infer_intent import MODEL_DIR
+            source = MODEL_DIR if os.path.isdir(MODEL_DIR) else "distilbert-base-uncased"
+            self._st = None
+            self._torch = torch
+            self.tokenizer = AutoTokenizer.from_pretrained(source)
+            self.model = AutoModel.from_pretrained(source)
+            self.model.eval()
+            self.name = "distilbert-meanpool"
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if self._st is not None:
+            vecs = self._st.encode(texts, batch_size=ENCODE_BATCH, convert_to_numpy=True)
+        else:
+            out = []
+            for i in range(0, len(texts), ENCODE_BATCH):
+                enc = self.tokenizer(texts[i:i + ENCODE_BATCH], padding=True, truncation=True, return_tensors="pt")
+                with self._torch.no_grad():
+                    hidden = self.model(**enc).last_hidden_state
+                mask = enc["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                out.append(((hidden * mask).sum(1) / mask.sum(1).clamp(min=1)).numpy())
+            vecs = np.concatenate(out) if out else np.zeros((0, self.model.config.dim))
+        vecs = np.asarray(vecs, dtype=np.float32)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        return vecs / np.maximum(norms, 1e-12)
+
+
+class FAQEmbeddingIndex:
+    def __init__(self, encoder: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+                 db_path: Optional[str] = None, store_dir: Optional[str] = None):
+        self.encoder = encoder or TransformerEncoder()
+        self.model = getattr(self.encoder, "name", type(self.encoder).__name__)
+        self.db_path = db_path or db.DB_NAME
+        store_dir = store_dir or os.path.dirname(os.path.abspath(self.db_path))
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", self.model).strip("_")
+        self.path = os.path.join(store_dir, f"faq_embeddings.{slug}.npy")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_ids = np.zeros(0, dtype=np.int64)   # slot -> faq_id, -1 when free
+        self._slots: Dict[int, Tuple[int, str]] = {}   # faq_id -> (slot, question_hash)
+        self.encoded = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    # ---------- storage ----------
+    def _open(self, dim: int, capacity: int):
+        """Open the matrix with room for `capacity` rows, growing the file if needed."""
+        if self._matrix is not None and self._matrix.shape[0] >= capacity:
+            return
+        old = self._matrix
+        if old is None and os.path.exists(self.path):
+            old = np.load(self.path, mmap_mode="r+")
+            if old.ndim != 2 or old.shape[1] != dim:
+                old = None
+            elif old.shape[0] >= capacity:
+                self._matrix = old
+                self._resize_ids(old.shape[0])
+                return
+        size = max(MIN_CAPACITY, capacity, 2 * (old.shape[0] if old is not None else 0))
+        tmp = self.path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(size, dim))
+        if old is not None:
+            grown[: old.shape[0]] = old
+        grown.flush()
+        del grown, old
+        self._matrix = None
+        os.replace(tmp, self.path)
+        self._matrix = np.load(self.path, mmap_mode="r+")
+        self._resize_ids(size)
+
+    def _resize_ids(self, size: int):
+        if len(self._slot_ids) < size:
+            extra = np.full(size - len(self._slot_ids), -1, dtype=np.int64)
+            self._slot_ids = np.concatenate([self._slot_ids, extra])
+
+    # ---------- maintenance ----------
+    def sync(self) -> Dict[str, int]:
+        """Bring the matrix in line with the faqs table, encoding only new or edited questions."""
+        with self._lock, db.db_connection(self.db_path) as conn:
+            faqs = {fid: q or "" for fid, q in conn.execute("SELECT id, question FROM faqs")}
+            stored = {fid: (slot, h) for fid, slot, h in conn.execute(
+                "SELECT faq_id, slot, question_hash FROM faq_embedding_rows WHERE model=?", (self.model,))}
+            if stored and not os.path.exists(self.path):
+                stored = {}
+            if stored and self._matrix is None:
+                probe = np.load(self.path, mmap_mode="r")
+                if probe.ndim != 2 or probe.shape[0] <= max(s for s, _ in stored.values()):
+                    stored = {}
+                else:
+                    self._open(probe.shape[1], probe.shape[0])
+                del probe
+            if not stored:
+                conn.execute("DELETE FROM faq_embedding_rows WHERE model=?", (self.model,))
+                self._slot_ids = np.full(len(self._slot_ids), -1, dtype=np.int64)
+
+            self._slots = {}
+            for fid, (slot, h) in stored.items():
+                self._resize_ids(slot + 1)
+                if fid in faqs:
+                    self._slots[fid] = (slot, h)
+                    self._slot_ids[slot] = fid
+            removed = [fid for fid in stored if fid not in faqs]
+            for fid in removed:
+                slot = stored[fid][0]
+                if self._slot_ids[slot] == fid:
+                    self._slot_ids[slot] = -1
+                if self._matrix is not None and slot < self._matrix.shape[0]:
+                    self._matrix[slot] = 0
+            if removed:
+                conn.executemany("DELETE FROM faq_embedding_rows WHERE model=? AND faq_id=?",
+                                 [(self.model, fid) for fid in removed])
+
+            todo = [(fid, q) for fid, q in faqs.items()
+                    if fid not in self._slots or self._slots[fid][1] != question_hash(q)]
+            self._write(conn, todo)
+            if self._matrix is not None:
+                self._matrix.flush()
+            return {"kept": len(faqs) - len(todo), "embedded": len(todo), "removed": len(removed)}
+
+    def _write(self, conn, rows: List[Tuple[int, str]]):
+        if not rows:
+            return
+        vecs = self.encoder([q for _, q in rows])
+        self.encoded += len(rows)
+        free = iter(np.flatnonzero(self._slot_ids < 0).tolist())
+        end = len(self._slot_ids)
+        slots = []
+        for fid, _ in rows:
+            if fid in self._slots:
+                slots.append(self._slots[fid][0])
+            else:
+                slot = next(free, None)
+                if slot is None:
+                    slot, end = end, end + 1
+                slots.append(slot)
+        self._resize_ids(end)
+        self._open(vecs.shape[1], end)
+        self._matrix[slots] = vecs
+        meta = []
+        for (fid, q), slot in zip(rows, slots):
+            h = question_hash(q)
+            self._slot_ids[slot] = fid
+            self._slots[fid] = (slot, h)
+            meta.append((self.model, fid, slot, h))
+        conn.executemany(
+            "INSERT OR REPLACE INTO faq_embedding_rows (model, faq_id, slot, question_hash) VALUES (?, ?, ?, ?)",
+            meta,
+        )
+
+    def upsert(self, faq_id: int, question: str):
+        with self._lock:
+            known = self._slots.get(faq_id)
+            if known is not None and known[1] == question_hash(question):
+                return  # answer-only edit: vector unchanged
+            with db.db_connection(self.db_path) as conn:
+                self._write(conn, [(faq_id, question)])
+            self._matrix.flush()
+
+    def remove(self, faq_id: int):
+        with self._lock:
+            known = self._slots.pop(faq_id, None)
+            if known is None:
+                return
+            slot = known[0]
+            self._slot_ids[slot] = -1
+            self._matrix[slot] = 0
+            self._matrix.flush()
+            with db.db_connection(self.db_path) as conn:
+                conn.execute("DELETE FROM faq_embedding_rows WHERE model=? AND faq_id=?", (self.model, faq_id))
+
+    # ---------- lookup ----------
+    def search_vector(self, vec: np.ndarray, k: int = 3, threshold: float = FAQ_SIM_THRESHOLD) -> List[Tuple[float, int]]:
+        matrix, slot_ids = self._matrix, self._slot_ids
+        if matrix is None or not self._slots:
+            return []
+        n = min(len(slot_ids), matrix.shape[0])
+        sims = matrix[:n] @ vec          # free slots are zero rows, similarity 0
+        k = min(k, n)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(float(sims[s]), int(slot_ids[s])) for s in top if sims[s] >= threshold and slot_ids[s] >= 0]
+
+    def search(self, text: str, k: int = 3, threshold: float = FAQ_SIM_THRESHOLD) -> List[Tuple[float, int]]:
+        return self.search_vector(self.encoder([text])[0], k, threshold)
+
+    def answer(self, text: str, threshold: float = FAQ_SIM_THRESHOLD) -> Optional[str]:
+        hits = self.search(text, k=1, threshold=threshold)
+        if not hits:
+            return None
+        with db.db_connection(self.db_path) as conn:
+            row = conn.execute("SELECT answer FROM faqs WHERE id=?", (hits[0][1],)).fetchone()
+        return row[0] if row else None
+
+
+_index: Optional[FAQEmbeddingIndex] = None
+_index_lock = threading.Lock()
+load_error: Optional[str] = None
+
+
+def get_faq_embeddings() -> Optional[FAQEmbeddingIndex]:
+    """Process-wide index, synced on first use; None if no encoder could be loaded."""
+    global _index, load_error
+    if _index is None and load_error is None:
+        with _index_lock:
+            if _index is None and load_error is None:
+                try:
+                    index = FAQEmbeddingIndex()
+                    index.sync()
+                    _index = index
+                except Exception as e:
+                    load_error = str(e)
+    return _index
+
+
+def semantic_answer(text: str) -> Optional[str]:
+    if not USE_SEMANTIC_FAQ:
+        return None
+    index = get_faq_embeddings()
+    return index.answer(text) if index is not None else None
+
+
+# hooks for database.faq_search's admin writes; no-ops until the index is loaded
+def on_faq_upsert(faq_id: int, question: str):
+    if _index is not None:
+        _index.upsert(faq_id, question)
+
+
+def on_faq_delete(faq_id: int):
+    if _index is not None:
+        _index.remove(faq_id)
+
+
+def calibrate(encoder: Callable[[Sequence[str]], np.ndarray], pairs: Sequence[Tuple[str, str, bool]],
+              thresholds: Sequence[float]) -> List[Dict[str, float]]:
+    """
+    Precision / recall / F1 of "similarity >= threshold means same question"
+    on labelled (text, faq question, is_paraphrase) pairs that are not FAQs.
+    """
+    a = encoder([p[0] for p in pairs])
+    b = encoder([p[1] for p in pairs])
+    sims = np.einsum("ij,ij->i", a, b)
+    labels = np.array([bool(p[2]) for p in pairs])
+    rows = []
+    for th in thresholds:
+        predicted = sims >= th
+        tp = int(np.sum(predicted & labels))
+        precision = tp / int(predicted.sum()) if predicted.any() else 1.0
+        recall = tp / int(labels.sum()) if labels.any() else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows.append({"threshold": th, "precision": precision, "recall": recall, "f1": f1,
+                     "neg_sim_p95": float(np.percentile(sims[~labels], 95)) if (~labels).any() else 0.0})
+    return rows
+
+
+def pick_threshold(rows: List[Dict[str, float]], min_precision: float = 0.95) -> Optional[float]:
+    """Lowest threshold that keeps precision >= min_precision (a wrong FAQ is worse than an LLM call)."""
+    ok = [r["threshold"] for r in rows if r["precision"] >= min_precision and r["recall"] > 0]
+    return min(ok) if ok else None
+
+
+def replay(db_path: str, thresholds: List[float], index: Optional[FAQEmbeddingIndex] = None):
+    """
+    LLM calls the fallback would have made over chat_logs with the old
+    substring match, with BM25 alone, and with BM25 + embeddings per threshold.
+    """
+    from database.faq_search import build_index, FAQ_MIN_MATCH, FAQ_MIN_SCORE
+
+    with db.db_connection(db_path) as conn:
+        faqs = [(q or "").lower() for q, in conn.execute("SELECT question FROM faqs")]
+        texts = [t for t, intent in conn.execute("SELECT user_query, intent FROM chat_logs WHERE user_query IS NOT NULL")
+                 if intent not in ROUTED_INTENTS]
+    if not texts:
+        return {}
+    bm25 = build_index("bm25", db_path)
+    legacy_miss = sum(1 for t in texts if not any(q in t.lower() for q in faqs))
+    bm25_hit = [any(m >= FAQ_MIN_MATCH and s >= FAQ_MIN_SCORE for s, m, *_ in bm25.search(t)) for t in texts]
+    report = {"fallback_turns": len(texts), "legacy_llm_calls": legacy_miss,
+              "bm25_llm_calls": len(texts) - sum(bm25_hit)}
+    if not thresholds:
+        return report
+
+    if index is None:
+        index = FAQEmbeddingIndex(db_path=db_path)
+    index.sync()
+    vecs = index.encoder(texts)
+    for th in thresholds:
+        calls = sum(1 for hit, v in zip(bm25_hit, vecs) if not hit and not index.search_vector(v, 1, th))
+        report[th] = {"llm_calls": calls, "saved_vs_legacy": legacy_miss - calls,
+                      "saved_pct": 100.0 * (legacy_miss - calls) / legacy_miss if legacy_miss else 0.0}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sync", action="store_true", help="embed new/edited FAQs of --db")
+    parser.add_argument("--db", type=str, default=db.DB_NAME)
+    parser.add_argument("--replay", type=str, default=None, help="sqlite db with chat_logs + faqs")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.75, 0.8, 0.9])
+    parser.add_argument("--allow_fallback", action="store_true",
+                        help="use the DistilBERT mean-pool encoder if sentence-transformers is missing")
+    args = parser.parse_args()
+    if args.sync:
+        print(FAQEmbeddingIndex(TransformerEncoder(allow_fallback=args.allow_fallback), db_path=args.db).sync())
+    if args.replay:
+        index = FAQEmbeddingIndex(TransformerEncoder(allow_fallback=args.allow_fallback), db_path=args.replay)
+        rep = replay(args.replay, args.thresholds, index)
+        if not rep:
+            print("no fallback turns in chat_logs")
+        else:
+            print(f"fallback turns: {rep.pop('fallback_turns')}")
+            print(f"LLM calls, substring match: {rep.pop('legacy_llm_calls')}")
+            print(f"LLM calls, BM25:            {rep.pop('bm25_llm_calls')}")
+            print(f"{'threshold':>9} {'llm calls':>10} {'saved':>6} {'saved %':>8}")
+            for th, r in rep.items():
+                print(f"{th:>9.2f} {r['llm_calls']:>10} {r['saved_vs_legacy']:>6} {r['saved_pct']:>7.1f}%")
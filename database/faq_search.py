@@ -0,0 +1,364 @@
+# database/faq_search.py
+"""
+Ranked FAQ retrieval.
+
+Two interchangeable backends answer search(query, k) with
+[(score, match, faq_id, question, answer), ...], best first:
+
+* "bm25"  – in-memory inverted index over the FAQ questions (default).
+* "fts5"  – SQLite FTS5 table kept in sync with `faqs` by triggers.
+
+`match` weighs both sides by idf: the share of the stored question's
+words found in the message, and the share of the message's words found
+in the question. It is their F1, so 1.0 means the two use the same
+meaningful words. A short FAQ no longer wins a longer, unrelated message
+just because its one or two words appear in it ("block card near atm"
+covers all of "ATM near me", but half of it is about something else).
+Words no FAQ uses get the highest idf, so an off-topic message scores
+low on its side. Both backends use this rule. best_answer() only returns
+answers with match >= FAQ_MIN_MATCH and a ranking score >= FAQ_MIN_SCORE.
+
+The admin panel goes through add_faq / update_faq / delete_faq, which
+write the row and patch the live index (and the embedding index in
+database.faq_embeddings, if loaded) in place instead of rebuilding it.
+Select the backend with BANKBOT_FAQ_BACKEND=bm25|fts5.
+"""
+import os
+import re
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import db, faq_embeddings
+
+FAQ_BACKEND = os.getenv("BANKBOT_FAQ_BACKEND", "bm25")
+FAQ_MIN_MATCH = float(os.getenv("BANKBOT_FAQ_MIN_MATCH", "0.6"))
+# floor on the backend's BM25 score: one shared, common word is not a match
+FAQ_MIN_SCORE = float(os.getenv("BANKBOT_FAQ_MIN_SCORE", "1.0"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from had has have how i if in is it its me my of on or
+our please should so that the their there this to was we what when where which who why will with would
+you your
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+Result = Tuple[float, float, int, str, str]
+
+
+def tokenize(text: str) -> List[str]:
+    out = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in STOPWORDS:
+            continue
+        # light plural folding: cards -> card, charges -> charge (not "address")
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        out.append(tok)
+    return out
+
+
+def bm25_idf(n: int, df: int) -> float:
+    return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+
+def match_score(query_terms, doc_terms, idf) -> float:
+    """F1 of the idf weight each side shares with the other; idf(term) -> weight."""
+    shared = sum(idf(t) for t in query_terms if t in doc_terms)
+    if not shared:
+        return 0.0
+    recall = shared / sum(idf(t) for t in doc_terms)        # of the FAQ question
+    precision = shared / sum(idf(t) for t in query_terms)   # of the user's message
+    return 2 * precision * recall / (precision + recall)
+
+
+class BM25Index:
+    """
+    Inverted index over the FAQ questions.
+
+    Postings are kept in dicts keyed by a dense document slot so single
+    admin edits are O(terms in the question). Each term's posting list is
+    frozen into numpy arrays on first query and re-frozen only after that
+    term changes, so scoring is one vectorised add per query term into a
+    shared score array.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}       # term -> {slot: tf}
+        self._frozen: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}      # faq_id -> {term: tf}
+        self._docs: Dict[int, Tuple[str, str]] = {}
+        self._slot: Dict[int, int] = {}
+        self._slot_ids: List[Optional[int]] = []
+        self._free: List[int] = []
+        self._dl = np.zeros(1024, dtype=np.float32)
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- maintenance ----------
+    def add(self, faq_id: int, question: str, answer: str):
+        with self._lock:
+            if faq_id in self._docs:
+                self.remove(faq_id)
+            tf: Dict[str, int] = {}
+            for tok in tokenize(question):
+                tf[tok] = tf.get(tok, 0) + 1
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._slot_ids)
+                self._slot_ids.append(None)
+                if slot >= len(self._dl):
+                    self._dl = np.concatenate([self._dl, np.zeros_like(self._dl)])
+            dl = sum(tf.values())
+            self._slot_ids[slot] = faq_id
+            self._slot[faq_id] = slot
+            self._dl[slot] = dl
+            self._total_len += dl
+            self._docs[faq_id] = (question, answer)
+            self._doc_terms[faq_id] = tf
+            for term, n in tf.items():
+                self._postings.setdefault(term, {})[slot] = n
+                self._frozen.pop(term, None)
+
+    def update(self, faq_id: int, question: str, answer: str):
+        with self._lock:
+            old = self._docs.get(faq_id)
+            if old is not None and old[0] == question:
+                self._docs[faq_id] = (question, answer)  # answer-only edit: postings unchanged
+            else:
+                self.add(faq_id, question, answer)
+
+    def remove(self, faq_id: int):
+        with self._lock:
+            tf = self._doc_terms.pop(faq_id, None)
+            if tf is None:
+                return
+            del self._docs[faq_id]
+            slot = self._slot.pop(faq_id)
+            self._slot_ids[slot] = None
+            self._free.append(slot)
+            self._total_len -= int(self._dl[slot])
+            self._dl[slot] = 0
+            for term in tf:
+                plist = self._postings[term]
+                del plist[slot]
+                self._frozen.pop(term, None)
+                if not plist:
+                    del self._postings[term]
+
+    # ---------- scoring ----------
+    def _idf(self, term: str) -> float:
+        return bm25_idf(len(self._docs), len(self._postings.get(term, ())))
+
+    def _arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrs = self._frozen.get(term)
+        if arrs is None:
+            plist = self._postings[term]
+            arrs = (np.fromiter(plist.keys(), dtype=np.int64, count=len(plist)),
+                    np.fromiter(plist.values(), dtype=np.float32, count=len(plist)))
+            self._frozen[term] = arrs
+        return arrs
+
+    def match_ratio(self, query_terms, faq_id: int) -> float:
+        tf = self._doc_terms.get(faq_id)
+        return match_score(query_terms, tf, self._idf) if tf else 0.0
+
+    def search(self, query: str, k: int = 5) -> List[Result]:
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            terms = [t for t in query_terms if t in self._postings]
+            if not terms or not n:
+                return []
+            k1, b = self.k1, self.b
+            # BM25 denominator tf + k1 * (1 - b + b * dl / avgdl), split into constants
+            c0 = k1 * (1 - b)
+            c1 = k1 * b * n / self._total_len if self._total_len else 0.0
+            # MaxScore, vectorised: walk terms rarest first. Once the k-th best score
+            # among documents seen so far is at least the most that all remaining
+            # terms together could add, no unseen document can make the top k, so
+            # the remaining (common, long) posting lists only update known candidates.
+            weights = sorted(((self._idf(t), t) for t in terms), reverse=True)
+            rest = [0.0] * (len(weights) + 1)
+            for i in range(len(weights) - 1, -1, -1):
+                rest[i] = rest[i + 1] + weights[i][0] * (k1 + 1)
+            scores = np.zeros(len(self._slot_ids), dtype=np.float32)
+            seen = np.zeros(len(self._slot_ids), dtype=bool)
+            cand = np.empty(0, dtype=np.int64)
+            pruned = False
+            for i, (idf, term) in enumerate(weights):
+                slots, tf = self._arrays(term)
+                if pruned:
+                    keep = seen[slots]
+                    slots, tf = slots[keep], tf[keep]
+                else:
+                    new = slots[~seen[slots]]
+                    seen[new] = True
+                    cand = np.concatenate([cand, new])
+                # slots are unique within one posting list, so fancy-index += is safe
+                scores[slots] += idf * (k1 + 1) * tf / (tf + c0 + c1 * self._dl[slots])
+                if not pruned and len(cand) >= k and i + 1 < len(weights):
+                    pruned = np.partition(scores[cand], -k)[-k] >= rest[i + 1]
+            if len(cand) > k:
+                cand = cand[np.argpartition(scores[cand], -k)[-k:]]
+            cand = cand[np.argsort(-scores[cand], kind="stable")]
+            out = []
+            for slot in cand:
+                faq_id = self._slot_ids[slot]
+                out.append((float(scores[slot]), self.match_ratio(query_terms, faq_id), faq_id, *self._docs[faq_id]))
+            return out
+
+
+class FTS5Index:
+    """Same interface as BM25Index, backed by an external-content FTS5 table."""
+
+    TABLE = "faqs_fts"
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        with db.db_connection(db_path) as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.TABLE,)
+            ).fetchone()
+            conn.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE}
+                    USING fts5(question, answer UNINDEXED, content='faqs', content_rowid='id',
+                          tokenize='porter unicode61');
+                CREATE TRIGGER IF NOT EXISTS faqs_fts_ai AFTER INSERT ON faqs BEGIN
+                    INSERT INTO {self.TABLE}(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+                END;
+                CREATE TRIGGER IF NOT EXISTS faqs_fts_ad AFTER DELETE ON faqs BEGIN
+                    INSERT INTO {self.TABLE}({self.TABLE}, rowid, question, answer)
+                        VALUES ('delete', old.id, old.question, old.answer);
+                END;
+                CREATE TRIGGER IF NOT EXISTS faqs_fts_au AFTER UPDATE ON faqs BEGIN
+                    INSERT INTO {self.TABLE}({self.TABLE}, rowid, question, answer)
+                        VALUES ('delete', old.id, old.question, old.answer);
+                    INSERT INTO {self.TABLE}(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+                END;
+            """)
+            if not exists:
+                conn.execute(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')")
+
+    # the triggers already keep the table in step with `faqs`
+    def add(self, faq_id, question, answer):
+        pass
+
+    update = add
+
+    def remove(self, faq_id):
+        pass
+
+    def __len__(self):
+        with db.db_connection(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM faqs").fetchone()[0]
+
+    def search(self, query: str, k: int = 5) -> List[Result]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{t}"' for t in sorted(terms))
+        with db.db_connection(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT rowid, question, answer, bm25({self.TABLE}) FROM {self.TABLE} "
+                f"WHERE {self.TABLE} MATCH ? ORDER BY rank LIMIT ?",
+                (match, k),
+            ).fetchall()
+            # idf over the same tokens as BM25Index; FTS5 stems them the same way it indexed them
+            n = conn.execute("SELECT COUNT(*) FROM faqs").fetchone()[0]
+            df: Dict[str, int] = {}
+
+            def idf(term: str) -> float:
+                if term not in df:
+                    df[term] = conn.execute(
+                        f"SELECT COUNT(*) FROM {self.TABLE} WHERE {self.TABLE} MATCH ?", (f'"{term}"',)
+                    ).fetchone()[0]
+                return bm25_idf(n, df[term])
+
+            return [(-score, match_score(terms, set(tokenize(question)), idf), faq_id, question, answer)
+                    for faq_id, question, answer, score in rows]
+
+
+def build_index(backend: str = FAQ_BACKEND, db_path: Optional[str] = None):
+    if backend == "fts5":
+        return FTS5Index(db_path)
+    if backend != "bm25":
+        raise ValueError(f"Unknown FAQ backend {backend!r}; expected 'bm25' or 'fts5'")
+    index = BM25Index()
+    with db.db_connection(db_path) as conn:
+        for faq_id, question, answer in conn.execute("SELECT id, question, answer FROM faqs"):
+            index.add(faq_id, question or "", answer or "")
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_faq_index():
+    """Process-wide index, built from the faqs table on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+    return _index
+
+
+def reset_faq_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def search_faqs(query: str, k: int = 5) -> List[Result]:
+    return get_faq_index().search(query, k)
+
+
+def best_answer(query: str, min_match: float = FAQ_MIN_MATCH, min_score: float = FAQ_MIN_SCORE) -> Optional[str]:
+    for score, match, _, _, answer in search_faqs(query, k=5):
+        if match >= min_match and score >= min_score:
+            return answer
+    return None
+
+
+# ---------- writes that keep the index in step ----------
+def add_faq(question: str, answer: str) -> int:
+    with db.db_connection() as conn:
+        faq_id = conn.execute("INSERT INTO faqs (question, answer) VALUES (?, ?)", (question, answer)).lastrowid
+    if _index is not None:
+        _index.add(faq_id, question, answer)
+    faq_embeddings.on_faq_upsert(faq_id, question)
+    return faq_id
+
+
+def update_faq(faq_id: int, answer: str, question: Optional[str] = None):
+    with db.db_connection() as conn:
+        if question is None:
+            conn.execute("UPDATE faqs SET answer=? WHERE id=?", (answer, faq_id))
+            question = conn.execute("SELECT question FROM faqs WHERE id=?", (faq_id,)).fetchone()
+            question = question[0] if question else ""
+        else:
+            conn.execute("UPDATE faqs SET question=?, answer=? WHERE id=?", (question, answer, faq_id))
+    if _index is not None:
+        _index.update(faq_id, question, answer)
+    faq_embeddings.on_faq_upsert(faq_id, question)
+
+
+def delete_faq(faq_id: int):
+    with db.db_connection() as conn:
+        conn.execute("DELETE FROM faqs WHERE id=?", (faq_id,))
+    if _index is not None:
+        _index.remove(faq_id)
+    faq_embeddings.on_faq_delete(faq_id)
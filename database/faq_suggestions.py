@@ -0,0 +1,96 @@
+# database/faq_suggestions.py
+"""
+Aggregation of unanswered questions into faq_suggestions.
+
+Rows are keyed on question_hash, a hash of the normalized question.
+Normalizing means lower-casing, stripping punctuation and collapsing
+whitespace, so "How to open an FD?" and "how to open an fd" count as the
+same suggestion. The text of the first phrasing seen is kept for review.
+
+Each write is a single INSERT ... ON CONFLICT(question_hash) DO UPDATE.
+It adds to frequency and confidence_sum and moves last_asked in one
+statement, so concurrent sessions cannot lose each other's counts. The
+average confidence is derived at read time:
+
+    confidence_sum / frequency AS avg_confidence
+
+upsert_suggestions() folds a batch first (one row per hash), so the log
+writer issues one executemany per flush.
+"""
+import re
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+UPSERT_SQL = """
+    INSERT INTO faq_suggestions (question, question_hash, frequency, confidence_sum, last_asked)
+    VALUES (?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(question_hash) DO UPDATE SET
+        frequency = frequency + excluded.frequency,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        last_asked = excluded.last_asked
+"""
+
+PENDING_SQL = """
+    SELECT id, question, frequency, confidence_sum / frequency AS avg_confidence, last_asked, status
+    FROM faq_suggestions
+    WHERE status = 'PENDING'
+    ORDER BY frequency DESC
+"""
+
+
+def normalize_question(question: Optional[str]) -> str:
+    return _NON_WORD_RE.sub(" ", (question or "").lower()).strip()
+
+
+def suggestion_hash(question: Optional[str]) -> str:
+    return hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+def fold(rows: Sequence[Tuple[str, float]]) -> List[Tuple[str, str, int, float]]:
+    """(question, confidence) rows -> one (question, hash, count, confidence_sum) per hash."""
+    merged: Dict[str, list] = {}
+    for question, confidence in rows:
+        key = suggestion_hash(question)
+        agg = merged.get(key)
+        if agg is None:
+            merged[key] = [question.strip(), key, 1, float(confidence or 0.0)]
+        else:
+            agg[2] += 1
+            agg[3] += float(confidence or 0.0)
+    return [tuple(v) for v in merged.values()]
+
+
+def upsert_suggestions(conn, rows: Sequence[Tuple[str, float]]):
+    conn.executemany(UPSERT_SQL, fold(rows))
+
+
+def merge_duplicates(conn) -> int:
+    """
+    Give every row its question_hash and fold rows sharing one into a single
+    row. A reviewed (non-PENDING) row wins over pending ones, then the
+    oldest. Returns the number of rows merged away.
+    """
+    keep: Dict[str, int] = {}
+    merged = 0
+    rows = conn.execute(
+        "SELECT id, question FROM faq_suggestions ORDER BY status != 'PENDING' DESC, id"
+    ).fetchall()
+    for row_id, question in rows:
+        key = suggestion_hash(question)
+        if key not in keep:
+            keep[key] = row_id
+            conn.execute("UPDATE faq_suggestions SET question_hash = ? WHERE id = ?", (key, row_id))
+            continue
+        conn.execute("""
+            UPDATE faq_suggestions SET
+                frequency = frequency + (SELECT frequency FROM faq_suggestions WHERE id = :dup),
+                confidence_sum = confidence_sum + (SELECT confidence_sum FROM faq_suggestions WHERE id = :dup),
+                last_asked = MAX(COALESCE(last_asked, ''),
+                                 COALESCE((SELECT last_asked FROM faq_suggestions WHERE id = :dup), ''))
+            WHERE id = :keep
+        """, {"dup": row_id, "keep": keep[key]})
+        conn.execute("DELETE FROM faq_suggestions WHERE id = ?", (row_id,))
+        merged += 1
+    return merged
@@ -0,0 +1,216 @@
+# database/log_writer.py
+"""
+Background writer for append-only logs: chat_logs, faq_suggestions and
+training_logs.
+
+Callers submit() a row and return at once. A single writer thread
+collects rows until it has `batch_size` of them or `flush_interval`
+seconds have passed since the first one. It then writes the whole batch
+in one transaction, one executemany per table (faq_suggestions rows are
+folded per question and upserted). The chat turn no longer waits on a
+commit.
+
+Backpressure: the queue is bounded. When it is full, submit() waits up to
+`put_timeout` and then drops the row and counts it; the chat keeps going
+even if the disk stalls. flush() waits until everything submitted so far
+is written. close() drains the queue and runs at interpreter exit.
+stats() reports queue depth, high-water mark, written / dropped / failed
+rows and flush latency. A batch that adds chat_logs rows invalidates the
+cached admin aggregates (database/analytics.py).
+
+BANKBOT_ASYNC_LOGS=0 writes every row synchronously instead, as before.
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import analytics, db
+from database.faq_suggestions import upsert_suggestions
+
+ASYNC_LOGS = os.getenv("BANKBOT_ASYNC_LOGS", "1") == "1"
+LOG_QUEUE_SIZE = int(os.getenv("BANKBOT_LOG_QUEUE", "10000"))
+LOG_BATCH = int(os.getenv("BANKBOT_LOG_BATCH", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("BANKBOT_LOG_FLUSH_INTERVAL", "0.5"))
+LOG_PUT_TIMEOUT = float(os.getenv("BANKBOT_LOG_PUT_TIMEOUT", "0.05"))
+
+INSERTS = {
+    "chat_logs": "INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) VALUES (?, ?, ?, ?, ?)",
+    "training_logs": "INSERT INTO training_logs (stage, epoch, loss, timestamp) VALUES (?, ?, ?, ?)",
+}
+KINDS = frozenset(INSERTS) | {"faq_suggestions"}
+
+_STOP = object()
+
+
+def write_rows(conn, kind: str, rows: Sequence[tuple]):
+    if kind == "faq_suggestions":
+        upsert_suggestions(conn, rows)
+    else:
+        conn.executemany(INSERTS[kind], rows)
+
+
+class LogWriter:
+    def __init__(self, db_path: Optional[str] = None, maxsize: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, put_timeout: float = LOG_PUT_TIMEOUT,
+                 synchronous: bool = not ASYNC_LOGS):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.synchronous = synchronous
+        self._queue: "queue.Queue" = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._flush_ms = deque(maxlen=500)
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.high_water = 0
+
+    # ---------- producer side ----------
+    def start(self) -> "LogWriter":
+        if not self.synchronous and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bankbot-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, kind: str, row: tuple) -> bool:
+        """Queue one row; False if it was dropped because the queue stayed full."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown log kind: {kind}")
+        if self.synchronous or self._closed:
+            self._write([(kind, row)])
+            return True
+        try:
+            self._queue.put((kind, row), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        depth = self._queue.qsize()
+        if depth > self.high_water:
+            self.high_water = depth
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until every row submitted before this call is committed."""
+        if self.synchronous or self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is None or self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # ---------- writer thread ----------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, markers, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or markers or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if stop:
+                # drain whatever is still queued behind the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        markers.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, tuple]]):
+        by_kind: Dict[str, List[tuple]] = {}
+        for kind, row in batch:
+            by_kind.setdefault(kind, []).append(row)
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                with db.db_connection(self.db_path) as conn:
+                    for kind, rows in by_kind.items():
+                        write_rows(conn, kind, rows)
+                break
+            except Exception:
+                if attempt:
+                    with self._lock:
+                        self.failed += len(batch)
+                    return
+                time.sleep(0.1)
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self._flush_ms.append(1000 * (time.perf_counter() - start))
+        if "chat_logs" in by_kind:
+            analytics.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            flush_ms = np.array(self._flush_ms) if self._flush_ms else None
+            return {
+                "mode": "sync" if self.synchronous else "async",
+                "queued": self._queue.qsize(),
+                "maxsize": self.maxsize,
+                "high_water": self.high_water,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "avg_batch": self.written / self.batches if self.batches else 0.0,
+                "flush_ms_p50": float(np.percentile(flush_ms, 50)) if flush_ms is not None else 0.0,
+                "flush_ms_p99": float(np.percentile(flush_ms, 99)) if flush_ms is not None else 0.0,
+            }
+
+
+_writer: Optional[LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """Process-wide writer; drained at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter().start()
+                atexit.register(_writer.close)
+    return _writer
@@ -1,7 +1,165 @@
+# database/security.py
+"""
+Password hashing with bcrypt, off the request thread.
+
+bcrypt is the most expensive step of every authenticated turn (login,
+balance, transfer, block / unblock). hash and verify run on one bounded,
+process-wide pool. Sessions then queue for BCRYPT_WORKERS slots instead
+of all burning CPU at once. At most BCRYPT_QUEUE more calls may wait
+before callers block.
+
+    hash_password / verify_password                 blocking, same signatures as before
+    hash_password_async / verify_password_async     awaitable, for asyncio callers
+                                                    (they block the loop only while
+                                                    the queue is full)
+    submit_verify                                   concurrent.futures.Future
+
+The bcrypt package releases the GIL while hashing, so the default thread
+pool scales across cores. BANKBOT_BCRYPT_EXECUTOR=process uses worker
+processes instead, for builds that do not.
+
+The work factor is BANKBOT_BCRYPT_ROUNDS. Hashes made at another cost
+still verify. verify_and_rehash() also returns a fresh hash when the
+stored cost differs, so logins move accounts to the current cost
+transparently.
+"""
+import os
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
 import bcrypt
+import numpy as np
+
+BCRYPT_ROUNDS = int(os.getenv("BANKBOT_BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BANKBOT_BCRYPT_WORKERS", str(os.cpu_count() or 1)))
+BCRYPT_QUEUE = int(os.getenv("BANKBOT_BCRYPT_QUEUE", "64"))
+BCRYPT_EXECUTOR = os.getenv("BANKBOT_BCRYPT_EXECUTOR", "thread")
+
+
+def _as_bytes(hashed) -> bytes:
+    return hashed.encode() if isinstance(hashed, str) else bytes(hashed)
+
+
+# module-level so a process pool can pickle them
+def _hash(password: str, rounds: int) -> bytes:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+
+
+def _verify(password: str, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password.encode(), hashed)
+
+
+def hash_rounds(hashed) -> Optional[int]:
+    """Cost factor of a "$2b$12$..." hash, None if it is not one."""
+    parts = _as_bytes(hashed).split(b"$")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed, rounds: Optional[int] = None) -> bool:
+    return hash_rounds(hashed) != (rounds or BCRYPT_ROUNDS)
+
+
+class BcryptPool:
+    """Bounded executor for bcrypt calls, with latency stats."""
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, queue_size: int = BCRYPT_QUEUE,
+                 kind: str = BCRYPT_EXECUTOR):
+        self.workers = max(1, workers)
+        self.kind = kind
+        self._executor: Executor = (ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor)(
+            max_workers=self.workers
+        )
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._lock = threading.Lock()
+        self._ms = deque(maxlen=500)
+        self.in_flight = 0
+        self.calls = 0
+
+    def submit(self, fn, *args) -> Future:
+        """Queue fn(*args); blocks while workers + queue_size calls are already pending."""
+        queued = time.perf_counter()
+        self._slots.acquire()
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._done(queued, None)
+            raise
+        future.add_done_callback(lambda f: self._done(queued, f))
+        return future
+
+    def _done(self, queued: float, future: Optional[Future]):
+        with self._lock:
+            self.in_flight -= 1
+            if future is not None:
+                self._ms.append(1000 * (time.perf_counter() - queued))
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ms = np.array(self._ms) if self._ms else None
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "rounds": BCRYPT_ROUNDS,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "ms_p50": float(np.percentile(ms, 50)) if ms is not None else 0.0,
+                "ms_p99": float(np.percentile(ms, 99)) if ms is not None else 0.0,
+            }
+
+
+_pool: Optional[BcryptPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_bcrypt_pool() -> BcryptPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BcryptPool()
+    return _pool
+
+
+# ---------- blocking API ----------
+def hash_password(password: str, rounds: Optional[int] = None) -> bytes:
+    return get_bcrypt_pool().submit(_hash, password, rounds or BCRYPT_ROUNDS).result()
+
+
+def verify_password(password: str, hashed) -> bool:
+    return submit_verify(password, hashed).result()
+
+
+def submit_verify(password: str, hashed) -> Future:
+    return get_bcrypt_pool().submit(_verify, password, _as_bytes(hashed))
+
+
+def verify_and_rehash(password: str, hashed, rounds: Optional[int] = None) -> Tuple[bool, Optional[bytes]]:
+    """(ok, new_hash): new_hash is set only when the password matched and the stored cost is outdated."""
+    if not verify_password(password, hashed):
+        return False, None
+    if needs_rehash(hashed, rounds):
+        return True, hash_password(password, rounds)
+    return True, None
+
+
+# ---------- asyncio API ----------
+async def hash_password_async(password: str, rounds: Optional[int] = None) -> bytes:
+    return await asyncio.wrap_future(get_bcrypt_pool().submit(_hash, password, rounds or BCRYPT_ROUNDS))
 
-def hash_password(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
 
-def verify_password(password: str, hashed: bytes) -> bool:
-    return bcrypt.checkpw(password.encode(), hashed)
\ No newline at end of file
+async def verify_password_async(password: str, hashed) -> bool:
+    return await asyncio.wrap_future(submit_verify(password, hashed))
@@ -0,0 +1,12 @@
+import pytest
+
+from database import db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fresh, fully migrated database file; its pooled connections are closed afterwards."""
+    path = str(tmp_path / "bank.db")
+    db.init_db(path)
+    yield path
+    db.get_pool(path).close_all()
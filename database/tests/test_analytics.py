@@ -0,0 +1,89 @@
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from database import analytics, db
+from database.analytics import AnalyticsCache
+from database.log_writer import LogWriter
+
+ROWS = [
+    ("2025-01-01 09:00:00", "1001", "balance?", "check_balance", 0.95),
+    ("2025-01-01 23:59:59", "1002", "block card", "block_card", 0.7),
+    ("2025-01-02 00:00:00", "1001", "balance", "check_balance", 0.3),
+    ("2025-01-03 12:00:00", "1003", "hello", None, None),
+    ("2025-01-04 08:30:00", "1002", "fd rate", "faq", 0.5),
+    ("2025-01-04 18:00:00", "1004", "card", "block_card", 0.81),
+]
+
+
+@pytest.fixture
+def db_path(db_path):
+    with db.db_connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) VALUES (?, ?, ?, ?, ?)",
+            ROWS,
+        )
+    return db_path
+
+
+def test_aggregates_match_python(db_path):
+    with db.db_connection(db_path) as conn:
+        overview = analytics.summary(conn)
+        assert overview["total"] == 6 and overview["active_users"] == 4 and overview["unique_intents"] == 3
+        assert overview["last_activity"] == "2025-01-04 18:00:00"
+        assert analytics.intent_counts(conn) == [("block_card", 2), ("check_balance", 2), ("faq", 1)]
+        assert analytics.intent_counts(conn, limit=1) == [("block_card", 2)]
+        assert analytics.daily_counts(conn) == sorted(Counter(r[0][:10] for r in ROWS).items())
+        assert analytics.confidence_mix(conn) == dict(zip(analytics.CONFIDENCE_BUCKETS, (1, 2, 2)))
+        assert analytics.intent_names(conn) == ["block_card", "check_balance", "faq"]
+
+
+def test_window_is_inclusive_of_both_days(db_path):
+    with db.db_connection(db_path) as conn:
+        # the last second of Jan 1 is in, midnight of Jan 2 is out
+        assert analytics.summary(conn, date(2025, 1, 1), date(2025, 1, 1))["total"] == 2
+        assert analytics.daily_counts(conn, "2025-01-02", "2025-01-04", "check_balance") == [("2025-01-02", 1)]
+        assert analytics.daily_intents(conn, "2025-01-04", None) == [
+            ("2025-01-04", "block_card", 1), ("2025-01-04", "faq", 1)]
+        assert [r[0] for r in analytics.recent_logs(conn, limit=2)] == [6, 5]
+
+
+def test_cache_serves_until_invalidated(db_path, monkeypatch):
+    cache = AnalyticsCache(ttl=60)
+    monkeypatch.setattr(analytics, "_cache", cache)
+    assert analytics.query("summary", db_path=db_path)["total"] == 6
+    with db.db_connection(db_path) as conn:
+        conn.execute("INSERT INTO chat_logs (timestamp, intent) VALUES ('2025-01-05 10:00:00', 'faq')")
+    assert analytics.query("summary", db_path=db_path)["total"] == 6  # stale until told otherwise
+    analytics.invalidate()
+    assert analytics.query("summary", db_path=db_path)["total"] == 7
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["invalidations"] == 1
+
+
+def test_cache_expires_after_ttl():
+    cache = AnalyticsCache(ttl=0)
+    calls = []
+    cache.get("k", lambda: calls.append(1))
+    cache.get("k", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = AnalyticsCache(ttl=60)
+    cache.get("k", lambda: cache.invalidate() or "stale")
+    assert cache.get("k", lambda: "fresh") == "fresh"
+
+
+def test_log_writer_flush_invalidates(db_path, monkeypatch):
+    cache = AnalyticsCache(ttl=60)
+    monkeypatch.setattr(analytics, "_cache", cache)
+    writer = LogWriter(db_path, synchronous=False).start()
+    writer.submit("training_logs", ("TRAIN", 1, 0.5, "2025-01-01 10:00:00"))
+    writer.flush()
+    assert cache.generation == 0
+    writer.submit("chat_logs", ("2025-01-05 10:00:00", "1001", "q", "faq", 0.9))
+    writer.flush()
+    assert cache.generation == 1
+    writer.close()
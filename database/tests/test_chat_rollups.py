@@ -0,0 +1,78 @@
+import random
+import sqlite3
+
+import pytest
+
+from database import chat_rollups, db
+
+INTENTS = ["check_balance", "block_card", "faq", None]
+
+
+def _random_logs(n, seed=5):
+    rng = random.Random(seed)
+    return [(f"2025-01-{rng.randint(1, 9):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+             rng.choice(["1001", "1002", "1003", None]), "q", rng.choice(INTENTS),
+             rng.choice([None, 0.1, 0.5, 0.8, 0.81, 0.99, rng.random()])) for _ in range(n)]
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO chat_logs (timestamp, account_no, user_query, intent, confidence) VALUES (?, ?, ?, ?, ?)", rows
+    )
+
+
+def _dump(conn):
+    # conf_sum is rounded: the trigger and the backfill add the same floats in a different order
+    return {t: [tuple(round(v, 9) if isinstance(v, float) else v for v in row)
+                for row in conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2")]
+            for t in chat_rollups.ROLLUP_TABLES}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = sqlite3.connect(str(tmp_path / "bank.db"))
+    db._create_tables(c)
+    db.migrate(c)
+    yield c
+    c.close()
+
+
+def test_trigger_matches_backfill(conn):
+    rows = _random_logs(2000)
+    for i in range(0, len(rows), 300):  # several batches, as the log writer would
+        _insert(conn, rows[i:i + 300])
+    conn.commit()
+    incremental = _dump(conn)
+    chat_rollups.backfill(conn)
+    assert _dump(conn) == incremental
+    assert set(chat_rollups.check(conn).values()) == {2000}
+
+
+def test_bucket_edges_and_nulls(conn):
+    _insert(conn, [("2025-01-01 10:15:00", None, "q", None, None),
+                   ("2025-01-01 10:45:00", "1001", "q", "faq", 0.5),
+                   ("2025-01-01 11:00:00", "1001", "q", "faq", 0.8),
+                   ("2025-01-01 11:30:00", "1002", "q", "faq", 0.8001)])
+    daily = conn.execute("SELECT intent, queries, conf_n, low, medium, high, first_at, last_at "
+                         "FROM chat_rollup_daily ORDER BY intent").fetchall()
+    assert daily == [("", 1, 0, 0, 0, 0, "2025-01-01 10:15:00", "2025-01-01 10:15:00"),
+                     ("faq", 3, 3, 0, 2, 1, "2025-01-01 10:45:00", "2025-01-01 11:30:00")]
+    assert conn.execute("SELECT hour, SUM(queries) FROM chat_rollup_hourly GROUP BY hour").fetchall() == [
+        ("2025-01-01 10", 2), ("2025-01-01 11", 2)]
+    assert dict(conn.execute("SELECT account_no, queries FROM chat_rollup_account_days")) == {
+        "": 1, "1001": 2, "1002": 1}
+    assert conn.execute("SELECT queries, first_at, last_at FROM chat_rollup_accounts WHERE account_no = '1001'"
+                        ).fetchone() == (2, "2025-01-01 10:45:00", "2025-01-01 11:00:00")
+
+
+def test_migration_rolls_up_existing_logs(tmp_path):
+    c = sqlite3.connect(str(tmp_path / "legacy.db"))
+    db._create_tables(c)
+    db.migrate(c, target=7)
+    _insert(c, _random_logs(500))
+    c.commit()
+    db.migrate(c)
+    assert set(chat_rollups.check(c).values()) == {500}
+    _insert(c, _random_logs(10, seed=9))
+    assert set(chat_rollups.check(c).values()) == {510}
+    c.close()
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from database import db
+
+
+@pytest.fixture
+def pool(tmp_path):
+    p = db.ConnectionPool(str(tmp_path / "bank.db"), size=2, timeout=0.2)
+    with p.connection() as conn:
+        db._create_tables(conn)
+    yield p
+    p.close_all()
+
+
+def test_pragmas_applied(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_commit_on_exit_and_rollback_on_error(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO users(name) VALUES ('alice')")
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO users(name) VALUES ('bob')")
+            raise RuntimeError("boom")
+    with pool.connection() as conn:
+        names = [r[0] for r in conn.execute("SELECT name FROM users")]
+    assert names == ["alice"]
+
+
+def test_nested_blocks_share_one_connection(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+    assert pool.stats()["open"] == 1
+
+
+def test_pool_is_bounded(pool):
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for t in threads:
+        t.start()
+        held.wait()
+        held.clear()
+    try:
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
+    assert pool.stats() == {"size": 2, "open": 2, "idle": 2}
+
+
+def test_bank_crud_uses_pool(tmp_path, monkeypatch):
+    from database import bank_crud, transfers
+
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "crud.db"))
+    monkeypatch.setattr(bank_crud, "hash_password", lambda p: p.encode())
+    monkeypatch.setattr(bank_crud, "verify_password", lambda p, h: p.encode() == h)
+    monkeypatch.setattr(transfers, "verify_password", lambda p, h: p.encode() == h)
+    db.init_db()
+    bank_crud.create_account("a", "1001", "Savings", 500, "pw")
+    bank_crud.create_account("b", "1002", "Savings", 0, "pw")
+    assert bank_crud.transfer_money("1001", "1002", 200, "bad") == "❌ Incorrect password"
+    assert bank_crud.transfer_money("1001", "1002", 200, "pw") == "✅ Transfer Successful"
+    assert bank_crud.get_account("1002")[3] == 200
+    assert len(bank_crud.get_transaction_history("1001")) == 1
+    db.get_pool().close_all()
+
+
+def test_card_password_checked_without_a_connection_held(tmp_path, monkeypatch):
+    from database import bank_crud
+
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "cards.db"))
+    monkeypatch.setattr(bank_crud, "hash_password", lambda p: p.encode())
+
+    def verify(p, h):
+        assert db.get_pool()._local.conn is None, "bcrypt ran with a pooled connection checked out"
+        return p.encode() == h
+
+    monkeypatch.setattr(bank_crud, "verify_password", verify)
+    db.init_db()
+    bank_crud.create_account("a", "1001", "Savings", 0, "pw")
+    bank_crud.add_card("1001", "4000123412345678", "a", "Visa", "Debit", "12", "2030")
+    assert bank_crud.block_card_by_last6_secure("1001", "345678", "bad").startswith("❌ Incorrect password")
+    assert bank_crud.block_card_by_last6_secure("1001", "345678", "pw").startswith("🚨")
+    assert bank_crud.unblock_card_by_last6("1001", "345678", "pw").startswith("✅")
+    assert bank_crud.get_cards("1001")[0][-1] == "ACTIVE"
+    db.get_pool().close_all()
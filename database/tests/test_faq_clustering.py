@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from database import db
+from database.faq_clustering import (
+    GROUPED_PENDING_SQL, assign_centers, assign_new, band_keys, priorities, rebuild,
+    set_cluster_status, signatures, similarity,
+)
+from database.faq_suggestions import upsert_suggestions
+
+SUGGESTIONS = [
+    ("How do I block my debit card?", 5),
+    ("block debit card please", 3),
+    ("Block my debit cards!!", 1),
+    ("how can i block debit card immediately", 2),
+    ("What is the interest rate on a fixed deposit", 4),
+    ("fixed deposit interest rate?", 2),
+    ("Interest rates for fixed deposits", 1),
+    ("hello?", 1),
+]
+
+
+@pytest.fixture
+def db_path(db_path):
+    with db.db_connection(db_path) as conn:
+        for question, times in SUGGESTIONS:
+            upsert_suggestions(conn, [(question, 0.3)] * times)
+    return db_path
+
+
+def _clusters(path):
+    with db.db_connection(path) as conn:
+        return dict(conn.execute("SELECT question, cluster_id FROM faq_suggestions"))
+
+
+def test_signature_similarity_tracks_jaccard():
+    sig, nonempty = signatures(["block debit card", "Block debit cards?", "open fixed deposit", "how do i?"])
+    assert list(nonempty) == [True, True, True, False]
+    assert similarity(sig[0], sig[1]) == 1.0
+    assert similarity(sig[0], sig[2]) < 0.2
+
+
+def test_centers_do_not_chain():
+    # J(a, b) = J(b, c) = 4/6, but J(a, c) = 2/6: c must not ride on b into a's cluster
+    questions = ["alpha bravo charlie delta", "alpha bravo charlie delta echo foxtrot", "charlie delta echo foxtrot"]
+    sig, nonempty = signatures(questions)
+    center = assign_centers(sig, band_keys(sig), nonempty, np.arange(3))
+    assert list(center) == [0, 0, 2]
+
+
+def test_priorities_prefer_frequency_then_id():
+    assert list(priorities(np.array([10, 11, 12]), np.array([1, 5, 5]))) == [2, 0, 1]
+
+
+def test_rebuild_groups_paraphrases_and_picks_most_asked(db_path):
+    stats = rebuild(db_path)
+    assert stats["suggestions"] == len(SUGGESTIONS)
+    clusters = _clusters(db_path)
+    block = {clusters[q] for q, _ in SUGGESTIONS[:4]}
+    fd = {clusters[q] for q, _ in SUGGESTIONS[4:7]}
+    assert len(block) == 1 and len(fd) == 1 and block != fd
+    with db.db_connection(db_path) as conn:
+        rep_question = conn.execute("SELECT question FROM faq_suggestions WHERE id = ?", (block.pop(),)).fetchone()[0]
+        grouped = conn.execute(GROUPED_PENDING_SQL).fetchall()
+    assert rep_question == "How do I block my debit card?"
+    assert [(q, freq, variants) for _, q, _, freq, _, variants, _ in grouped][:2] == [
+        ("How do I block my debit card?", 11, 4), ("What is the interest rate on a fixed deposit", 7, 3),
+    ]
+    assert clusters["hello?"] == len(SUGGESTIONS)  # on its own
+
+
+def test_new_suggestions_join_incrementally(db_path):
+    rebuild(db_path)
+    with db.db_connection(db_path) as conn:
+        upsert_suggestions(conn, [("please block my debit card now", 0.2), ("How do I apply for a home loan", 0.1)])
+        assert assign_new(conn) == 2
+        assert assign_new(conn) == 0
+    clusters = _clusters(db_path)
+    assert clusters["please block my debit card now"] == clusters["How do I block my debit card?"]
+    with db.db_connection(db_path) as conn:
+        loan_id = conn.execute("SELECT id FROM faq_suggestions WHERE question LIKE '%home loan'").fetchone()[0]
+    assert clusters["How do I apply for a home loan"] == loan_id
+
+
+def test_cluster_status_applies_to_every_phrasing(db_path):
+    rebuild(db_path)
+    clusters = _clusters(db_path)
+    with db.db_connection(db_path) as conn:
+        assert set_cluster_status(conn, clusters["How do I block my debit card?"], "APPROVED") == 4
+        pending = [q for _, q, *_ in conn.execute(GROUPED_PENDING_SQL)]
+    assert "How do I block my debit card?" not in pending and len(pending) == 2
+
+
+def test_new_phrasing_of_an_approved_cluster_shows_itself(db_path):
+    rebuild(db_path)
+    cluster = _clusters(db_path)["How do I block my debit card?"]
+    with db.db_connection(db_path) as conn:
+        set_cluster_status(conn, cluster, "APPROVED")
+        upsert_suggestions(conn, [("please block my debit card now", 0.2)] * 2)
+        assign_new(conn)
+        grouped = {row[0]: row for row in conn.execute(GROUPED_PENDING_SQL)}
+    # the admin sees the pending phrasing, and knows the FAQ already exists
+    assert grouped[cluster][1:4] == ("please block my debit card now", "APPROVED", 2)
@@ -0,0 +1,116 @@
+import sys
+
+import numpy as np
+import pytest
+
+from database import db, faq_embeddings, faq_search
+from database.faq_embeddings import FAQEmbeddingIndex
+
+
+class BagOfWordsEncoder:
+    """Deterministic stand-in for the transformer: hashed bag of words."""
+
+    name = "test-bow"
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        texts = list(texts)
+        self.calls.append(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for tok in faq_search.tokenize(t):
+                out[i, sum(map(ord, tok)) % self.dim] += 1.0
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+@pytest.fixture
+def faq_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "bank.db")
+    monkeypatch.setattr(db, "DB_NAME", path)
+    db.init_db()
+    with db.db_connection() as conn:
+        conn.executemany("INSERT INTO faqs (id, question, answer) VALUES (?, ?, ?)", [
+            (1, "What is the minimum balance for savings?", "₹1,000"),
+            (2, "How do I reset my net banking password?", "Use Forgot password"),
+            (3, "What are demand draft charges?", "₹50 per draft"),
+        ])
+    yield path
+    db.get_pool(path).close_all()
+
+
+def test_sync_persists_and_reembeds_only_changes(faq_db, tmp_path):
+    enc = BagOfWordsEncoder()
+    idx = FAQEmbeddingIndex(enc, db_path=faq_db)
+    assert idx.sync() == {"kept": 0, "embedded": 3, "removed": 0}
+    assert (tmp_path / "faq_embeddings.test_bow.npy").exists()
+
+    with db.db_connection() as conn:
+        conn.execute("UPDATE faqs SET answer='₹2,000' WHERE id=1")                       # answer only
+        conn.execute("UPDATE faqs SET question='Fee for a demand draft?' WHERE id=3")    # question edit
+        conn.execute("DELETE FROM faqs WHERE id=2")
+        conn.execute("INSERT INTO faqs (id, question, answer) VALUES (4, 'Open a fixed deposit', 'Deposits menu')")
+
+    # a fresh process reuses the vectors on disk
+    enc2 = BagOfWordsEncoder()
+    idx2 = FAQEmbeddingIndex(enc2, db_path=faq_db)
+    assert idx2.sync() == {"kept": 1, "embedded": 2, "removed": 1}
+    assert sorted(enc2.calls[0]) == ["Fee for a demand draft?", "Open a fixed deposit"]
+    assert len(idx2) == 3
+    # the deleted FAQ's slot was reused
+    assert sorted(s for s, _ in idx2._slots.values()) == [0, 1, 2]
+
+
+def test_search_threshold_and_answer(faq_db):
+    idx = FAQEmbeddingIndex(BagOfWordsEncoder(), db_path=faq_db)
+    idx.sync()
+    hits = idx.search("savings minimum balance", k=2, threshold=0.5)
+    assert hits[0][1] == 1 and hits[0][0] > 0.9
+    assert idx.search("weather in paris", threshold=0.5) == []
+    assert idx.answer("reset password for net banking", threshold=0.5) == "Use Forgot password"
+
+
+def test_admin_hooks_patch_index(faq_db, monkeypatch):
+    enc = BagOfWordsEncoder()
+    idx = FAQEmbeddingIndex(enc, db_path=faq_db)
+    idx.sync()
+    monkeypatch.setattr(faq_embeddings, "_index", idx)
+    faq_search.reset_faq_index()
+
+    new_id = faq_search.add_faq("Locker rent per year", "₹3,000")
+    assert idx.search("yearly locker rent", threshold=0.5)[0][1] == new_id
+    calls = len(enc.calls)
+    faq_search.update_faq(new_id, "₹3,500")
+    assert len(enc.calls) == calls  # answer-only edit: nothing re-encoded
+    assert idx.answer("locker rent", threshold=0.5) == "₹3,500"
+    monkeypatch.setattr(faq_embeddings, "USE_SEMANTIC_FAQ", True)
+    assert faq_embeddings.semantic_answer("Locker rent per year") == "₹3,500"  # the chatbot's entry point
+    faq_search.delete_faq(new_id)
+    assert idx.search("locker rent", threshold=0.5) == []
+
+
+def test_semantic_step_is_off_without_sentence_transformers(faq_db, monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    monkeypatch.setattr(faq_embeddings, "_index", None)
+    monkeypatch.setattr(faq_embeddings, "load_error", None)
+    # no silent fall back to mean-pooled DistilBERT vectors
+    assert faq_embeddings.get_faq_embeddings() is None
+    assert "sentence-transformers" in faq_embeddings.load_error
+    assert faq_embeddings.semantic_answer("savings minimum balance") is None
+
+
+def test_calibrate_picks_the_lowest_precise_threshold():
+    pairs = [
+        ("savings minimum balance", "What is the minimum balance for savings?", True),
+        ("net banking password reset", "How do I reset my net banking password?", True),
+        ("minimum balance for current account", "What is the minimum balance for savings?", False),
+        ("weather in paris", "What are demand draft charges?", False),
+    ]
+    rows = faq_embeddings.calibrate(BagOfWordsEncoder(), pairs, [0.3, 0.6, 0.8])
+    by_th = {r["threshold"]: r for r in rows}
+    # the shared-words negative scores 0.58 with this encoder
+    assert by_th[0.3]["precision"] == pytest.approx(2 / 3) and by_th[0.3]["recall"] == 1.0
+    assert by_th[0.6]["precision"] == 1.0 and by_th[0.6]["recall"] == 1.0
+    assert faq_embeddings.pick_threshold(rows, min_precision=0.95) == 0.6
@@ -0,0 +1,139 @@
+import sqlite3
+
+import pytest
+
+from database import db, faq_search
+from database.faq_search import BM25Index, FTS5Index, tokenize
+
+FAQS = [
+    (1, "What is the minimum balance for a savings account?", "₹1,000 for regular savings."),
+    (2, "How do I reset my net banking password?", "Use 'Forgot password' on the login page."),
+    (3, "What are the charges for a demand draft?", "₹50 per draft up to ₹10,000."),
+    (4, "How to block my debit card?", "Say 'block my card' in the chat."),
+]
+
+# short questions, as the admin panel actually stores them
+SHORT_FAQS = [
+    (1, "ATM near me", "Use the branch locator."),
+    (5, "How to open a new account ", "Visit any branch with your KYC documents."),
+    (8, "what is the capital of telangana", "Hyderabad"),
+    (9, "what is the full form of tcs", "Tata Consultancy Services"),
+    (10, "what is egg", "Food Item"),
+]
+
+# (message, FAQ it must not be answered with): every word of the FAQ is in
+# the message, but most of the message is about something else
+UNRELATED = [
+    ("I want to open a fixed deposit account", 5),
+    ("block card near atm", 1),
+    ("how many eggs in a dozen", 10),
+]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("What are the Charges for cards?") == ["charge", "card"]
+
+
+def test_bm25_ranks_and_scores_match():
+    idx = BM25Index()
+    for row in FAQS:
+        idx.add(*row)
+    top = idx.search("minimum balance savings account", k=2)
+    assert top[0][2] == 1 and top[0][1] == pytest.approx(1.0)
+    # paraphrase: partial coverage, still ranked first
+    para = idx.search("savings minimum balance", k=1)[0]
+    assert para[2] == 1 and 0.5 < para[1] < 1.0
+    assert idx.search("weather tomorrow") == []
+
+
+def test_bm25_incremental_updates():
+    idx = BM25Index()
+    for row in FAQS:
+        idx.add(*row)
+    idx.update(3, FAQS[2][1], "₹60 per draft.")
+    assert idx.search("demand draft charges")[0][4] == "₹60 per draft."
+    idx.update(3, "Fee for a cheque book?", "Free.")
+    assert idx.search("demand draft") == []
+    assert idx.search("cheque book fee")[0][2] == 3
+    idx.remove(4)
+    assert len(idx) == 3 and idx.search("block debit card") == []
+
+    fresh = BM25Index()
+    for faq_id, (q, a) in idx._docs.items():
+        fresh.add(faq_id, q, a)
+    for q in ("cheque book fee", "minimum balance savings", "reset password net banking"):
+        assert [(round(r[0], 4), r[2]) for r in fresh.search(q)] == [(round(r[0], 4), r[2]) for r in idx.search(q)]
+
+
+@pytest.fixture
+def faq_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "faq.db")
+    monkeypatch.setattr(db, "DB_NAME", path)
+    db.init_db()
+    with db.db_connection() as conn:
+        conn.executemany("INSERT INTO faqs (id, question, answer) VALUES (?, ?, ?)", FAQS)
+    faq_search.reset_faq_index()
+    yield path
+    faq_search.reset_faq_index()
+    db.get_pool(path).close_all()
+
+
+def test_admin_edits_patch_live_index(faq_db):
+    assert faq_search.best_answer("what's the minimum balance for savings account") == FAQS[0][2]
+    new_id = faq_search.add_faq("How do I open a fixed deposit?", "From the Deposits menu.")
+    assert faq_search.best_answer("open fixed deposit online") == "From the Deposits menu."
+    faq_search.update_faq(new_id, "Visit any branch.")
+    assert faq_search.best_answer("open fixed deposit online") == "Visit any branch."
+    faq_search.delete_faq(new_id)
+    assert faq_search.best_answer("open fixed deposit online") is None
+
+
+def _short_faq_db(path):
+    db.init_db(path)
+    with db.db_connection(path) as conn:
+        conn.executemany("INSERT INTO faqs (id, question, answer) VALUES (?, ?, ?)", SHORT_FAQS)
+
+
+@pytest.mark.parametrize("message,faq_id", UNRELATED)
+def test_short_faqs_do_not_answer_longer_unrelated_messages(message, faq_id):
+    idx = BM25Index()
+    for row in SHORT_FAQS:
+        idx.add(*row)
+    top = idx.search(message, k=1)[0]
+    assert top[2] == faq_id and top[1] < faq_search.FAQ_MIN_MATCH
+    assert idx.search("atm near me", k=1)[0][1] == pytest.approx(1.0)
+
+
+def test_best_answer_needs_match_and_score(faq_db):
+    assert faq_search.best_answer("block my card") == FAQS[3][2]
+    assert faq_search.best_answer("block my card", min_score=100.0) is None
+
+
+def _has_fts5():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+@pytest.mark.skipif(not _has_fts5(), reason="SQLite built without FTS5")
+def test_fts5_backend_follows_table(faq_db):
+    idx = FTS5Index()
+    assert idx.search("reset net banking password")[0][2] == 2
+    faq_search.update_faq(2, "Call support.")
+    assert idx.search("reset net banking password")[0][4] == "Call support."
+    faq_search.delete_faq(2)
+    assert all(r[2] != 2 for r in idx.search("reset net banking password"))
+
+
+@pytest.mark.skipif(not _has_fts5(), reason="SQLite built without FTS5")
+def test_fts5_match_agrees_with_bm25(tmp_path):
+    path = str(tmp_path / "short.db")
+    _short_faq_db(path)
+    fts, bm25 = FTS5Index(path), faq_search.build_index("bm25", path)
+    for message in [m for m, _ in UNRELATED] + ["atm near me", "how to open new account", "what is egg"]:
+        assert [(r[2], round(r[1], 6)) for r in fts.search(message, k=1)] == \
+            [(r[2], round(r[1], 6)) for r in bm25.search(message, k=1)]
+    assert fts.search("how many eggs in a dozen", k=1)[0][1] < faq_search.FAQ_MIN_MATCH
+    db.get_pool(path).close_all()
@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database import db
+from database.faq_suggestions import PENDING_SQL, fold, normalize_question, suggestion_hash, upsert_suggestions
+
+
+def test_trivial_variants_share_a_hash():
+    assert normalize_question("  How to open an FD?? ") == "how to open an fd"
+    assert suggestion_hash("How to open an FD?") == suggestion_hash("how to  open an fd")
+    assert suggestion_hash("How to open an RD?") != suggestion_hash("How to open an FD?")
+
+
+def test_fold_keeps_first_phrasing_and_sums():
+    folded = fold([("How to open an FD?", 0.2), ("how to open an fd", 0.4), ("What is NACH", 0.1)])
+    assert [(q, n, round(c, 6)) for q, _, n, c in folded] == [("How to open an FD?", 2, 0.6), ("What is NACH", 1, 0.1)]
+
+
+def test_concurrent_upserts_lose_nothing(db_path):
+    def session():
+        for _ in range(50):
+            with db.db_connection(db_path) as conn:
+                upsert_suggestions(conn, [("What is NACH?", 0.5)])
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with db.db_connection(db_path) as conn:
+        rows = conn.execute(PENDING_SQL).fetchall()
+    assert len(rows) == 1
+    _, question, freq, avg, _, status = rows[0]
+    assert question == "What is NACH?" and freq == 400 and avg == pytest.approx(0.5) and status == "PENDING"
+
+
+def test_migration_merges_legacy_duplicates(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    db._create_tables(conn)
+    db.migrate(conn, target=4)
+    conn.executemany(
+        "INSERT INTO faq_suggestions (question, frequency, avg_confidence, last_asked, status) VALUES (?, ?, ?, ?, ?)",
+        [("How to open an FD?", 2, 0.3, "2025-01-01 10:00:00", "PENDING"),
+         ("how to open an fd", 1, 0.6, "2025-02-01 10:00:00", "REJECTED"),
+         ("What is NACH", 3, 0.2, "2025-01-05 10:00:00", "PENDING")],
+    )
+    conn.commit()
+    db.migrate(conn)
+    rows = conn.execute(
+        "SELECT question, frequency, confidence_sum, last_asked, status FROM faq_suggestions ORDER BY question"
+    ).fetchall()
+    assert [r[0] for r in rows] == ["What is NACH", "how to open an fd"]
+    nach, fd = rows
+    # the reviewed row survives and absorbs the pending one
+    assert fd[1] == 3 and fd[2] == pytest.approx(1.2) and fd[3] == "2025-02-01 10:00:00" and fd[4] == "REJECTED"
+    assert nach[1] == 3 and nach[2] == pytest.approx(0.6)
+    cols = [c[1] for c in conn.execute("PRAGMA table_info(faq_suggestions)")]
+    assert "avg_confidence" not in cols
+    upsert_suggestions(conn, [("What is NACH?", 1.0)])
+    assert conn.execute("SELECT frequency FROM faq_suggestions WHERE question='What is NACH'").fetchone()[0] == 4
+    conn.close()
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from database import db
+from database.log_writer import LogWriter
+
+
+def _rows(path, sql):
+    with db.db_connection(path) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_batches_and_flushes_all_kinds(db_path):
+    writer = LogWriter(db_path, batch_size=100, flush_interval=5.0, synchronous=False).start()
+    for i in range(250):
+        assert writer.submit("chat_logs", (f"2025-01-01 10:00:{i % 60:02d}", "1001", f"q{i}", "faq", 0.4))
+    writer.submit("training_logs", ("TRAIN", 1, 0.5, "2025-01-01 10:00:00"))
+    writer.submit("faq_suggestions", ("what is nach", 0.2))
+    writer.submit("faq_suggestions", ("what is nach", 0.4))
+    assert writer.flush()
+    assert _rows(db_path, "SELECT COUNT(*) FROM chat_logs")[0][0] == 250
+    assert _rows(db_path, "SELECT COUNT(*) FROM training_logs")[0][0] == 1
+    stats = writer.stats()
+    assert stats["written"] == 253 and stats["batches"] >= 3 and stats["dropped"] == 0
+    writer.close()
+
+
+def test_faq_suggestion_running_average_matches_per_row_updates(db_path):
+    writer = LogWriter(db_path, synchronous=False).start()
+    writer.submit("faq_suggestions", ("what is nach", 0.2))
+    writer.flush()
+    writer.submit("faq_suggestions", ("what is nach", 0.4))
+    writer.submit("faq_suggestions", ("what is nach", 0.6))
+    writer.flush()
+    freq, avg = _rows(db_path, "SELECT frequency, confidence_sum / frequency FROM faq_suggestions")[0]
+    assert freq == 3 and avg == pytest.approx(0.4)
+    writer.close()
+
+
+def test_full_queue_drops_instead_of_blocking(db_path):
+    writer = LogWriter(db_path, maxsize=3, put_timeout=0.01, synchronous=False)  # not started: nothing drains
+    results = [writer.submit("chat_logs", ("t", "1", "q", "i", 0.1)) for _ in range(5)]
+    assert results == [True, True, True, False, False]
+    assert writer.stats()["dropped"] == 2 and writer.stats()["high_water"] == 3
+
+
+def test_close_drains_queue(db_path):
+    writer = LogWriter(db_path, flush_interval=10.0, synchronous=False).start()
+    threads = [threading.Thread(target=lambda: [writer.submit("chat_logs", ("t", "1", "q", "i", 0.1))
+                                                for _ in range(50)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.close()
+    assert _rows(db_path, "SELECT COUNT(*) FROM chat_logs")[0][0] == 200
+    # after close, rows are written inline rather than lost
+    writer.submit("chat_logs", ("t", "1", "late", "i", 0.1))
+    assert _rows(db_path, "SELECT COUNT(*) FROM chat_logs")[0][0] == 201
+
+
+def test_unknown_kind_rejected(db_path):
+    with pytest.raises(ValueError):
+        LogWriter(db_path, synchronous=True).submit("accounts", ())
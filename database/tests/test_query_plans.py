@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+from database import db
+from database.faq_clustering import GROUPED_PENDING_SQL
+from database.faq_suggestions import PENDING_SQL
+
+# (name, sql, params) — the lookups that run on every chat turn or admin page load
+HOT_QUERIES = [
+    ("transaction history",
+     "SELECT from_account, to_account, amount, timestamp FROM transactions "
+     "WHERE from_account = ? OR to_account = ? ORDER BY timestamp DESC",
+     ("1001", "1001")),
+    ("transaction page debits",
+     "SELECT id, from_account, to_account, amount, timestamp FROM transactions "
+     "WHERE from_account = ? AND timestamp >= ? AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+     ("1001", "2025-01-01", "2025-02-01", 10**9, 26)),
+    ("transaction page credits",
+     "SELECT id, from_account, to_account, amount, timestamp FROM transactions "
+     "WHERE to_account = ? AND from_account IS NOT ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+     ("1001", "1001", 26)),
+    ("transaction totals",
+     "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions WHERE from_account = ? AND timestamp < ?",
+     ("1001", "2025-02-01")),
+    ("get cards",
+     "SELECT card_number, holder_name, card_type, card_category, expiry_month, expiry_year, cvv_masked, status "
+     "FROM cards WHERE account_number = ?",
+     ("1001",)),
+    ("block all cards",
+     "UPDATE cards SET status = 'BLOCKED' WHERE account_number = ?",
+     ("1001",)),
+    ("block by last digits",
+     "SELECT card_number FROM cards WHERE account_number = ? AND status = 'ACTIVE' AND substr(card_number, -4) = ?",
+     ("1001", "1234")),
+    ("block by category",
+     "UPDATE cards SET status = 'BLOCKED' WHERE account_number = ? AND card_category = ?",
+     ("1001", "Debit")),
+    ("account lookup",
+     "SELECT account_number, user_name, account_type, balance, password_hash FROM accounts WHERE account_number=?",
+     ("1001",)),
+    ("chat logs in window",
+     "SELECT * FROM chat_logs WHERE timestamp >= ? AND timestamp < ?",
+     ("2025-01-01", "2025-02-01")),
+    ("intent counts in window",
+     "SELECT COUNT(*), AVG(confidence) FROM chat_logs WHERE intent = ? AND timestamp >= ?",
+     ("check_balance", "2025-01-01")),
+    ("intent frequency",
+     "SELECT intent, COUNT(*) FROM chat_logs WHERE intent IS NOT NULL GROUP BY intent",
+     ()),
+    ("rollup daily window",
+     "SELECT day, SUM(queries), SUM(low), SUM(medium), SUM(high) FROM chat_rollup_daily "
+     "WHERE day >= ? AND day < ? GROUP BY day",
+     ("2025-01-01", "2025-02-01")),
+    ("rollup hourly window",
+     "SELECT hour, SUM(queries) FROM chat_rollup_hourly WHERE hour >= ? AND hour < ? GROUP BY hour",
+     ("2025-01-01", "2025-01-02")),
+    ("rollup active accounts",
+     "SELECT COUNT(DISTINCT account_no) FROM chat_rollup_account_days WHERE day >= ? AND day < ?",
+     ("2025-01-01", "2025-02-01")),
+    ("rollup trigger upsert target",
+     "SELECT queries FROM chat_rollup_daily WHERE day = ? AND intent = ?",
+     ("2025-01-01", "faq")),
+    ("faq suggestion upsert target",
+     "SELECT id, frequency, confidence_sum FROM faq_suggestions WHERE question_hash = ?",
+     ("0" * 40,)),
+    ("pending faq suggestions", PENDING_SQL, ()),
+    ("pending suggestion clusters", GROUPED_PENDING_SQL, ()),
+    ("cluster members",
+     "SELECT question, frequency FROM faq_suggestions WHERE cluster_id = ? OR id = ? ORDER BY frequency DESC",
+     (1, 1)),
+    ("unclustered suggestions", "SELECT id, question FROM faq_suggestions WHERE cluster_id IS NULL", ()),
+]
+
+# whole-table aggregates that may walk an index end to end; every other query must SEARCH
+FULL_SCAN_OK = {
+    "intent frequency": "all-time histogram over every chat_logs row; no request path runs it any more "
+                        "(the admin charts read chat_rollup_daily)",
+}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = sqlite3.connect(str(tmp_path / "plans.db"))
+    db._create_tables(c)
+    db.migrate(c)
+    c.execute("ANALYZE")
+    yield c
+    c.close()
+
+
+def test_migrations_record_version(conn):
+    assert db.schema_version(conn) == db.SCHEMA_VERSION
+    # re-running is a no-op
+    assert db.migrate(conn) == db.SCHEMA_VERSION
+
+
+@pytest.mark.parametrize("name,sql,params", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(conn, name, sql, params):
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    scans = [step for step in plan if step.startswith("SCAN")]
+    if name in FULL_SCAN_OK:
+        # even an allowed scan has to stay on an index rather than the table rows
+        scans = [step for step in scans if "COVERING INDEX" not in step]
+    assert not scans, f"{name} scans instead of searching: {plan}"
+
+
+def test_full_scan_allow_list_is_current():
+    assert set(FULL_SCAN_OK) <= {q[0] for q in HOT_QUERIES}
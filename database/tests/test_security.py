@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+
+from database import bank_crud, db, security
+from database.security import BcryptPool
+
+
+@pytest.fixture(autouse=True)
+def cheap_pool(monkeypatch):
+    pool = BcryptPool(workers=2, queue_size=2)
+    monkeypatch.setattr(security, "_pool", pool)
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", 4)
+    yield pool
+    pool.shutdown()
+
+
+def test_hash_and_verify_round_trip():
+    hashed = security.hash_password("s3cret")
+    assert security.hash_rounds(hashed) == 4
+    assert security.verify_password("s3cret", hashed)
+    assert not security.verify_password("wrong", hashed)
+    # hashes made elsewhere, stored as text or bytes, still verify
+    legacy = bcrypt.hashpw(b"s3cret", bcrypt.gensalt(5))
+    assert security.verify_password("s3cret", legacy.decode())
+
+
+def test_rehash_only_on_cost_change():
+    current = security.hash_password("pw")
+    assert security.verify_and_rehash("pw", current) == (True, None)
+    legacy = bcrypt.hashpw(b"pw", bcrypt.gensalt(5))
+    ok, upgraded = security.verify_and_rehash("pw", legacy)
+    assert ok and security.hash_rounds(upgraded) == 4 and security.verify_password("pw", upgraded)
+    assert security.verify_and_rehash("nope", legacy) == (False, None)
+    assert security.needs_rehash(b"not a bcrypt hash")
+
+
+def test_async_api():
+    async def main():
+        hashed = await security.hash_password_async("pw")
+        return await asyncio.gather(*(security.verify_password_async(p, hashed) for p in ["pw", "x", "pw"]))
+
+    assert asyncio.run(main()) == [True, False, True]
+
+
+def test_pool_bounds_pending_calls(cheap_pool):
+    release = threading.Event()
+    futures = [cheap_pool.submit(release.wait) for _ in range(4)]  # 2 running + 2 queued
+    blocked = threading.Thread(target=lambda: cheap_pool.submit(lambda: None).result())
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive() and cheap_pool.stats()["in_flight"] == 4
+    release.set()
+    blocked.join(2)
+    assert not blocked.is_alive() and all(f.result() for f in futures)
+    assert cheap_pool.stats()["calls"] == 5
+
+
+def test_login_upgrades_stored_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "bank.db"))
+    db.init_db()
+    with db.db_connection() as conn:
+        conn.execute(
+            "INSERT INTO accounts(account_number, user_name, account_type, balance, password_hash) "
+            "VALUES ('1001', 'a', 'Savings', 0, ?)", (bcrypt.hashpw(b"pw", bcrypt.gensalt(5)),)
+        )
+    assert bank_crud.authenticate("1001", "wrong") is None
+    assert security.hash_rounds(bank_crud.get_account("1001")[4]) == 5
+    acc = bank_crud.authenticate("1001", "pw")
+    assert acc is not None and security.hash_rounds(acc[4]) == 4
+    assert security.hash_rounds(bank_crud.get_account("1001")[4]) == 4
+    assert bank_crud.authenticate("1001", "pw")[4] == acc[4]  # no further rehash
+    db.get_pool().close_all()
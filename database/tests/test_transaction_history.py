@@ -0,0 +1,86 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from database import bank_crud, db
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "bank.db"))
+    db.init_db()
+    rng = random.Random(11)
+    base = datetime(2025, 3, 1)
+    rows = []
+    for i in range(400):
+        # coarse timestamps so many rows tie on timestamp and only id orders them
+        ts = (base + timedelta(hours=rng.randrange(24 * 20))).isoformat()
+        src, dst = rng.choice([("1001", "1002"), ("1002", "1001"), ("1003", "1001"), ("1002", "1003"),
+                               ("1001", "1001")])
+        rows.append((src, dst, rng.randint(1, 500), ts))
+    with db.db_connection() as conn:
+        conn.executemany("INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+                         rows)
+        all_rows = conn.execute("SELECT id, from_account, to_account, amount, timestamp FROM transactions").fetchall()
+    yield all_rows
+    db.get_pool().close_all()
+
+
+def _expected(all_rows, account, start=None, end=None, direction="All"):
+    out = []
+    for row in all_rows:
+        _, src, dst, _, ts = row
+        day = datetime.fromisoformat(ts).date()
+        if (start and day < start) or (end and day > end):
+            continue
+        kind = "Debit" if src == account else "Credit" if dst == account else None
+        if kind and direction in ("All", kind):
+            out.append(row)
+    return sorted(out, key=lambda r: (r[4], r[0]), reverse=True)
+
+
+@pytest.mark.parametrize("start,end,direction", [
+    (None, None, "All"),
+    (date(2025, 3, 5), date(2025, 3, 9), "All"),
+    (None, date(2025, 3, 3), "Debit"),
+    (date(2025, 3, 10), None, "Credit"),
+])
+def test_pages_cover_history_exactly_once(history, start, end, direction):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = bank_crud.get_transaction_page("1001", start, end, direction, before=cursor, limit=7)
+        assert len(rows) <= 7
+        pages.append(rows)
+        if cursor is None:
+            break
+    assert [r for page in pages for r in page] == _expected(history, "1001", start, end, direction)
+    assert list(bank_crud.iter_transactions("1001", start, end, direction, page_size=50)) == \
+        _expected(history, "1001", start, end, direction)
+
+
+def test_totals_match_rows(history):
+    start, end = date(2025, 3, 4), date(2025, 3, 12)
+    totals = bank_crud.get_transaction_totals("1001", start, end)
+    debits = _expected(history, "1001", start, end, "Debit")
+    credits = _expected(history, "1001", start, end, "Credit")
+    assert totals == {
+        "count": len(debits) + len(credits),
+        "debit_count": len(debits), "debit": sum(r[3] for r in debits),
+        "credit_count": len(credits), "credit": sum(r[3] for r in credits),
+    }
+
+
+def test_unknown_account_and_direction(history):
+    assert bank_crud.get_transaction_page("9999") == ([], None)
+    assert bank_crud.get_transaction_page("1001", direction="Refund") == ([], None)
+    assert bank_crud.get_transaction_totals("9999")["count"] == 0
+
+
+def test_page_reads_index_in_order(history):
+    sql = ("SELECT id, from_account, to_account, amount, timestamp FROM transactions "
+           "WHERE from_account = ? AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?")
+    with db.db_connection() as conn:
+        plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, ("1001", "2025-03-09", 10**9, 26))]
+    assert any("idx_transactions_from_page" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan), plan
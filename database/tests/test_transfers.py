@@ -0,0 +1,198 @@
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import pytest
+
+from database import bank_crud, db, transfers
+
+ACCOUNTS = [str(2000 + i) for i in range(6)]
+OPENING = 10_000
+
+
+@pytest.fixture
+def bank(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "bank.db"))
+    monkeypatch.setattr(bank_crud, "hash_password", lambda p: p.encode())
+    monkeypatch.setattr(transfers, "verify_password", lambda p, h: p.encode() == h)
+    db.init_db()
+    for acc in ACCOUNTS:
+        bank_crud.create_account(f"user{acc}", acc, "Savings", OPENING, "pw")
+    yield
+    db.get_pool().close_all()
+
+
+def _balances():
+    with db.db_connection() as conn:
+        return dict(conn.execute("SELECT account_number, balance FROM accounts"))
+
+
+def test_outcomes(bank):
+    assert transfers.transfer("2000", "2001", 100, "pw").ok
+    assert transfers.transfer("2000", "2001", 100, "nope").status == transfers.BAD_PASSWORD
+    assert transfers.transfer("9999", "2001", 100, "pw").status == transfers.INVALID_SENDER
+    assert transfers.transfer("2000", "9999", 100, "pw").status == transfers.INVALID_RECEIVER
+    assert transfers.transfer("2000", "2000", 100, "pw").status == transfers.INVALID_RECEIVER
+    assert transfers.transfer("2000", "2001", -5, "pw").status == transfers.INVALID_AMOUNT
+    assert transfers.transfer("2000", "2001", OPENING, "pw").status == transfers.INSUFFICIENT_FUNDS
+    assert bank_crud.transfer_money("2001", "2000", 50, "pw") == "✅ Transfer Successful"
+    balances = _balances()
+    assert balances["2000"] == OPENING - 50 and balances["2001"] == OPENING + 50
+
+
+def test_idempotency_key_applies_once(bank):
+    key = uuid.uuid4().hex
+    first = transfers.transfer("2000", "2001", 300, "pw", idempotency_key=key)
+    again = transfers.transfer("2000", "2001", 300, "pw", idempotency_key=key)
+    assert first.ok and again.ok and again.replayed and again.transaction_id == first.transaction_id
+    assert transfers.transfer("2000", "2002", 300, "pw", idempotency_key=key).status == transfers.KEY_REUSED
+    assert _balances()["2000"] == OPENING - 300
+    # a failed attempt is not recorded, so the same key can succeed later
+    key2 = uuid.uuid4().hex
+    assert transfers.transfer("2003", "2004", OPENING + 1, "pw", idempotency_key=key2).status == \
+        transfers.INSUFFICIENT_FUNDS
+    assert transfers.transfer("2003", "2004", 10, "pw", idempotency_key=key2).ok
+
+
+def test_concurrent_resubmits_of_one_key(bank):
+    key = uuid.uuid4().hex
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        transfers.transfer("2000", "2001", 700, "pw", idempotency_key=key))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(r.ok for r in results) and sum(not r.replayed for r in results) == 1
+    assert _balances()["2000"] == OPENING - 700
+
+
+def test_stress_conserves_money(bank):
+    # 8 threads hammer 6 accounts; amounts are large enough that many transfers
+    # must be refused, which is exactly where an unguarded check would overdraw
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(150):
+            src, dst = rng.sample(ACCOUNTS, 2)
+            res = transfers.transfer(src, dst, rng.randint(1, 4000), "pw")
+            with lock:
+                outcomes.append(res.status)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    balances = _balances()
+    assert sum(balances.values()) == OPENING * len(ACCOUNTS)
+    assert min(balances.values()) >= 0
+    assert set(outcomes) <= {transfers.OK, transfers.INSUFFICIENT_FUNDS}
+    with db.db_connection() as conn:
+        ledger = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        # every balance equals opening + credits - debits in the ledger
+        for acc, balance in balances.items():
+            net = conn.execute(
+                "SELECT COALESCE(SUM(CASE WHEN to_account = ? THEN amount ELSE -amount END), 0) "
+                "FROM transactions WHERE from_account = ? OR to_account = ?", (acc, acc, acc)
+            ).fetchone()[0]
+            assert balance == OPENING + net
+    assert ledger == outcomes.count(transfers.OK) > 0
+    assert len(outcomes) / elapsed > 100  # transfers per second, busy retries included
+
+
+def test_busy_database_is_retried(bank):
+    # another process holds the write lock for longer than busy_timeout
+    blocker = sqlite3.connect(db.DB_NAME, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.4, blocker.rollback).start()
+    with db.db_connection() as conn:
+        conn.execute("PRAGMA busy_timeout = 50")
+    try:
+        start = time.perf_counter()
+        assert transfers.transfer("2000", "2001", 10, "pw").ok
+        assert time.perf_counter() - start >= 0.3
+    finally:
+        with db.db_connection() as conn:
+            conn.execute("PRAGMA busy_timeout = 5000")
+        blocker.close()
+
+
+def test_is_busy():
+    assert transfers.is_busy(sqlite3.OperationalError("database is locked"))
+    assert not transfers.is_busy(sqlite3.OperationalError("no such table: accounts"))
+    assert not transfers.is_busy(ValueError("database is locked"))
+
+
+def test_batch_partial_failures_and_order(bank):
+    legs = [("2001", 4000), ("9999", 10), ("2002", 0), ("2000", 5), ("2003", 5000), ("2004", 1000),
+            ("2005", 2000)]
+    results = transfers.transfer_batch("2000", legs, "pw", chunk_size=3)
+    assert [r.status for r in results] == [
+        transfers.OK, transfers.INVALID_RECEIVER, transfers.INVALID_AMOUNT, transfers.INVALID_RECEIVER,
+        transfers.OK, transfers.OK, transfers.INSUFFICIENT_FUNDS,
+    ]
+    balances = _balances()
+    assert balances["2000"] == 0 and balances["2001"] == OPENING + 4000 and balances["2005"] == OPENING
+    with db.db_connection() as conn:
+        ledger = dict(conn.execute("SELECT id, to_account FROM transactions"))
+    assert [ledger[r.transaction_id] for r in results if r.ok] == ["2001", "2003", "2004"]
+
+
+def test_batch_bad_password_applies_nothing(bank):
+    results = transfers.transfer_batch("2000", [("2001", 1)] * 3, "nope")
+    assert {r.status for r in results} == {transfers.BAD_PASSWORD}
+    assert _balances()["2000"] == OPENING
+
+
+def test_batch_resubmit_applies_missing_legs_only(bank):
+    legs = [(ACCOUNTS[1 + i % 5], 10) for i in range(40)]
+    first = transfers.transfer_batch("2000", legs[:25], "pw", idempotency_key="payroll-1", chunk_size=10)
+    again = transfers.transfer_batch("2000", legs, "pw", idempotency_key="payroll-1", chunk_size=10)
+    assert all(r.ok for r in again)
+    assert [r.replayed for r in again] == [True] * 25 + [False] * 15
+    assert [r.transaction_id for r in again[:25]] == [r.transaction_id for r in first]
+    assert _balances()["2000"] == OPENING - 400
+
+
+def test_batch_key_reused_by_another_sender(bank):
+    assert transfers.transfer_batch("2000", [("2002", 10)], "pw", idempotency_key="payroll-2")[0].ok
+    other = transfers.transfer_batch("2001", [("2002", 10)], "pw", idempotency_key="payroll-2")
+    assert other[0].status == transfers.KEY_REUSED
+    assert _balances()["2001"] == OPENING
+
+
+def test_batch_verifies_password_without_a_connection(bank, monkeypatch):
+    held = []
+
+    def verify(password, hashed):
+        stats = db.get_pool().stats()
+        held.append(stats["open"] - stats["idle"])
+        return password.encode() == hashed
+
+    monkeypatch.setattr(transfers, "verify_password", verify)
+    assert transfers.transfer_batch("2000", [("2001", 1)], "pw")[0].ok
+    assert held == [0]
+
+
+def test_batch_and_single_transfers_race(bank):
+    legs = [(ACCOUNTS[1 + i % 5], 7) for i in range(600)]
+    batch_results = []
+    batch = threading.Thread(target=lambda: batch_results.extend(
+        transfers.transfer_batch("2000", legs, "pw", chunk_size=50)))
+    singles = [threading.Thread(target=lambda: [transfers.transfer("2000", "2001", 9, "pw") for _ in range(40)])
+               for _ in range(3)]
+    for t in [batch, *singles]:
+        t.start()
+    for t in [batch, *singles]:
+        t.join()
+    balances = _balances()
+    assert sum(balances.values()) == OPENING * len(ACCOUNTS) and balances["2000"] >= 0
+    assert len(batch_results) == 600
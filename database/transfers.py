@@ -0,0 +1,296 @@
+# database/transfers.py
+"""
+Money transfers that stay correct under concurrency.
+
+transfer() checks the password before touching the write lock (bcrypt is
+slow), then applies the transfer in one BEGIN IMMEDIATE transaction:
+
+    1. an idempotency key already on record replays the original result
+    2. the receiver must exist
+    3. UPDATE accounts SET balance = balance - ? WHERE ... AND balance >= ?
+       debits only if the funds are there at that instant; no earlier
+       read of the balance is trusted, so two transfers cannot both pass
+       the check and overdraw the account
+    4. credit the receiver, insert the transactions row, record the key
+
+BEGIN IMMEDIATE takes the write lock before the first read. A second
+writer waits for it (busy_timeout) instead of failing on lock upgrade
+halfway through. If the lock is still busy after that, the whole
+transaction is retried with jittered exponential backoff, up to
+TRANSFER_RETRIES times.
+
+Idempotency keys (one per confirmation form) are stored with the
+resulting transaction id in transfer_requests. A resubmitted confirmation
+gets the original result back with replayed=True and moves no money.
+Only successful transfers are recorded, so a failed attempt can be
+retried with the same key.
+
+transfer_batch() posts many legs from one account (payroll and similar):
+one password check, all legs validated up front, then chunked
+transactions with executemany and a result per leg.
+"""
+import os
+import time
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from database import db
+from database.security import verify_password
+
+TRANSFER_RETRIES = int(os.getenv("BANKBOT_TRANSFER_RETRIES", "5"))
+TRANSFER_BACKOFF = float(os.getenv("BANKBOT_TRANSFER_BACKOFF", "0.05"))
+TRANSFER_CHUNK = int(os.getenv("BANKBOT_TRANSFER_CHUNK", "500"))      # batch legs per transaction
+
+# result statuses
+OK = "OK"
+INVALID_AMOUNT = "INVALID_AMOUNT"
+INVALID_SENDER = "INVALID_SENDER"
+INVALID_RECEIVER = "INVALID_RECEIVER"
+BAD_PASSWORD = "BAD_PASSWORD"
+INSUFFICIENT_FUNDS = "INSUFFICIENT_FUNDS"
+KEY_REUSED = "KEY_REUSED"
+BUSY = "BUSY"
+
+MESSAGES = {
+    OK: "✅ Transfer Successful",
+    INVALID_AMOUNT: "❌ Invalid amount",
+    INVALID_SENDER: "❌ Invalid sender account",
+    INVALID_RECEIVER: "❌ Invalid receiver account",
+    BAD_PASSWORD: "❌ Incorrect password",
+    INSUFFICIENT_FUNDS: "❌ Insufficient balance",
+    KEY_REUSED: "❌ This transfer request was already used for a different transfer",
+    BUSY: "❌ The bank is busy, please try again",
+}
+
+
+@dataclass(frozen=True)
+class TransferResult:
+    status: str
+    transaction_id: Optional[int] = None
+    replayed: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+    @property
+    def message(self) -> str:
+        return MESSAGES[self.status]
+
+
+def is_busy(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in str(exc) or "busy" in str(exc))
+
+
+def with_write_lock(apply, db_path: Optional[str] = None, retries: int = TRANSFER_RETRIES,
+                    backoff: float = TRANSFER_BACKOFF):
+    """
+    Run apply(conn) inside BEGIN IMMEDIATE, committing on return.
+
+    A busy database restarts the whole transaction after a jittered,
+    doubling sleep; after `retries` restarts the error propagates.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with db.db_connection(db_path) as conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                return apply(conn)
+        except sqlite3.OperationalError as exc:
+            if not is_busy(exc) or attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def apply_transfer(conn, from_acc: str, to_acc: str, amount, timestamp: str) -> TransferResult:
+    """The guarded debit, credit and ledger row; the caller holds the write lock."""
+    if conn.execute("SELECT 1 FROM accounts WHERE account_number = ?", (to_acc,)).fetchone() is None:
+        return TransferResult(INVALID_RECEIVER)
+    debited = conn.execute(
+        "UPDATE accounts SET balance = balance - ? WHERE account_number = ? AND balance >= ?",
+        (amount, from_acc, amount),
+    ).rowcount
+    if not debited:
+        return TransferResult(INSUFFICIENT_FUNDS)
+    conn.execute("UPDATE accounts SET balance = balance + ? WHERE account_number = ?", (amount, to_acc))
+    txn_id = conn.execute(
+        "INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+        (from_acc, to_acc, amount, timestamp),
+    ).lastrowid
+    return TransferResult(OK, txn_id)
+
+
+def transfer(from_acc: str, to_acc: str, amount, password: str, idempotency_key: Optional[str] = None,
+             db_path: Optional[str] = None) -> TransferResult:
+    if not amount or amount <= 0 or from_acc == to_acc:
+        return TransferResult(INVALID_AMOUNT if not amount or amount <= 0 else INVALID_RECEIVER)
+
+    # bcrypt outside the write lock; a password change racing this is harmless
+    with db.db_connection(db_path) as conn:
+        row = conn.execute("SELECT password_hash FROM accounts WHERE account_number = ?", (from_acc,)).fetchone()
+    if row is None:
+        return TransferResult(INVALID_SENDER)
+    if not verify_password(password, row[0]):
+        return TransferResult(BAD_PASSWORD)
+
+    def apply(conn) -> TransferResult:
+        if idempotency_key:
+            seen = conn.execute(
+                "SELECT from_account, to_account, amount, transaction_id FROM transfer_requests "
+                "WHERE idempotency_key = ?",
+                (idempotency_key,),
+            ).fetchone()
+            if seen is not None:
+                if tuple(seen[:3]) != (from_acc, to_acc, amount):
+                    return TransferResult(KEY_REUSED)
+                return TransferResult(OK, seen[3], replayed=True)
+        now = datetime.now().isoformat()
+        result = apply_transfer(conn, from_acc, to_acc, amount, now)
+        if result.ok and idempotency_key:
+            conn.execute(
+                "INSERT INTO transfer_requests (idempotency_key, from_account, to_account, amount, transaction_id, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (idempotency_key, from_acc, to_acc, amount, result.transaction_id, now),
+            )
+        return result
+
+    try:
+        return with_write_lock(apply, db_path)
+    except sqlite3.OperationalError as exc:
+        if is_busy(exc):
+            return TransferResult(BUSY)
+        raise
+
+
+# ---------- batches ----------
+def _existing_accounts(conn, accounts) -> set:
+    accounts = list(accounts)
+    found = set()
+    for i in range(0, len(accounts), TRANSFER_CHUNK):
+        part = accounts[i:i + TRANSFER_CHUNK]
+        found.update(r[0] for r in conn.execute(
+            f"SELECT account_number FROM accounts WHERE account_number IN ({','.join('?' * len(part))})", part
+        ))
+    return found
+
+
+def _apply_chunk(conn, from_acc: str, legs, keys, timestamp: str):
+    """
+    Apply (index, to_acc, amount) legs in order while the balance lasts.
+    Returns {index: TransferResult}; the caller holds the write lock.
+    """
+    results = {}
+    if keys:
+        seen = {}
+        wanted = [keys[i] for i, _, _ in legs]
+        for row in conn.execute(
+            "SELECT idempotency_key, from_account, to_account, amount, transaction_id FROM transfer_requests "
+            f"WHERE idempotency_key IN ({','.join('?' * len(wanted))})", wanted
+        ):
+            seen[row[0]] = row[1:]
+        fresh = []
+        for leg in legs:
+            prior = seen.get(keys[leg[0]])
+            if prior is None:
+                fresh.append(leg)
+            elif tuple(prior[:3]) != (from_acc, leg[1], leg[2]):
+                results[leg[0]] = TransferResult(KEY_REUSED)
+            else:
+                results[leg[0]] = TransferResult(OK, prior[3], replayed=True)
+        legs = fresh
+
+    row = conn.execute("SELECT balance FROM accounts WHERE account_number = ?", (from_acc,)).fetchone()
+    balance = row[0] if row else 0
+    accepted = []
+    for leg in legs:
+        if leg[2] <= balance:
+            balance -= leg[2]
+            accepted.append(leg)
+        else:
+            results[leg[0]] = TransferResult(INSUFFICIENT_FUNDS)
+    if not accepted:
+        return results
+
+    total = sum(amount for _, _, amount in accepted)
+    # the balance was read under this write lock, so the guard can only trip on a bug
+    if not conn.execute(
+        "UPDATE accounts SET balance = balance - ? WHERE account_number = ? AND balance >= ?",
+        (total, from_acc, total),
+    ).rowcount:
+        raise RuntimeError(f"balance of {from_acc} changed under the write lock")
+    conn.executemany(
+        "UPDATE accounts SET balance = balance + ? WHERE account_number = ?",
+        [(amount, to_acc) for _, to_acc, amount in accepted],
+    )
+    conn.executemany(
+        "INSERT INTO transactions(from_account, to_account, amount, timestamp) VALUES (?, ?, ?, ?)",
+        [(from_acc, to_acc, amount, timestamp) for _, to_acc, amount in accepted],
+    )
+    # AUTOINCREMENT under the write lock hands out consecutive ids
+    last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    for offset, (index, _, _) in enumerate(accepted):
+        results[index] = TransferResult(OK, last - len(accepted) + 1 + offset)
+    if keys:
+        conn.executemany(
+            "INSERT INTO transfer_requests (idempotency_key, from_account, to_account, amount, transaction_id, "
+            "created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(keys[index], from_acc, to_acc, amount, results[index].transaction_id, timestamp)
+             for index, to_acc, amount in accepted],
+        )
+    return results
+
+
+def transfer_batch(from_acc: str, legs, password: str, idempotency_key: Optional[str] = None,
+                   chunk_size: int = TRANSFER_CHUNK, db_path: Optional[str] = None):
+    """
+    Post many (to_acc, amount) legs from one account.
+
+    The password is checked once and every leg is validated up front. Valid
+    legs are then applied in input order, `chunk_size` per BEGIN IMMEDIATE
+    transaction, with one guarded debit of the chunk total and an
+    executemany for the credits and ledger rows. Returns one TransferResult
+    per leg. Legs that fail (bad receiver or amount, or funds exhausted by
+    earlier legs) do not stop the rest. A chunk that fails outright rolls
+    back on its own, and the chunks before it stay applied.
+
+    With an idempotency_key each leg is recorded as "<key>:<index>", so
+    resubmitting the batch, for example after a crash halfway through,
+    applies only the legs that did not go through yet.
+    """
+    legs = list(legs)
+    # bcrypt without a pooled connection held, as in transfer()
+    with db.db_connection(db_path) as conn:
+        row = conn.execute("SELECT password_hash FROM accounts WHERE account_number = ?", (from_acc,)).fetchone()
+    if row is None:
+        return [TransferResult(INVALID_SENDER)] * len(legs)
+    if not verify_password(password, row[0]):
+        return [TransferResult(BAD_PASSWORD)] * len(legs)
+    with db.db_connection(db_path) as conn:
+        receivers = _existing_accounts(conn, {to_acc for to_acc, _ in legs})
+
+    results = [None] * len(legs)
+    valid = []
+    for i, (to_acc, amount) in enumerate(legs):
+        if not amount or amount <= 0:
+            results[i] = TransferResult(INVALID_AMOUNT)
+        elif to_acc == from_acc or to_acc not in receivers:
+            results[i] = TransferResult(INVALID_RECEIVER)
+        else:
+            valid.append((i, to_acc, amount))
+    keys = {i: f"{idempotency_key}:{i}" for i, _, _ in valid} if idempotency_key else None
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        timestamp = datetime.now().isoformat()
+        try:
+            applied = with_write_lock(lambda conn: _apply_chunk(conn, from_acc, chunk, keys, timestamp), db_path)
+        except sqlite3.OperationalError as exc:
+            if not is_busy(exc):
+                raise
+            applied = {i: TransferResult(BUSY) for i, _, _ in chunk}
+        for index, result in applied.items():
+            results[index] = result
+    return results
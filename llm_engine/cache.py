@@ -0,0 +1,202 @@
+# llm_engine/cache.py
+"""
+Two-level cache for LLM fallback answers, persisted in the llm_cache table
+so it survives restarts.
+
+* exact    – key is sha256(model, temperature, normalized prompt).
+* semantic – optional; reuses the answer of a cached prompt for the same
+             model/temperature whose embedding cosine similarity is at
+             least `semantic_threshold`. Keep the threshold high:
+             "interest rate on FD" and "interest rate on RD" are close.
+
+Entries expire after `ttl` seconds; beyond `maxsize` rows the least
+recently hit ones are evicted.
+"""
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import db
+
+LLM_CACHE_SIZE = int(os.getenv("BANKBOT_LLM_CACHE_SIZE", "5000"))
+LLM_CACHE_TTL = float(os.getenv("BANKBOT_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+USE_SEMANTIC_CACHE = os.getenv("BANKBOT_LLM_SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_THRESHOLD = float(os.getenv("BANKBOT_LLM_SEMANTIC_THRESHOLD", "0.95"))
+# evict at most every this many puts
+EVICT_EVERY = 50
+
+_WS_RE = re.compile(r"\s+")
+_TRAILING_RE = re.compile(r"[\s?.!]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _TRAILING_RE.sub("", _WS_RE.sub(" ", (prompt or "").lower()).strip())
+
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    raw = f"{model}\x1f{temperature:.3f}\x1f{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, db_path: Optional[str] = None, maxsize: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL,
+                 semantic: bool = USE_SEMANTIC_CACHE, semantic_threshold: float = SEMANTIC_THRESHOLD,
+                 encoder: Optional[Callable[[Sequence[str]], np.ndarray]] = None):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.semantic = semantic
+        self.semantic_threshold = semantic_threshold
+        self._encoder = encoder
+        self.encoder_error: Optional[str] = None
+        self._lock = threading.Lock()
+        # (model, temperature) -> (keys, matrix) of cached prompt embeddings
+        self._vectors: Dict[Tuple[str, float], Tuple[List[str], np.ndarray]] = {}
+        self._puts = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- semantic level ----------
+    def _encode(self, texts: Sequence[str]) -> Optional[np.ndarray]:
+        if self._encoder is None and self.encoder_error is None:
+            try:
+                from database.faq_embeddings import TransformerEncoder
+                self._encoder = TransformerEncoder()
+            except Exception as e:
+                self.encoder_error = str(e)
+        if self._encoder is None:
+            return None
+        return np.asarray(self._encoder([normalize_prompt(t) for t in texts]), dtype=np.float32)
+
+    def _load_vectors(self, conn, model: str, temperature: float):
+        group = (model, round(temperature, 3))
+        if group not in self._vectors:
+            rows = conn.execute(
+                "SELECT key, embedding FROM llm_cache WHERE model=? AND temperature=? AND embedding IS NOT NULL "
+                "AND created_at > ?",
+                (model, group[1], time.time() - self.ttl),
+            ).fetchall()
+            keys = [k for k, _ in rows]
+            mat = np.stack([np.frombuffer(e, dtype=np.float32) for _, e in rows]) if rows else None
+            self._vectors[group] = (keys, mat)
+        return self._vectors[group]
+
+    def _semantic_lookup(self, conn, vec: np.ndarray, model: str, temperature: float) -> Optional[str]:
+        keys, mat = self._load_vectors(conn, model, temperature)
+        if mat is None or not len(keys):
+            return None
+        sims = mat @ vec
+        best = int(np.argmax(sims))
+        if sims[best] < self.semantic_threshold:
+            return None
+        return keys[best]
+
+    # ---------- public API ----------
+    def get(self, prompt: str, model: str, temperature: float) -> Optional[Tuple[str, str]]:
+        """(answer, "exact"|"semantic") or None."""
+        key = cache_key(prompt, model, temperature)
+        now = time.time()
+        vec = None
+        if self.semantic:
+            encoded = self._encode([prompt])
+            vec = encoded[0] if encoded is not None else None
+        with self._lock, db.db_connection(self.db_path) as conn:
+            level = "exact"
+            row = conn.execute("SELECT answer, created_at FROM llm_cache WHERE key=?", (key,)).fetchone()
+            if row is None and vec is not None:
+                near = self._semantic_lookup(conn, vec, model, temperature)
+                if near is not None:
+                    key, level = near, "semantic"
+                    row = conn.execute("SELECT answer, created_at FROM llm_cache WHERE key=?", (key,)).fetchone()
+            if row is None or row[1] <= now - self.ttl:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_hit=?, hits=hits+1 WHERE key=?", (now, key))
+            if level == "exact":
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+            return row[0], level
+
+    def put(self, prompt: str, model: str, temperature: float, answer: str):
+        key = cache_key(prompt, model, temperature)
+        now = time.time()
+        vec = None
+        if self.semantic:
+            encoded = self._encode([prompt])
+            vec = encoded[0] if encoded is not None else None
+        with self._lock, db.db_connection(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, temperature, prompt, answer, embedding, created_at, last_hit, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, round(temperature, 3), normalize_prompt(prompt), answer,
+                 vec.tobytes() if vec is not None else None, now, now),
+            )
+            group = (model, round(temperature, 3))
+            if vec is not None and group in self._vectors:
+                keys, mat = self._vectors[group]
+                if key not in keys:
+                    mat = vec[None, :] if mat is None else np.vstack([mat, vec])
+                    self._vectors[group] = (keys + [key], mat)
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict(conn, now)
+
+    def _evict(self, conn, now: float):
+        expired = conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,)).rowcount
+        over = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.maxsize
+        if over > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_hit LIMIT ?)", (over,)
+            )
+        removed = expired + max(over, 0)
+        if removed:
+            self.evictions += removed
+            self._vectors.clear()  # reloaded lazily on the next semantic lookup
+
+    def evict(self):
+        with self._lock, db.db_connection(self.db_path) as conn:
+            self._evict(conn, time.time())
+
+    def clear(self):
+        with self._lock, db.db_connection(self.db_path) as conn:
+            conn.execute("DELETE FROM llm_cache")
+            self._vectors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with db.db_connection(self.db_path) as conn:
+            size = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "semantic": self.semantic and self.encoder_error is None,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
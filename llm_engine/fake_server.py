@@ -0,0 +1,171 @@
+# llm_engine/fake_server.py
+"""
+Local stand-in for the Groq chat completions API, for exercising the LLM
+gateway offline.
+
+    POST /openai/v1/chat/completions   OpenAI-compatible, "stream": true -> SSE
+    POST /admin/config                 {"latency": 0.2, "error_rate": 0.5, ...}
+    GET  /health
+
+Behaviour is controlled by FakeLLMConfig: base latency plus jitter before
+the first token, a per-token delay when streaming, the fraction of
+requests answered with `error_status`, and the fraction that hang for
+`hang_seconds` (to trip client timeouts). /admin/config changes it while
+a load test is running, e.g. to simulate an outage and a recovery.
+
+    python -m llm_engine.fake_server --port 8089 --latency 0.3 --error_rate 0.2
+
+Point the real Groq client at it with GROQ_BASE_URL=http://127.0.0.1:8089.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_ANSWER = ("You can check your account balance in the app, at any ATM, or by asking me "
+                  "\"what is my balance\" once you are logged in.")
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.2
+    jitter: float = 0.05
+    token_delay: float = 0.01
+    error_rate: float = 0.0
+    error_status: int = 503
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+    answer: str = DEFAULT_ANSWER
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeLLMServer"
+
+    def log_message(self, fmt, *args):  # keep load tests quiet
+        pass
+
+    def _json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._json(200, {"status": "ok", "requests": self.server.requests})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path == "/admin/config":
+            self.server.configure(**self._body())
+            self._json(200, asdict(self.server.config))
+            return
+        if self.path != "/openai/v1/chat/completions":
+            self._json(404, {"error": "not found"})
+            return
+        req = self._body()
+        cfg = self.server.config
+        self.server.count()
+        roll = random.random()
+        if roll < cfg.hang_rate:
+            time.sleep(cfg.hang_seconds)
+        elif roll < cfg.hang_rate + cfg.error_rate:
+            time.sleep(cfg.latency)
+            self._json(cfg.error_status, {"error": {"message": "fake upstream error", "type": "server_error"}})
+            return
+        time.sleep(max(0.0, cfg.latency + random.uniform(-cfg.jitter, cfg.jitter)))
+        model = req.get("model", "fake")
+        if req.get("stream"):
+            self._stream(model, cfg)
+        else:
+            self._json(200, {
+                "id": "fake-1", "object": "chat.completion", "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": cfg.answer},
+                             "finish_reason": "stop"}],
+            })
+
+    def _stream(self, model: str, cfg: FakeLLMConfig):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = cfg.answer.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == 0 else " " + word
+            chunk = {"id": "fake-1", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(cfg.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeLLMConfig] = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeLLMConfig()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # clients that gave up (timeouts) close the socket under us; that is the point
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def configure(self, **changes):
+        # swap the whole object so in-flight requests keep a consistent view
+        self.config = FakeLLMConfig(**{**asdict(self.config), **changes})
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token_delay", type=float, default=0.01)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--hang_rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeLLMServer(args.host, args.port, FakeLLMConfig(
+        latency=args.latency, token_delay=args.token_delay, error_rate=args.error_rate, hang_rate=args.hang_rate,
+    ))
+    print(f"fake LLM on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,388 @@
+# llm_engine/gateway.py
+"""
+Guarded access to the LLM fallback.
+
+Every call goes through LLMGateway, which
+  * caps concurrent upstream calls with a bounded semaphore (callers that
+    cannot get a slot within the deadline are degraded, not queued forever),
+  * gives each call a deadline that is passed to the client as its timeout
+    and also bounds retries and mid-stream reads,
+  * retries transient failures (timeouts, connection errors, 429, 5xx) with
+    full-jitter exponential backoff,
+  * trips a circuit breaker after `failure_threshold` consecutive transient
+    failures (a 400 or an auth error says nothing about upstream health, so
+    those do not count); while it is open, calls skip the upstream and degrade immediately, and
+    after `reset_timeout` one trial call is let through (half-open).
+
+Degraded answers come from `fallback(prompt, reason)`: the closest FAQ if
+there is a reasonable one, otherwise a canned message. They are marked
+with source "fallback" so callers do not cache them.
+
+BANKBOT_LLM_BACKEND picks the upstream: "groq" (default) or "local", the
+resident llama.cpp worker from llm_engine/local_backend.py, which gets its
+own, longer deadline since CPU generation is slow.
+
+Load-test offline against llm_engine/fake_server.py:
+
+    python -m llm_engine.fake_server --port 8089 --latency 0.3 --error_rate 0.2
+    python Experiments/bench_llm_gateway.py --base_url http://127.0.0.1:8089
+"""
+import os
+import json
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from llm_engine.streaming import groq_stream
+
+LLM_BACKEND = os.getenv("BANKBOT_LLM_BACKEND", "groq")
+LLM_DEADLINE = float(os.getenv("BANKBOT_LLM_DEADLINE", "10"))
+LOCAL_LLM_DEADLINE = float(os.getenv("BANKBOT_LLM_LOCAL_DEADLINE", "60"))
+LLM_MAX_CONCURRENT = int(os.getenv("BANKBOT_LLM_MAX_CONCURRENT", "4"))
+LLM_RETRIES = int(os.getenv("BANKBOT_LLM_RETRIES", "2"))
+LLM_BACKOFF = float(os.getenv("BANKBOT_LLM_BACKOFF", "0.25"))
+BREAKER_FAILURES = int(os.getenv("BANKBOT_LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BANKBOT_LLM_BREAKER_RESET", "30"))
+
+SYSTEM_PROMPT = "You are a helpful banking assistant."
+CANNED_ANSWER = (
+    "I'm having trouble reaching our assistant right now. "
+    "Please try again in a moment, or call Customer Care on **1800-123-456** (24/7)."
+)
+# looser than the normal FAQ threshold: when degraded, a near answer beats none
+FALLBACK_FAQ_MATCH = 0.4
+
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+                   "ReadTimeout", "ConnectTimeout", "ConnectionError", "Timeout"}
+
+CompleteFn = Callable[[str, float], str]
+StreamFn = Callable[[str, float], Iterator[str]]
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in TRANSIENT_STATUS:
+        return True
+    return any(cls.__name__ in TRANSIENT_NAMES for cls in type(exc).__mro__)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # half-open: exactly one trial call at a time
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._trial_running = False
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """A call that was allowed ended without a verdict (e.g. a non-transient client error)."""
+        with self._lock:
+            self._trial_running = False
+
+
+def default_fallback(prompt: str, reason: str) -> str:
+    try:
+        from database.faq_search import best_answer
+        answer = best_answer(prompt, min_match=FALLBACK_FAQ_MATCH)
+    except Exception:
+        answer = None
+    return f"📘 {answer}" if answer else CANNED_ANSWER
+
+
+class LLMGateway:
+    def __init__(self, complete: CompleteFn, stream: Optional[StreamFn] = None,
+                 fallback: Callable[[str, str], str] = default_fallback,
+                 max_concurrent: int = LLM_MAX_CONCURRENT, deadline: float = LLM_DEADLINE,
+                 retries: int = LLM_RETRIES, backoff: float = LLM_BACKOFF,
+                 breaker: Optional[CircuitBreaker] = None, name: str = "groq"):
+        self._complete = complete
+        self._stream = stream
+        self.fallback = fallback
+        self.max_concurrent = max_concurrent
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.name = name
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {k: 0 for k in ("calls", "ok", "retries", "timeouts", "errors",
+                                       "busy", "short_circuited", "degraded")}
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._counts[key] += n
+
+    def _degrade(self, prompt: str, reason: str) -> Tuple[str, str]:
+        self._count("degraded")
+        return self.fallback(prompt, reason), "fallback"
+
+    def _sleep_backoff(self, attempt: int, end: float) -> bool:
+        """Full jitter; False if the deadline leaves no room for another attempt."""
+        pause = random.uniform(0, self.backoff * (2 ** attempt))
+        if time.monotonic() + pause >= end:
+            return False
+        time.sleep(pause)
+        return True
+
+    def _acquire(self, end: float) -> bool:
+        if not self._slots.acquire(timeout=max(0.0, end - time.monotonic())):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    # ---------- blocking ----------
+    def complete(self, prompt: str) -> Tuple[str, str]:
+        """(answer, "llm"|"fallback")."""
+        self._count("calls")
+        end = time.monotonic() + self.deadline
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            return self._degrade(prompt, "circuit_open")
+        if not self._acquire(end):
+            self.breaker.release()
+            self._count("busy")
+            return self._degrade(prompt, "busy")
+        try:
+            attempt = 0
+            while True:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    self._count("timeouts")
+                    self.breaker.record_failure()
+                    return self._degrade(prompt, "deadline")
+                try:
+                    answer = self._complete(prompt, remaining)
+                except Exception as e:
+                    if not is_transient(e):
+                        self._count("errors")
+                        self.breaker.release()
+                        return self._degrade(prompt, type(e).__name__)
+                    if attempt >= self.retries or not self._sleep_backoff(attempt, end):
+                        self._count("timeouts" if "Timeout" in type(e).__name__ else "errors")
+                        self.breaker.record_failure()
+                        return self._degrade(prompt, type(e).__name__)
+                    attempt += 1
+                    self._count("retries")
+                    continue
+                self.breaker.record_success()
+                self._count("ok")
+                return answer, "llm"
+        finally:
+            self._release()
+
+    # ---------- streaming ----------
+    def stream(self, prompt: str, turn: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Yield answer chunks. turn["source"] ends up "llm", "llm_partial"
+        (deadline hit mid-stream) or "fallback". Retries only happen before
+        the first chunk has been handed to the caller.
+        """
+        turn = turn if turn is not None else {}
+        if self._stream is None:
+            answer, turn["source"] = self.complete(prompt)
+            yield answer
+            return
+        self._count("calls")
+        end = time.monotonic() + self.deadline
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            answer, turn["source"] = self._degrade(prompt, "circuit_open")
+            yield answer
+            return
+        if not self._acquire(end):
+            self.breaker.release()
+            self._count("busy")
+            answer, turn["source"] = self._degrade(prompt, "busy")
+            yield answer
+            return
+        try:
+            attempt = 0
+            while True:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    self._count("timeouts")
+                    self.breaker.record_failure()
+                    answer, turn["source"] = self._degrade(prompt, "deadline")
+                    yield answer
+                    return
+                started = False
+                chunks = None
+                try:
+                    chunks = iter(self._stream(prompt, remaining))
+                    for chunk in chunks:
+                        started = True
+                        turn["source"] = "llm"
+                        yield chunk
+                        if time.monotonic() > end:
+                            self._count("timeouts")
+                            self.breaker.record_failure()
+                            turn["source"] = "llm_partial"
+                            return
+                except Exception as e:
+                    transient = is_transient(e)
+                    if started or not transient or attempt >= self.retries or not self._sleep_backoff(attempt, end):
+                        self._count("errors")
+                        if transient:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.release()
+                        if started:
+                            turn["source"] = "llm_partial"
+                            return
+                        answer, turn["source"] = self._degrade(prompt, type(e).__name__)
+                        yield answer
+                        return
+                    attempt += 1
+                    self._count("retries")
+                    continue
+                finally:
+                    # stop the upstream read (and free its connection) when we leave early
+                    close = getattr(chunks, "close", None)
+                    if close is not None:
+                        close()
+                self.breaker.record_success()
+                self._count("ok")
+                turn.setdefault("source", "llm")
+                return
+        except GeneratorExit:
+            # caller stopped reading; don't leave a half-open trial hanging
+            self.breaker.release()
+            raise
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._counts)
+            out["in_flight"] = self._in_flight
+        out.update(backend=self.name, max_concurrent=self.max_concurrent, deadline=self.deadline,
+                   breaker=self.breaker.state, breaker_trips=self.breaker.trips)
+        return out
+
+
+# ---------- backends ----------
+def _messages(prompt: str):
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+
+def groq_backend(client, model: str, temperature: float = 0.3, max_tokens: int = 300) -> Tuple[CompleteFn, StreamFn]:
+    def complete(prompt: str, timeout: float) -> str:
+        completion = client.chat.completions.create(
+            model=model, messages=_messages(prompt), temperature=temperature,
+            max_tokens=max_tokens, timeout=timeout,
+        )
+        return completion.choices[0].message.content
+
+    def stream(prompt: str, timeout: float) -> Iterator[str]:
+        return groq_stream(client, _messages(prompt), model, temperature, max_tokens, timeout=timeout)
+
+    return complete, stream
+
+
+def openai_http_backend(base_url: str, model: str, temperature: float = 0.3,
+                        max_tokens: int = 300) -> Tuple[CompleteFn, StreamFn]:
+    """Any OpenAI-compatible /chat/completions endpoint (e.g. llm_engine.fake_server)."""
+    import requests
+
+    url = base_url.rstrip("/") + "/openai/v1/chat/completions"
+    session = requests.Session()
+
+    def _post(prompt, timeout, stream):
+        body = {"model": model, "messages": _messages(prompt), "temperature": temperature,
+                "max_tokens": max_tokens, "stream": stream}
+        resp = session.post(url, json=body, timeout=timeout, stream=stream)
+        resp.raise_for_status()
+        return resp
+
+    def complete(prompt: str, timeout: float) -> str:
+        return _post(prompt, timeout, False).json()["choices"][0]["message"]["content"]
+
+    def stream(prompt: str, timeout: float) -> Iterator[str]:
+        with _post(prompt, timeout, True) as resp:
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
+
+    return complete, stream
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway(model: str = "llama-3.1-8b-instant", temperature: float = 0.3) -> LLMGateway:
+    """Process-wide gateway shared by every Streamlit session, in front of LLM_BACKEND."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None and LLM_BACKEND == "local":
+                from llm_engine.local_backend import get_local_llm
+                complete, stream = get_local_llm().backend(temperature)
+                _gateway = LLMGateway(complete, stream, deadline=LOCAL_LLM_DEADLINE, name="local")
+            elif _gateway is None:
+                from groq import Groq
+                # retries are the gateway's job, not the client's
+                client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+                complete, stream = groq_backend(client, model, temperature)
+                _gateway = LLMGateway(complete, stream, name="groq")
+    return _gateway
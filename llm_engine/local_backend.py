@@ -0,0 +1,343 @@
+# llm_engine/local_backend.py
+"""
+Offline LLM fallback on llama.cpp.
+
+One dedicated worker process loads the GGUF model once and keeps it
+resident. Every Streamlit session talks to it through LocalLLM, which puts
+requests on a bounded multiprocessing queue and routes the streamed
+chunks back to the right caller, so the model never runs twice at once
+and never reloads on a rerun.
+
+Every request starts with the same system prompt. The worker evaluates
+it once at start-up and attaches a LlamaRAMCache, so later calls only pay
+for their own tokens and not for the shared prefix.
+
+Each finished request reports its token count, time to first token and
+decode tokens/sec; LocalLLM.stats() aggregates them for the Admin Panel.
+
+    BANKBOT_LLM_BACKEND=local BANKBOT_LLM_MODEL_PATH=/models/llama-3.1-8b-q4_k_m.gguf streamlit run All_Milestones.py
+    python -m llm_engine.local_backend "What is a fixed deposit?"
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import itertools
+import multiprocessing
+from typing import Any, Callable, Dict, Iterator, Optional
+
+LOCAL_MODEL_PATH = os.getenv("BANKBOT_LLM_MODEL_PATH", os.path.join("models", "Meta-Llama-3.1-8B-Instruct-Q4_K_M.gguf"))
+LOCAL_N_CTX = int(os.getenv("BANKBOT_LLM_N_CTX", "2048"))
+LOCAL_N_THREADS = int(os.getenv("BANKBOT_LLM_N_THREADS", str(os.cpu_count() or 4)))
+LOCAL_N_BATCH = int(os.getenv("BANKBOT_LLM_N_BATCH", "512"))
+LOCAL_N_GPU_LAYERS = int(os.getenv("BANKBOT_LLM_N_GPU_LAYERS", "0"))
+LOCAL_MAX_TOKENS = int(os.getenv("BANKBOT_LLM_MAX_TOKENS", "300"))
+LOCAL_KV_CACHE_BYTES = int(os.getenv("BANKBOT_LLM_KV_CACHE_MB", "512")) << 20
+LOCAL_QUEUE_SIZE = int(os.getenv("BANKBOT_LLM_QUEUE", "32"))
+# spawn: the parent is a threaded Streamlit process, forking it is not safe
+LOCAL_START_METHOD = os.getenv("BANKBOT_LLM_START_METHOD", "spawn")
+
+ModelFactory = Callable[[Dict[str, Any]], Any]
+
+
+def llama_cpp_factory(config: Dict[str, Any]):
+    from llama_cpp import Llama, LlamaRAMCache
+
+    llm = Llama(
+        model_path=config["model_path"],
+        n_ctx=config["n_ctx"],
+        n_threads=config["n_threads"],
+        n_batch=config["n_batch"],
+        n_gpu_layers=config["n_gpu_layers"],
+        verbose=False,
+    )
+    llm.set_cache(LlamaRAMCache(capacity_bytes=config["kv_cache_bytes"]))
+    return llm
+
+
+def _drain(cancels, cancelled: set):
+    while True:
+        try:
+            cancelled.add(cancels.get_nowait())
+        except queue.Empty:
+            return
+
+
+def serve(llm, requests, responses, cancels, system_prompt: str):
+    """Worker loop: one request at a time, chunks streamed back as they are sampled."""
+    cancelled: set = set()
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        req_id, prompt, temperature, max_tokens = job
+        _drain(cancels, cancelled)
+        if req_id in cancelled:
+            continue
+        messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+        start = time.perf_counter()
+        first = None
+        tokens = 0
+        try:
+            for chunk in llm.create_chat_completion(messages=messages, temperature=temperature,
+                                                    max_tokens=max_tokens, stream=True):
+                text = chunk["choices"][0]["delta"].get("content")
+                if not text:
+                    continue
+                if first is None:
+                    first = time.perf_counter()
+                tokens += 1
+                responses.put(("chunk", req_id, text))
+                _drain(cancels, cancelled)
+                if req_id in cancelled:
+                    break
+        except Exception as e:
+            responses.put(("error", req_id, f"{type(e).__name__}: {e}"))
+            continue
+        # ids reach the queue (nearly) in order; forget older cancels so the set stays small
+        cancelled = {i for i in cancelled if i > req_id}
+        end = time.perf_counter()
+        decode = end - first if first is not None else 0.0
+        responses.put(("done", req_id, {
+            "tokens": tokens,
+            "ttft": (first or end) - start,
+            "seconds": end - start,
+            "tokens_per_sec": (tokens - 1) / decode if tokens > 1 and decode > 0 else 0.0,
+        }))
+
+
+def _worker_main(factory: ModelFactory, config: Dict[str, Any], requests, responses, cancels):
+    start = time.perf_counter()
+    try:
+        llm = factory(config)
+        # evaluate the shared system prompt once so its KV state is cached
+        llm.create_chat_completion(
+            messages=[{"role": "system", "content": config["system_prompt"]}, {"role": "user", "content": "hi"}],
+            max_tokens=1,
+        )
+    except Exception as e:
+        responses.put(("failed", None, f"{type(e).__name__}: {e}"))
+        return
+    responses.put(("ready", None, time.perf_counter() - start))
+    serve(llm, requests, responses, cancels, config["system_prompt"])
+
+
+class LocalLLM:
+    def __init__(self, model_path: str = LOCAL_MODEL_PATH, n_ctx: int = LOCAL_N_CTX,
+                 n_threads: int = LOCAL_N_THREADS, n_batch: int = LOCAL_N_BATCH,
+                 n_gpu_layers: int = LOCAL_N_GPU_LAYERS, max_tokens: int = LOCAL_MAX_TOKENS,
+                 kv_cache_bytes: int = LOCAL_KV_CACHE_BYTES, queue_size: int = LOCAL_QUEUE_SIZE,
+                 system_prompt: Optional[str] = None, factory: ModelFactory = llama_cpp_factory,
+                 start_method: str = LOCAL_START_METHOD):
+        if system_prompt is None:
+            from llm_engine.gateway import SYSTEM_PROMPT
+            system_prompt = SYSTEM_PROMPT
+        self.config = {
+            "model_path": model_path, "n_ctx": n_ctx, "n_threads": n_threads, "n_batch": n_batch,
+            "n_gpu_layers": n_gpu_layers, "kv_cache_bytes": kv_cache_bytes, "system_prompt": system_prompt,
+        }
+        self.name = os.path.basename(model_path)
+        self.max_tokens = max_tokens
+        self._factory = factory
+        self._ctx = multiprocessing.get_context(start_method)
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, "queue.Queue"] = {}
+        self._process = None
+        # set once the load attempt is over, successful or not (see load_error)
+        self.ready = threading.Event()
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.requests = 0
+        self.tokens = 0
+        self.decode_seconds = 0.0
+        self.last_tokens_per_sec = 0.0
+
+    # ---------- worker lifecycle ----------
+    def start(self) -> "LocalLLM":
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                return self
+            self.ready.clear()
+            self.load_error = None
+            self._requests = self._ctx.Queue(self._queue_size)
+            self._responses = self._ctx.Queue()
+            self._cancels = self._ctx.Queue()
+            self._process = self._ctx.Process(
+                target=_worker_main, name="bankbot-llm",
+                args=(self._factory, self.config, self._requests, self._responses, self._cancels), daemon=True,
+            )
+            self._process.start()
+            threading.Thread(target=self._dispatch, args=(self._process, self._responses),
+                             name="bankbot-llm-dispatch", daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            self._requests.put_nowait(None)
+        except queue.Full:
+            pass
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+
+    def _dispatch(self, process, responses):
+        while True:
+            try:
+                kind, req_id, payload = responses.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                if not self.ready.is_set():
+                    self.load_error = f"worker exited with code {process.exitcode} while loading"
+                    self.ready.set()
+                self._fail_all(ConnectionError("local LLM worker exited"))
+                return
+            if kind == "ready":
+                self.load_seconds = payload
+                self.ready.set()
+            elif kind == "failed":
+                self.load_error = payload
+                self.ready.set()
+                self._fail_all(RuntimeError(payload))
+                return
+            else:
+                if kind == "done":
+                    self._record(payload)
+                with self._lock:
+                    waiter = self._pending.get(req_id)
+                if waiter is not None:
+                    waiter.put((kind, payload))
+
+    def _fail_all(self, exc: Exception):
+        with self._lock:
+            waiters = list(self._pending.values())
+        for waiter in waiters:
+            waiter.put(("raise", exc))
+
+    def _record(self, result: Dict[str, Any]):
+        with self._lock:
+            self.requests += 1
+            self.tokens += result["tokens"]
+            if result["tokens_per_sec"]:
+                self.decode_seconds += (result["tokens"] - 1) / result["tokens_per_sec"]
+                self.last_tokens_per_sec = result["tokens_per_sec"]
+
+    # ---------- requests ----------
+    def stream(self, prompt: str, timeout: Optional[float] = None, temperature: float = 0.3,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        if self.load_error:
+            raise RuntimeError(self.load_error)
+        self.start()
+        end = None if timeout is None else time.monotonic() + timeout
+        req_id = next(self._ids)
+        waiter: "queue.Queue" = queue.Queue()
+        with self._lock:
+            self._pending[req_id] = waiter
+        finished = False
+        try:
+            try:
+                self._requests.put((req_id, prompt, temperature, max_tokens or self.max_tokens),
+                                   timeout=timeout)
+            except queue.Full:
+                raise TimeoutError("local LLM queue is full")
+            while True:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("local LLM deadline exceeded")
+                try:
+                    kind, payload = waiter.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError("local LLM deadline exceeded")
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    finished = True
+                    return
+                elif kind == "raise":
+                    finished = True
+                    raise payload
+                else:
+                    finished = True
+                    raise RuntimeError(payload)
+        finally:
+            with self._lock:
+                self._pending.pop(req_id, None)
+            if not finished:
+                # timed out or abandoned: stop the worker spending tokens on it
+                self._cancels.put(req_id)
+
+    def complete(self, prompt: str, timeout: Optional[float] = None, temperature: float = 0.3,
+                 max_tokens: Optional[int] = None) -> str:
+        return "".join(self.stream(prompt, timeout, temperature, max_tokens))
+
+    def backend(self, temperature: float = 0.3):
+        """(complete, stream) in the shape LLMGateway expects."""
+        def complete(prompt: str, timeout: float) -> str:
+            return self.complete(prompt, timeout, temperature)
+
+        def stream(prompt: str, timeout: float) -> Iterator[str]:
+            return self.stream(prompt, timeout, temperature)
+
+        return complete, stream
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = len(self._pending)
+            return {
+                "model": self.name,
+                "alive": self._process is not None and self._process.is_alive(),
+                "ready": self.ready.is_set() and not self.load_error,
+                "load_seconds": self.load_seconds,
+                "load_error": self.load_error,
+                "n_threads": self.config["n_threads"],
+                "n_ctx": self.config["n_ctx"],
+                "requests": self.requests,
+                "queued": queued,
+                "tokens": self.tokens,
+                "tokens_per_sec": (self.tokens - self.requests) / self.decode_seconds if self.decode_seconds else 0.0,
+                "last_tokens_per_sec": self.last_tokens_per_sec,
+            }
+
+
+_local: Optional[LocalLLM] = None
+_local_lock = threading.Lock()
+
+
+def get_local_llm() -> LocalLLM:
+    """Process-wide worker; started (and the model loaded) on first use."""
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocalLLM().start()
+    return _local
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("question", nargs="?", default="What is a fixed deposit?")
+    parser.add_argument("--model_path", type=str, default=LOCAL_MODEL_PATH)
+    parser.add_argument("--n_threads", type=int, default=LOCAL_N_THREADS)
+    parser.add_argument("--n_ctx", type=int, default=LOCAL_N_CTX)
+    parser.add_argument("--repeat", type=int, default=2, help="later runs reuse the cached system prompt")
+    args = parser.parse_args()
+    llm = LocalLLM(args.model_path, n_ctx=args.n_ctx, n_threads=args.n_threads).start()
+    llm.ready.wait()
+    if llm.load_error:
+        sys.exit(llm.load_error)
+    print(f"loaded {llm.name} in {llm.load_seconds:.1f}s")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        for chunk in llm.stream(args.question):
+            print(chunk, end="", flush=True)
+        print(f"\n-- {time.perf_counter() - t0:.1f}s, {llm.last_tokens_per_sec:.1f} tok/s\n")
+    print(llm.stats())
+    llm.stop()
@@ -0,0 +1,82 @@
+# llm_engine/streaming.py
+"""
+Token streaming for the LLM fallback.
+
+groq_stream turns a Groq completion into a generator of text chunks.
+StreamTimer wraps any such generator, measures time to first token and
+total time, and keeps the full text, so the caller can render chunks as
+they arrive and persist the answer once, at the end.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from database import db
+
+
+def groq_stream(client, messages: List[Dict[str, str]], model: str, temperature: float = 0.3,
+                max_tokens: int = 300, timeout: Optional[float] = None) -> Iterator[str]:
+    extra = {} if timeout is None else {"timeout": timeout}
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+        **extra,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+class StreamTimer:
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = chunks
+        self._parts: List[str] = []
+        self.ttft: Optional[float] = None
+        self.total: Optional[float] = None
+        self.done = False
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        for chunk in self._chunks:
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - start
+            self._parts.append(chunk)
+            yield chunk
+        self.total = time.perf_counter() - start
+        if self.ttft is None:
+            self.ttft = self.total
+        self.done = True
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def chunks(self) -> int:
+        return len(self._parts)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "ttft_ms": None if self.ttft is None else round(1000 * self.ttft, 1),
+            "total_ms": None if self.total is None else round(1000 * self.total, 1),
+            "chunks": self.chunks,
+        }
+
+
+def record_turn(account_no: Optional[str], backend: str, model: str, source: str,
+                ttft: Optional[float], total: Optional[float], chunks: int, timestamp: Optional[str] = None,
+                db_path: Optional[str] = None):
+    """One llm_turns row. `chunks` is StreamTimer.chunks: streamed pieces, not model tokens."""
+    with db.db_connection(db_path) as conn:
+        conn.execute(
+            "INSERT INTO llm_turns (timestamp, account_no, backend, model, source, ttft_ms, total_ms, chunks) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), account_no, backend, model, source,
+             None if ttft is None else 1000 * ttft, None if total is None else 1000 * total, chunks),
+        )
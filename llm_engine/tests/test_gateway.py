@@ -0,0 +1,183 @@
+import time
+import threading
+
+import pytest
+
+from llm_engine.fake_server import FakeLLMConfig, FakeLLMServer
+from llm_engine.gateway import CircuitBreaker, LLMGateway, is_transient, openai_http_backend
+
+
+class Upstream503(Exception):
+    status_code = 503
+
+
+def _fallback(prompt, reason):
+    return f"canned:{reason}"
+
+
+def _gateway(complete, stream=None, **kwargs):
+    kwargs.setdefault("backoff", 0.001)
+    return LLMGateway(complete, stream, fallback=_fallback, **kwargs)
+
+
+def test_is_transient():
+    assert is_transient(TimeoutError()) and is_transient(ConnectionError()) and is_transient(Upstream503())
+    assert not is_transient(ValueError("bad request"))
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()          # the single half-open trial
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_retries_transient_errors_then_succeeds():
+    calls = []
+
+    def complete(prompt, timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise Upstream503()
+        return "ok"
+
+    gw = _gateway(complete, retries=2)
+    assert gw.complete("q") == ("ok", "llm")
+    assert len(calls) == 3 and gw.stats()["retries"] == 2
+    assert all(0 < t <= gw.deadline for t in calls)
+
+
+def test_non_transient_error_degrades_without_retry():
+    calls = []
+
+    def complete(prompt, timeout):
+        calls.append(1)
+        raise ValueError("bad request")
+
+    gw = _gateway(complete, retries=3, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(3):
+        assert gw.complete("q") == ("canned:ValueError", "fallback")
+    # client errors say nothing about upstream health
+    assert len(calls) == 3 and gw.breaker.state == "closed"
+
+
+def test_open_breaker_skips_upstream():
+    calls = []
+
+    def complete(prompt, timeout):
+        calls.append(1)
+        raise Upstream503()
+
+    gw = _gateway(complete, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    gw.complete("q")
+    gw.complete("q")
+    assert gw.complete("q") == ("canned:circuit_open", "fallback")
+    assert len(calls) == 2 and gw.stats()["short_circuited"] == 1
+
+
+def test_concurrency_is_capped_and_waiters_degrade_at_deadline():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def complete(prompt, timeout):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return "ok"
+
+    gw = _gateway(complete, max_concurrent=2, deadline=0.15)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gw.complete("q")[1])) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] <= 2
+    assert "fallback" in results and "llm" in results
+    assert gw.stats()["in_flight"] == 0
+
+
+def test_stream_retries_before_first_chunk_only():
+    attempts = []
+
+    def stream(prompt, timeout):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Upstream503()
+        yield "Fixed "
+        if len(attempts) == 2:
+            raise ConnectionError("reset")
+        yield "deposits"
+
+    gw = _gateway(lambda p, t: "x", stream, retries=2)
+    turn = {}
+    assert list(gw.stream("q", turn)) == ["Fixed "]
+    assert turn["source"] == "llm_partial" and len(attempts) == 2
+
+    turn = {}
+    assert "".join(gw.stream("q", turn)) == "Fixed deposits"
+    assert turn["source"] == "llm"
+
+
+class SlowStream:
+    """An upstream response that never ends on its own; close() is what frees it."""
+
+    def __init__(self):
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        time.sleep(0.03)
+        return "tok "
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_deadline_closes_upstream():
+    upstream = SlowStream()
+    gw = _gateway(lambda p, t: "x", lambda p, t: upstream, deadline=0.1)
+    turn = {}
+    assert list(gw.stream("q", turn)) and turn["source"] == "llm_partial"
+    assert upstream.closed and gw.stats()["timeouts"] == 1
+
+
+def test_stream_degrades_when_breaker_open():
+    gw = _gateway(lambda p, t: "x", lambda p, t: iter(["never"]),
+                  breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    gw.breaker.record_failure()
+    turn = {}
+    assert list(gw.stream("q", turn)) == ["canned:circuit_open"]
+    assert turn["source"] == "fallback"
+
+
+@pytest.fixture
+def fake_llm():
+    server = FakeLLMServer(config=FakeLLMConfig(latency=0.01, jitter=0.0, token_delay=0.0, answer="hello there")).start()
+    yield server
+    server.stop()
+
+
+def test_against_fake_server(fake_llm):
+    complete, stream = openai_http_backend(fake_llm.base_url, "fake")
+    gw = _gateway(complete, stream, deadline=2.0)
+    assert gw.complete("hi") == ("hello there", "llm")
+    turn = {}
+    assert "".join(gw.stream("hi", turn)) == "hello there" and turn["source"] == "llm"
+
+    fake_llm.configure(hang_rate=1.0, hang_seconds=1.0)
+    t0 = time.monotonic()
+    gw.deadline = 0.3
+    answer, source = gw.complete("hi")
+    assert source == "fallback" and time.monotonic() - t0 < 0.6
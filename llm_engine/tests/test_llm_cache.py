@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from database import db
+from llm_engine import cache as llm_cache
+from llm_engine.cache import LLMCache, normalize_prompt
+
+MODEL = "llama-3.1-8b-instant"
+
+
+class CharGramEncoder:
+    def __call__(self, texts):
+        out = np.zeros((len(texts), 128), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for a, b in zip(t, t[1:]):
+                out[i, (ord(a) * 31 + ord(b)) % 128] += 1
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "bank.db")
+    db.init_db(path)
+    yield path
+    db.get_pool(path).close_all()
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  What is the  Interest rate on FD?? ") == "what is the interest rate on fd"
+
+
+def test_exact_level_persists_across_instances(db_path):
+    c = LLMCache(db_path)
+    assert c.get("What is the interest rate on FD?", MODEL, 0.3) is None
+    c.put("What is the interest rate on FD?", MODEL, 0.3, "7.1% p.a.")
+    assert c.get("what is the interest rate on fd", MODEL, 0.3) == ("7.1% p.a.", "exact")
+    # model and temperature are part of the key
+    assert c.get("what is the interest rate on fd", MODEL, 0.7) is None
+    assert c.get("what is the interest rate on fd", "other-model", 0.3) is None
+
+    restarted = LLMCache(db_path)
+    assert restarted.get("What is the interest rate on FD", MODEL, 0.3) == ("7.1% p.a.", "exact")
+    s = c.stats()
+    assert (s["exact_hits"], s["misses"], s["size"]) == (1, 3, 1)
+
+
+def test_ttl_and_lru_bounds(db_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    c = LLMCache(db_path, maxsize=2, ttl=100)
+    c.put("a", MODEL, 0.3, "A")
+    clock[0] += 150
+    assert c.get("a", MODEL, 0.3) is None            # expired
+
+    for q in ("b", "c", "d"):
+        clock[0] += 1
+        c.put(q, MODEL, 0.3, q.upper())
+    clock[0] += 1
+    assert c.get("b", MODEL, 0.3)                    # b is now the most recently hit
+    c.evict()
+    assert c.stats()["size"] == 2
+    assert c.get("c", MODEL, 0.3) is None            # least recently used went first
+    assert c.get("b", MODEL, 0.3) and c.get("d", MODEL, 0.3)
+
+
+def test_semantic_level(db_path):
+    c = LLMCache(db_path, semantic=True, semantic_threshold=0.9, encoder=CharGramEncoder())
+    c.put("what is the interest rate on fixed deposits", MODEL, 0.3, "7.1% p.a.")
+    assert c.get("what's the interest rate on fixed deposit", MODEL, 0.3) == ("7.1% p.a.", "semantic")
+    assert c.get("how do i close my account", MODEL, 0.3) is None
+    # a fresh process reloads the stored embeddings
+    again = LLMCache(db_path, semantic=True, semantic_threshold=0.9, encoder=CharGramEncoder())
+    assert again.get("what is interest rate on fixed deposits", MODEL, 0.3)[1] == "semantic"
+    assert c.stats()["semantic_hits"] == 1
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from llm_engine.gateway import LLMGateway
+from llm_engine.local_backend import LocalLLM
+
+
+class FakeLlama:
+    """Stands in for llama_cpp.Llama: echoes the question word by word."""
+
+    def __init__(self, config):
+        self.config = config
+        self.calls = []
+
+    def create_chat_completion(self, messages, temperature=0.3, max_tokens=16, stream=False):
+        self.calls.append(messages)
+        question = messages[-1]["content"]
+        if question == "boom":
+            raise RuntimeError("sampling failed")
+        words = ("system:" + messages[0]["content"][:6] + " " + question).split()[:max_tokens]
+        if not stream:
+            return {"choices": [{"message": {"content": " ".join(words)}}]}
+        return self._stream(words, 0.2 if question == "slow" else 0.001)
+
+    @staticmethod
+    def _stream(words, delay):
+        for i, word in enumerate(words):
+            time.sleep(delay)
+            yield {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+
+
+def fake_factory(config):
+    return FakeLlama(config)
+
+
+def broken_factory(config):
+    raise FileNotFoundError(config["model_path"])
+
+
+@pytest.fixture
+def local_llm():
+    llm = LocalLLM("models/fake.gguf", n_threads=2, n_ctx=512, factory=fake_factory,
+                   system_prompt="Banker", start_method="fork").start()
+    assert llm.ready.wait(10) and llm.load_error is None
+    yield llm
+    llm.stop()
+
+
+def test_streams_from_resident_worker(local_llm):
+    assert local_llm.complete("fixed deposit rates", timeout=5) == "system:Banker fixed deposit rates"
+    assert "".join(local_llm.stream("savings", timeout=5)) == "system:Banker savings"
+    stats = local_llm.stats()
+    assert stats["alive"] and stats["ready"] and stats["requests"] == 2
+    assert stats["tokens"] == 6 and stats["tokens_per_sec"] > 0
+    assert stats["model"] == "fake.gguf" and stats["n_threads"] == 2
+
+
+def test_timeout_cancels_and_worker_keeps_serving(local_llm):
+    with pytest.raises(TimeoutError):
+        local_llm.complete("slow", timeout=0.1)
+    assert local_llm.complete("next", timeout=5) == "system:Banker next"
+    assert local_llm.stats()["queued"] == 0
+
+
+def test_worker_errors_surface_to_caller(local_llm):
+    with pytest.raises(RuntimeError, match="sampling failed"):
+        local_llm.complete("boom", timeout=5)
+    assert local_llm.complete("still up", timeout=5) == "system:Banker still up"
+
+
+def test_gateway_over_local_backend(local_llm):
+    complete, stream = local_llm.backend()
+    gw = LLMGateway(complete, stream, fallback=lambda p, r: "canned", deadline=5, name="local")
+    turn = {}
+    assert "".join(gw.stream("loan", turn)) == "system:Banker loan" and turn["source"] == "llm"
+
+
+def test_load_failure_is_reported():
+    llm = LocalLLM("missing.gguf", factory=broken_factory, start_method="fork").start()
+    assert llm.ready.wait(10)
+    assert "FileNotFoundError" in llm.load_error and not llm.stats()["ready"]
+    with pytest.raises(RuntimeError):
+        llm.complete("hi", timeout=1)
+    llm.stop()
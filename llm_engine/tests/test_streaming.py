@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from database import db
+from llm_engine.streaming import StreamTimer, groq_stream, record_turn
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeGroq:
+    def __init__(self, pieces):
+        self.kwargs = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._pieces = pieces
+
+    def _create(self, **kwargs):
+        self.kwargs = kwargs
+        return iter([_chunk(p) for p in self._pieces] + [SimpleNamespace(choices=[])])
+
+
+def test_groq_stream_yields_deltas():
+    client = FakeGroq(["Fixed ", None, "deposits ", "earn 7%."])
+    out = list(groq_stream(client, [{"role": "user", "content": "fd rate"}], model="m"))
+    assert out == ["Fixed ", "deposits ", "earn 7%."]
+    assert client.kwargs["stream"] is True and client.kwargs["max_tokens"] == 300
+
+
+def test_stream_timer_measures_first_token():
+    def slow():
+        time.sleep(0.05)
+        yield "first"
+        time.sleep(0.05)
+        yield " second"
+
+    timer = StreamTimer(slow())
+    seen = []
+    for chunk in timer:
+        seen.append((chunk, timer.ttft is not None))
+    assert seen == [("first", True), (" second", True)]
+    assert timer.text == "first second" and timer.chunks == 2 and timer.done
+    assert 0.04 < timer.ttft < timer.total
+
+
+def test_record_turn(tmp_path):
+    path = str(tmp_path / "bank.db")
+    db.init_db(path)
+    record_turn("1001", "groq", "m", "llm", 0.12, 1.5, 42, timestamp="2025-01-01 10:00:00", db_path=path)
+    with db.db_connection(path) as conn:
+        row = conn.execute("SELECT account_no, source, ttft_ms, total_ms, chunks FROM llm_turns").fetchone()
+    assert row == ("1001", "llm", pytest.approx(120.0), pytest.approx(1500.0), 42)
+    db.get_pool(path).close_all()
+
+
+def test_llm_turns_tokens_column_is_renamed(tmp_path):
+    path = str(tmp_path / "bank.db")
+    with db.db_connection(path) as conn:
+        db._create_tables(conn)
+        db.migrate(conn, target=10)
+        conn.execute("INSERT INTO llm_turns (source, tokens) VALUES ('llm', 7)")
+        db.migrate(conn)
+        assert conn.execute("SELECT source, chunks FROM llm_turns").fetchone() == ("llm", 7)
+    db.get_pool(path).close_all()
@@ -74,8 +74,11 @@ if "trained_model" not in st.session_state:
 if "train_params" not in st.session_state:
     st.session_state.train_params = {"epochs": 2, "batch_size": 8, "lr": 0.001}
 
-# Train function (slightly stronger regularization options)
-def train_nlu(intents_map):
+# Fitted models are cached per process, keyed on the intents content, so reruns
+# and other sessions with the same intents never refit.
+@st.cache_resource(show_spinner=False)
+def _fit_nlu(intents_json):
+    intents_map = json.loads(intents_json)
     X = []
     y = []
     for intent, examples in intents_map.items():
@@ -90,6 +93,13 @@ def train_nlu(intents_map):
     # slightly stronger regularization allowing model to be more confident (tune C if needed)
     clf = LogisticRegression(max_iter=2000, C=1.0)
     clf.fit(Xv, y)
+    return vec, clf
+
+# Train function (slightly stronger regularization options)
+def train_nlu(intents_map):
+    vec, clf = _fit_nlu(json.dumps(intents_map, sort_keys=True))
+    if clf is None:
+        return None, None
     st.session_state.vectorizer = vec
     st.session_state.clf = clf
     st.session_state.trained_model = True
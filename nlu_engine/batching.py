@@ -0,0 +1,130 @@
+# nlu_engine/batching.py
+"""
+Micro-batching front-end for IntentClassifier.
+
+Callers submit one text and get a Future back. A single worker thread
+collects requests that arrive within `max_wait_ms` (up to `max_batch_size`)
+and runs them through IntentClassifier.predict_batch in one padded
+forward pass.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+BATCH_MAX_SIZE = int(os.getenv("BANKBOT_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BANKBOT_BATCH_MAX_WAIT_MS", "5"))
+
+_STOP = object()
+
+
+class BatchingEngine:
+    def __init__(self, classifier, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._queue_depths: Counter = Counter()
+        self._requests = 0
+        self._batches = 0
+        self._busy_time = 0.0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="nlu-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------- public API ----------
+    def submit(self, text: str, top_k: int = 3) -> Future:
+        fut: Future = Future()
+        if self._closed:
+            fut.set_exception(RuntimeError("BatchingEngine is closed"))
+            return fut
+        self._queue.put((text, top_k, fut))
+        return fut
+
+    def predict(self, text: str, top_k: int = 3, timeout: float = None) -> Dict[str, Any]:
+        return self.submit(text, top_k=top_k).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "mean_batch_size": (self._requests / self._batches) if self._batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_depth_histogram": dict(sorted(self._queue_depths.items())),
+                "busy_seconds": round(self._busy_time, 4),
+            }
+
+    def close(self, timeout: float = 5.0):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout=timeout)
+
+    # ---------- worker ----------
+    def _collect(self, first) -> Tuple[List[tuple], bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+            depth = self._queue.qsize()
+            self._dispatch(batch)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] += 1
+                self._queue_depths[depth] += 1
+
+        # drain anything still queued after close()
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.max_batch_size):
+            self._dispatch(leftover[i:i + self.max_batch_size])
+
+    def _dispatch(self, batch: List[tuple]):
+        texts = [t for t, _, _ in batch]
+        k = max(top_k for _, top_k, _ in batch)
+        start = time.perf_counter()
+        try:
+            results = self.classifier.predict_batch(texts, top_k=k)
+        except Exception as e:
+            for _, _, fut in batch:
+                fut.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self._busy_time += time.perf_counter() - start
+        for (text, top_k, fut), res in zip(batch, results):
+            fut.set_result({"text": text, "predictions": res["predictions"][:top_k]})
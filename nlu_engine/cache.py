@@ -0,0 +1,123 @@
+# nlu_engine/cache.py
+"""
+Bounded LRU + TTL cache for intent predictions.
+
+Keys are normalized utterances (lower-cased, whitespace collapsed, digit
+runs masked) so "Transfer 500 to 12345678" and "transfer 900 to 87654321"
+share one entry. Only the intent result is cached — entities must always
+be extracted from the real text by the caller.
+
+The cache is dropped whenever intents.json changes on disk. It does not
+watch the model directory: the loaded model stays in memory until the
+process exits, so a retrained model under MODEL_DIR needs a restart
+(which also starts with an empty cache).
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+HERE = os.path.dirname(__file__)
+INTENTS_PATH = os.path.join(HERE, "intents.json")
+
+CACHE_MAXSIZE = int(os.getenv("BANKBOT_NLU_CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("BANKBOT_NLU_CACHE_TTL", "600"))
+# how often (seconds) the watched files are re-stat'ed
+WATCH_INTERVAL = 2.0
+
+_WS_RE = re.compile(r"\s+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def normalize_utterance(text: str) -> str:
+    t = (text or "").lower().strip()
+    t = _DIGITS_RE.sub("#", t)
+    return _WS_RE.sub(" ", t)
+
+
+def _fingerprint(paths: Iterable[str]) -> Tuple:
+    parts = []
+    for path in paths:
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append((path, st.st_mtime_ns, st.st_size))
+        else:
+            parts.append((path, None, None))
+    return tuple(parts)
+
+
+class PredictionCache:
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL,
+                 watch_paths: Iterable[str] = (INTENTS_PATH,)):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.watch_paths = tuple(watch_paths)
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fp = _fingerprint(self.watch_paths)
+        self._next_check = time.monotonic() + WATCH_INTERVAL
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_sources(self, now: float):
+        if now < self._next_check:
+            return
+        self._next_check = now + WATCH_INTERVAL
+        fp = _fingerprint(self.watch_paths)
+        if fp != self._fp:
+            self._fp = fp
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(self, text: str) -> Optional[Any]:
+        key = normalize_utterance(text)
+        now = time.monotonic()
+        with self._lock:
+            self._check_sources(now)
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, text: str, value: Any):
+        key = normalize_utterance(text)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
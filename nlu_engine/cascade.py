@@ -0,0 +1,151 @@
+# nlu_engine/cascade.py
+"""
+Two-stage intent cascade.
+
+Stage 1 is a TF-IDF + LogisticRegression model trained from intents.json
+(same recipe as main_app1.train_nlu). Its answer is used when the margin
+between the top-2 class probabilities is at least `margin_threshold`;
+otherwise the transformer IntentClassifier is consulted.
+
+    python -m nlu_engine.cascade --replay bankbot.db --thresholds 0.1 0.2 0.3
+"""
+import os
+import sqlite3
+import argparse
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from nlu_engine.train_intent import INTENTS_PATH, load_intents
+
+CASCADE_MARGIN = float(os.getenv("BANKBOT_CASCADE_MARGIN", "0.3"))
+
+STAGES = ("tfidf", "transformer")
+
+
+class CascadeClassifier:
+    def __init__(self, intents_path: str = INTENTS_PATH, margin_threshold: float = CASCADE_MARGIN,
+                 transformer: Optional[Callable[[str, int], Dict[str, Any]]] = None):
+        self.intents_path = intents_path
+        self.margin_threshold = margin_threshold
+        self._transformer = transformer
+        self._lock = threading.Lock()
+        self._hits = {s: 0 for s in STAGES}
+        self._seconds = {s: 0.0 for s in STAGES}
+        self._calls = 0
+        self.fit()
+
+    def fit(self):
+        texts, labels = load_intents(self.intents_path)
+        if len(set(labels)) < 2:
+            raise ValueError("Cascade needs at least two intents in intents.json")
+        self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=8000, sublinear_tf=True)
+        X = self.vectorizer.fit_transform(texts)
+        self.clf = LogisticRegression(max_iter=2000, C=1.0)
+        self.clf.fit(X, labels)
+        self.classes = list(self.clf.classes_)
+
+    # ---------- stages ----------
+    def predict_cheap(self, texts: List[str], top_k: int = 3):
+        """TF-IDF stage only: (predictions dict, margin) per text."""
+        probs = self.clf.predict_proba(self.vectorizer.transform(texts))
+        out = []
+        for text, row in zip(texts, probs):
+            order = np.argsort(row)[::-1]
+            margin = float(row[order[0]] - row[order[1]]) if len(order) > 1 else float(row[order[0]])
+            preds = [{"intent": self.classes[i], "confidence": float(row[i])} for i in order[:top_k]]
+            out.append(({"text": text, "predictions": preds}, margin))
+        return out
+
+    def _transformer_predict(self, text: str, top_k: int) -> Dict[str, Any]:
+        if self._transformer is None:
+            from nlu_engine.infer_intent import get_classifier
+            self._transformer = get_classifier().predict
+        return self._transformer(text, top_k=top_k)
+
+    def predict(self, text: str, top_k: int = 3) -> Dict[str, Any]:
+        start = time.perf_counter()
+        (result, margin), = self.predict_cheap([text], top_k=top_k)
+        cheap_s = time.perf_counter() - start
+        stage = "tfidf"
+        if margin < self.margin_threshold:
+            start = time.perf_counter()
+            try:
+                result = self._transformer_predict(text, top_k)
+            finally:
+                with self._lock:
+                    self._seconds["transformer"] += time.perf_counter() - start
+            stage = "transformer"
+        with self._lock:
+            self._calls += 1
+            self._hits[stage] += 1
+            self._seconds["tfidf"] += cheap_s
+        result = dict(result)
+        result["stage"] = stage
+        result["margin"] = margin
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._calls
+            stages = {}
+            for s in STAGES:
+                # every call pays for the tfidf stage; only escalations pay for the transformer
+                ran = calls if s == "tfidf" else self._hits[s]
+                stages[s] = {
+                    "hits": self._hits[s],
+                    "hit_rate": self._hits[s] / calls if calls else 0.0,
+                    "mean_ms": 1000 * self._seconds[s] / ran if ran else 0.0,
+                }
+            return {
+                "calls": calls,
+                "margin_threshold": self.margin_threshold,
+                "transformer_calls_saved": self._hits["tfidf"],
+                "stages": stages,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = {s: 0 for s in STAGES}
+            self._seconds = {s: 0.0 for s in STAGES}
+            self._calls = 0
+
+
+def replay(db_path: str, thresholds: List[float], cascade: Optional[CascadeClassifier] = None):
+    """How many transformer calls each threshold would have saved over chat_logs."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT user_query FROM chat_logs WHERE user_query IS NOT NULL").fetchall()
+    conn.close()
+    texts = [r[0] for r in rows]
+    cascade = cascade or CascadeClassifier()
+    if not texts:
+        return {}
+    start = time.perf_counter()
+    margins = np.array([m for _, m in cascade.predict_cheap(texts)])
+    per_query_ms = 1000 * (time.perf_counter() - start) / len(texts)
+    report = {}
+    for th in thresholds:
+        saved = int((margins >= th).sum())
+        report[th] = {"queries": len(texts), "transformer_calls": len(texts) - saved,
+                      "saved": saved, "saved_pct": 100.0 * saved / len(texts)}
+    report["tfidf_ms_per_query"] = per_query_ms
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", type=str, default="bankbot.db", help="sqlite db with chat_logs")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.1, 0.2, 0.3, 0.4, 0.5])
+    args = parser.parse_args()
+    rep = replay(args.replay, args.thresholds)
+    if not rep:
+        print("chat_logs is empty")
+    else:
+        print(f"TF-IDF stage: {rep.pop('tfidf_ms_per_query'):.3f} ms/query")
+        print(f"{'threshold':>9} {'queries':>8} {'transformer':>12} {'saved':>7} {'saved %':>8}")
+        for th, r in rep.items():
+            print(f"{th:>9.2f} {r['queries']:>8} {r['transformer_calls']:>12} {r['saved']:>7} {r['saved_pct']:>7.1f}%")
@@ -1,18 +1,61 @@
 # nlu_engine/entity_extractor.py
 import re, json, os
-from typing import List, Dict
-import spacy
+from bisect import bisect_right
+from typing import Iterable, List, Dict, Optional
 
 BASE = os.path.dirname(__file__)
 ENT_PATH = os.path.join(BASE, "entities.json")
 
+SPACY_BATCH_SIZE = int(os.getenv("BANKBOT_SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS = int(os.getenv("BANKBOT_SPACY_N_PROCESS", "1"))
+
+# priority order: earlier entities win overlapping spans
+REGEX_ORDER = ["transaction_id", "account_number", "amount", "date", "ifsc"]
+
+
+class _Spans:
+    """Sorted, non-overlapping [start, end) spans with O(log n) overlap checks."""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def reserve(self, start: int, end: int) -> bool:
+        i = bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] > start and self.starts[i - 1] < end:
+            return False
+        if i < len(self.starts) and self.starts[i] < end:
+            return False
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        return True
+
+def load_ner_pipeline(spacy_model: str):
+    """Load a spaCy pipeline with every component NER does not need disabled."""
+    import spacy
+    nlp = spacy.load(spacy_model)
+    keep = {"ner"}
+    if "tok2vec" in nlp.pipe_names:
+        # shared tok2vec is only needed if ner listens to it (md/lg/trf models)
+        if "ner" in getattr(nlp.get_pipe("tok2vec"), "listening_components", []):
+            keep.add("tok2vec")
+    nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in keep])
+    return nlp
+
+
 class EntityExtractor:
-    def __init__(self, spacy_model: str = "en_core_web_sm"):
-        # try load spacy, else set to None
-        try:
-            self.nlp = spacy.load(spacy_model)
-        except Exception:
-            self.nlp = None
+    def __init__(self, spacy_model: str = "en_core_web_sm", use_spacy: bool = True, lazy: bool = True,
+                 batch_size: int = SPACY_BATCH_SIZE, n_process: int = SPACY_N_PROCESS):
+        # spaCy is optional: use_spacy=False never imports it, lazy=True defers
+        # the import + model load to the first text that needs NER
+        self.spacy_model = spacy_model
+        self.use_spacy = use_spacy
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._nlp = None
+        self._nlp_loaded = not use_spacy
+        if use_spacy and not lazy:
+            self._load_spacy()
 
         if os.path.exists(ENT_PATH):
             with open(ENT_PATH, "r", encoding="utf-8") as f:
@@ -26,13 +69,22 @@ class EntityExtractor:
                 "ifsc": r"\b[A-Z]{4}0[A-Z0-9]{6}\b"
             }
         self.compiled = {k: re.compile(v, flags=re.IGNORECASE) for k,v in self.patterns.items()}
+        # (name, pattern) in priority order, resolved once instead of per call
+        self.ordered = [(n, self.compiled[n]) for n in REGEX_ORDER if n in self.compiled]
 
-    def _reserve_span(self, reserved: List[tuple], start: int, end: int) -> bool:
-        for s,e in reserved:
-            if not (end <= s or start >= e):
-                return False
-        reserved.append((start, end))
-        return True
+    def _load_spacy(self):
+        # try load spacy, else set to None
+        try:
+            self._nlp = load_ner_pipeline(self.spacy_model)
+        except Exception:
+            self._nlp = None
+        self._nlp_loaded = True
+
+    @property
+    def nlp(self):
+        if not self._nlp_loaded:
+            self._load_spacy()
+        return self._nlp
 
     def _normalize_amount(self, raw: str):
         s = raw.replace("₹", "").replace("Rs", "").replace("INR", "").replace("$", "")
@@ -45,16 +97,18 @@ class EntityExtractor:
             return raw.strip()
 
     def extract_regex(self, text: str) -> List[Dict]:
+        """
+        Each pattern runs as one C-level finditer pass; overlap resolution
+        against the spans already claimed by higher-priority entities goes
+        through a sorted interval index (O(log n) per match instead of a
+        linear scan of every reserved span).
+        """
         results = []
-        reserved = []
-        order = ["transaction_id", "account_number", "amount", "date", "ifsc"]
-        for name in order:
-            pat = self.compiled.get(name)
-            if not pat:
-                continue
+        reserved = _Spans()
+        for name, pat in self.ordered:
             for m in pat.finditer(text):
-                start, end = m.start(), m.end()
-                if self._reserve_span(reserved, start, end):
+                start, end = m.span()
+                if reserved.reserve(start, end):
                     val = m.group(0).strip()
                     item = {"entity": name, "value": val, "start": start, "end": end, "source": "regex"}
                     if name == "amount":
@@ -62,34 +116,52 @@ class EntityExtractor:
                     results.append(item)
         return results
 
-    def extract_spacy(self, text: str) -> List[Dict]:
-        if not self.nlp:
-            return []
-        doc = self.nlp(text)
+    def _doc_entities(self, doc) -> List[Dict]:
         out = []
-        reserved = []
+        reserved = _Spans()
         for ent in doc.ents:
             start, end = ent.start_char, ent.end_char
-            overlaps = any(not (end <= s or start >= e) for s,e in reserved)
-            if overlaps:
+            if not reserved.reserve(start, end):
                 continue
             out.append({"entity": ent.label_.lower(), "value": ent.text, "start": start, "end": end, "source": "spacy"})
-            reserved.append((start, end))
         return out
 
-    def extract(self, text: str) -> List[Dict]:
-        text = text or ""
-        regex_ents = self.extract_regex(text)
-        spacy_ents = self.extract_spacy(text)
-        reserved = [(e["start"], e["end"]) for e in regex_ents]
+    def extract_spacy(self, text: str) -> List[Dict]:
+        if not self.nlp:
+            return []
+        return self._doc_entities(self.nlp(text))
+
+    def _merge(self, regex_ents: List[Dict], spacy_ents: List[Dict]) -> List[Dict]:
+        reserved = _Spans()
+        for e in regex_ents:
+            reserved.reserve(e["start"], e["end"])
         for e in spacy_ents:
-            if any(not (e['end'] <= s or e['start'] >= t) for s,t in reserved):
-                continue
-            regex_ents.append(e)
-            reserved.append((e['start'], e['end']))
+            if reserved.reserve(e["start"], e["end"]):
+                regex_ents.append(e)
         regex_ents.sort(key=lambda x: x["start"])
         return regex_ents
 
+    def extract(self, text: str) -> List[Dict]:
+        text = text or ""
+        return self._merge(self.extract_regex(text), self.extract_spacy(text))
+
+    def extract_batch(self, texts: Iterable[str], batch_size: Optional[int] = None,
+                      n_process: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Same output as [extract(t) for t in texts], but spaCy NER streams
+        through nlp.pipe in batches (optionally across n_process workers).
+        """
+        texts = [t or "" for t in texts]
+        regex_results = [self.extract_regex(t) for t in texts]
+        if not self.nlp or not texts:
+            return [self._merge(r, []) for r in regex_results]
+        docs = self.nlp.pipe(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process,
+        )
+        return [self._merge(r, self._doc_entities(doc)) for r, doc in zip(regex_results, docs)]
+
 if __name__ == "__main__":
     ex = EntityExtractor()
     s = "Please transfer ₹2,500 to account 9988776655. TXN: TXN12345. Do it tomorrow."
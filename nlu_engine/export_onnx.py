@@ -0,0 +1,100 @@
+# nlu_engine/export_onnx.py
+"""
+Export the trained intent model to ONNX and a dynamically quantized int8
+variant for CPU inference via onnxruntime.
+
+    python nlu_engine/export_onnx.py --model_dir models/intent_model --check
+
+Writes <model_dir>/onnx/model.onnx and <model_dir>/onnx/model.int8.onnx.
+With --check, every backend is run over the intents.json examples and
+accuracy, agreement with the torch model and per-query latency are printed.
+nlu_engine/tests/test_export_onnx.py guards the same parity in the test
+suite (top-1 intent and per-class probabilities on fixed sentences).
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from nlu_engine.infer_intent import IntentClassifier, ONNX_DIR_NAME, ONNX_FILES, BACKENDS
+from nlu_engine.train_intent import load_intents
+
+
+def export(model_dir: str, opset: int = 14):
+    out_dir = os.path.join(model_dir, ONNX_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, ONNX_FILES["onnx"])
+    int8_path = os.path.join(out_dir, ONNX_FILES["onnx-int8"])
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(["check my balance", "transfer 500 to account 12345678"],
+                       padding=True, return_tensors="pt")
+    input_names = [k for k in ("input_ids", "attention_mask") if k in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    print(f"Exporting fp32 graph to {fp32_path} ...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[k] for k in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    print(f"Quantizing (dynamic int8) to {int8_path} ...")
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    for path in (fp32_path, int8_path):
+        print(f"  {os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB")
+    return fp32_path, int8_path
+
+
+def check(model_dir: str, top_k: int = 1):
+    texts, gold = load_intents()
+    results = {}
+    for backend in BACKENDS:
+        clf = IntentClassifier(model_dir, backend=backend)
+        clf.predict(texts[0])  # warm-up
+        preds, latencies = [], []
+        for t in texts:
+            start = time.perf_counter()
+            out = clf.predict(t, top_k=top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            preds.append(out["predictions"][0]["intent"] if out["predictions"] else None)
+        results[backend] = (preds, np.array(latencies))
+
+    ref = results["torch"][0]
+    print(f"\n{'backend':<10} {'accuracy':>9} {'agree/torch':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend, (preds, lat) in results.items():
+        acc = np.mean([p == g for p, g in zip(preds, gold)])
+        agree = np.mean([p == r for p, r in zip(preds, ref)])
+        print(f"{backend:<10} {acc:>9.3f} {agree:>12.3f} {np.percentile(lat, 50):>8.2f} {np.percentile(lat, 95):>8.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_dir", type=str, default="models/intent_model")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--check", action="store_true", help="run parity + latency comparison after export")
+    parser.add_argument("--skip_export", action="store_true")
+    args = parser.parse_args()
+    if not args.skip_export:
+        export(args.model_dir, opset=args.opset)
+    if args.check:
+        check(args.model_dir)
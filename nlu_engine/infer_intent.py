@@ -1,17 +1,33 @@
 # nlu_engine/infer_intent.py
-import os, json
-from typing import Dict, Any
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import os, re, json
+from typing import Dict, Any, List
+import numpy as np
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "models", "intent_model")
+ONNX_DIR_NAME = "onnx"
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+BACKENDS = ("torch",) + tuple(ONNX_FILES)
+DEFAULT_BACKEND = os.getenv("BANKBOT_NLU_BACKEND", "torch")
 
 class IntentClassifier:
-    def __init__(self, model_dir: str = MODEL_DIR):
+    def __init__(self, model_dir: str = MODEL_DIR, backend: str = DEFAULT_BACKEND):
         self.model_dir = model_dir
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
         if not os.path.isdir(self.model_dir):
             raise FileNotFoundError(f"Model directory not found: {self.model_dir}. Train first.")
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification, pipeline
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_dir)
+        if backend == "torch":
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_dir)
+            self.config = self.model.config
+            self.pipe = pipeline("text-classification", model=self.model, tokenizer=self.tokenizer, return_all_scores=True)
+        else:
+            self.model = None
+            self.pipe = None
+            self.config = AutoConfig.from_pretrained(self.model_dir)
+            self.session = self._load_onnx(backend)
         # load labels if present
         labels_path = os.path.join(self.model_dir, "labels.json")
         if os.path.exists(labels_path):
@@ -19,62 +35,179 @@ class IntentClassifier:
                 self.labels = json.load(f)
         else:
             # fallback to model config labels
-            num_labels = self.model.config.num_labels
+            num_labels = self.config.num_labels
             self.labels = [f"label_{i}" for i in range(num_labels)]
-        self.pipe = pipeline("text-classification", model=self.model, tokenizer=self.tokenizer, return_all_scores=True)
+
+    def _load_onnx(self, backend: str):
+        import onnxruntime as ort
+        path = os.path.join(self.model_dir, ONNX_DIR_NAME, ONNX_FILES[backend])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ONNX model not found: {path}. Run nlu_engine/export_onnx.py first.")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+    def _onnx_scores(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        enc = self.tokenizer(list(texts), padding=True, truncation=True, return_tensors="np")
+        wanted = {i.name for i in self.session.get_inputs()}
+        feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in wanted}
+        logits = self.session.run(None, feeds)[0]
+        # same softmax the HF text-classification pipeline applies
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = exp / exp.sum(axis=-1, keepdims=True)
+        id2label = self.config.id2label
+        return [
+            [{"label": id2label.get(i, f"LABEL_{i}"), "score": float(p)} for i, p in enumerate(row)]
+            for row in probs
+        ]
+
+    def _format(self, text: str, scores: List[Dict[str, Any]], top_k: int) -> Dict[str, Any]:
+        sorted_scores = sorted(scores, key=lambda x: x["score"], reverse=True)[:top_k]
+        preds = []
+        for s in sorted_scores:
+            lab = s["label"]
+            # HF often returns 'LABEL_0' — map to our labels if possible
+            if lab.startswith("LABEL_") and lab[6:].isdigit():
+                idx = int(lab[6:])
+                mapped = self.labels[idx] if idx < len(self.labels) else lab
+            else:
+                mapped = lab
+            preds.append({"intent": mapped, "confidence": float(s["score"])})
+        return {"text": text, "predictions": preds}
 
     def predict(self, text: str, top_k: int = 3) -> Dict[str, Any]:
+        if self.pipe is None:
+            return self._format(text, self._onnx_scores([text])[0], top_k)
         out = self.pipe(text)
         if isinstance(out, list) and len(out) > 0:
-            scores = out[0]
-            sorted_scores = sorted(scores, key=lambda x: x["score"], reverse=True)[:top_k]
-            preds = []
-            for s in sorted_scores:
-                lab = s["label"]
-                # HF often returns 'LABEL_0' — map to our labels if possible
-                if lab.startswith("LABEL_") and lab[6:].isdigit():
-                    idx = int(lab[6:])
-                    mapped = self.labels[idx] if idx < len(self.labels) else lab
-                else:
-                    mapped = lab
-                preds.append({"intent": mapped, "confidence": float(s["score"])})
-            return {"text": text, "predictions": preds}
+            return self._format(text, out[0], top_k)
         return {"text": text, "predictions": []}
 
+    def predict_batch(self, texts: List[str], top_k: int = 3) -> List[Dict[str, Any]]:
+        """Classify several texts in one padded forward pass."""
+        if not texts:
+            return []
+        if self.pipe is None:
+            return [self._format(t, s, top_k) for t, s in zip(texts, self._onnx_scores(texts))]
+        out = self.pipe(list(texts), batch_size=len(texts), truncation=True)
+        results = []
+        for text, scores in zip(texts, out):
+            if isinstance(scores, dict):
+                scores = [scores]
+            results.append(self._format(text, scores, top_k))
+        return results
+
 if __name__ == "__main__":
     ic = IntentClassifier()
     print(ic.predict("Please transfer ₹2,500 to account 9988776655", top_k=5))
 
 # SAFE WRAPPER FOR UI
-_classifier = None
+_engine = None
+_cascade = None
+_cache = None
+
+# route predict_intent through the micro-batching engine (see batching.py)
+USE_BATCHING = os.getenv("BANKBOT_NLU_BATCHING", "0") == "1"
+# answer confident messages with the TF-IDF stage before the transformer (see cascade.py)
+USE_CASCADE = os.getenv("BANKBOT_NLU_CASCADE", "0") == "1"
+# serve repeated utterances from the LRU/TTL prediction cache (see cache.py)
+USE_PREDICTION_CACHE = os.getenv("BANKBOT_NLU_CACHE", "1") == "1"
+
+
+def get_classifier() -> IntentClassifier:
+    # one shared, warmed-up model per process (see model_manager.py)
+    from nlu_engine.model_manager import get_model_manager
+    return get_model_manager().classifier
+
+
+def get_batching_engine():
+    global _engine
+    if _engine is None:
+        from nlu_engine.batching import BatchingEngine
+        _engine = BatchingEngine(get_classifier())
+    return _engine
+
+
+def _transformer_predict(text: str, top_k: int = 3) -> Dict[str, Any]:
+    if USE_BATCHING:
+        return get_batching_engine().predict(text, top_k=top_k)
+    return get_classifier().predict(text, top_k=top_k)
+
+
+def get_cascade():
+    global _cascade
+    if _cascade is None:
+        from nlu_engine.cascade import CascadeClassifier
+        _cascade = CascadeClassifier(transformer=_transformer_predict)
+    return _cascade
+
+
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        from nlu_engine.cache import PredictionCache
+        _cache = PredictionCache()
+    return _cache
 
 
 def predict_intent(text: str, top_k: int = 3):
     """
     Safe intent prediction:
+    - Serves repeated utterances from the prediction cache
     - Tries ML model
     - Falls back to rule-based demo if model/tokenizer fails
+    Entities are always extracted from the real text, never from the cache.
     """
-    global _classifier
+    cache = get_prediction_cache() if USE_PREDICTION_CACHE else None
+    if cache is not None:
+        hit = cache.get(text)
+        if hit is not None:
+            intent, confidence, source = hit
+            entities = _transfer_entities(text.lower()) if source == "rules" and intent == "transfer_money" else {}
+            return intent, confidence, entities
+
+    intent, confidence, entities, source = _predict_uncached(text, top_k)
+    if cache is not None:
+        cache.put(text, (intent, confidence, source))
+    return intent, confidence, entities
 
+
+def _predict_uncached(text: str, top_k: int = 3):
     # TRY ML 
     try:
-        if _classifier is None:
-            _classifier = IntentClassifier()
-
-        result = _classifier.predict(text, top_k=top_k)
+        if USE_CASCADE:
+            result = get_cascade().predict(text, top_k=top_k)
+        else:
+            result = _transformer_predict(text, top_k=top_k)
 
         if result["predictions"]:
             top = result["predictions"][0]
 
             if top["confidence"] >= 0.6:
-                return "out_of_scope", top["confidence"], {}
+                return "out_of_scope", top["confidence"], {}, "model"
             
-            return top["intent"], top["confidence"], {}
+            return top["intent"], top["confidence"], {}, "model"
 
     except Exception:
         pass  # silently fall back
 
+    return rule_based_intent(text) + ("rules",)
+
+
+def _transfer_entities(t: str):
+    # simple entity extraction
+    amount = re.findall(r"\b\d+\b", t)
+    acc = re.findall(r"account\s+(\d+)", t)
+
+    entities = {}
+    if amount:
+        entities["amount"] = amount[0]
+    if acc:
+        entities["account_number"] = acc[0]
+    return entities
+
+
+def rule_based_intent(text: str):
     # FALLBACK DEMO LOGIC 
     t = text.lower()
 
@@ -85,18 +218,7 @@ def predict_intent(text: str, top_k: int = 3):
         return "check_balance", 0.92, {}
 
     if "transfer" in t and any(char.isdigit() for char in t):
-        # simple entity extraction
-        import re
-        amount = re.findall(r"\b\d+\b", t)
-        acc = re.findall(r"account\s+(\d+)", t)
-
-        entities = {}
-        if amount:
-            entities["amount"] = amount[0]
-        if acc:
-            entities["account_number"] = acc[0]
-
-        return "transfer_money", 0.90, entities
+        return "transfer_money", 0.90, _transfer_entities(t)
     
     if any(w in t for w in ["unblock card", "activate card", "enable my card","reactivate card","unblock my card","activate atm card","enable card","reactivate my card","unblock atm card","activate debit card","enable debit card","reactivate debit card","activate credit card","enable credit card","reactivate credit card","unblock credit card","unblock my credit card","unblock debit card"]):
         return "unblock_card", 0.95, {}
@@ -0,0 +1,128 @@
+# nlu_engine/model_manager.py
+"""
+Process-wide owner of the intent model.
+
+The tokenizer and model are loaded once per process, a warm-up batch is run
+straight after loading so the first user request does not pay for lazy
+initialisation, and load time / warm-up time / memory footprint are kept
+for the Admin Panel. Streamlit pages should reach it through
+st.cache_resource so reruns never reload weights.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from nlu_engine.infer_intent import IntentClassifier, MODEL_DIR, DEFAULT_BACKEND, ONNX_DIR_NAME, ONNX_FILES
+
+WARMUP_TEXTS = [
+    "hi",
+    "check my balance",
+    "Please transfer ₹2,500 to account 9988776655",
+    "block my debit card",
+    "what is the interest rate on a fixed deposit",
+    "where is the nearest atm",
+    "bye",
+    "I want to apply for a personal loan",
+]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except Exception:
+            return 0
+
+
+class ModelManager:
+    def __init__(self, model_dir: str = MODEL_DIR, backend: str = DEFAULT_BACKEND):
+        self.model_dir = model_dir
+        self.backend = backend
+        self._classifier: Optional[IntentClassifier] = None
+        self._lock = threading.Lock()
+        self.load_error: Optional[str] = None
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.model_bytes = 0
+        self.rss_delta_bytes = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._classifier is not None
+
+    @property
+    def classifier(self) -> IntentClassifier:
+        if self._classifier is None:
+            self.load()
+        if self._classifier is None:
+            raise RuntimeError(f"Intent model unavailable: {self.load_error}")
+        return self._classifier
+
+    def load(self, force: bool = False) -> "ModelManager":
+        with self._lock:
+            if self._classifier is not None and not force:
+                return self
+            if self.load_error and not force:
+                return self
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            try:
+                clf = IntentClassifier(self.model_dir, backend=self.backend)
+                load_seconds = time.perf_counter() - start
+
+                # a model that loads but cannot predict is as unavailable as one that fails to load
+                start = time.perf_counter()
+                clf.predict_batch(WARMUP_TEXTS)
+                clf.predict(WARMUP_TEXTS[0])
+                warmup_seconds = time.perf_counter() - start
+            except Exception as e:
+                self.load_error = str(e)
+                self._classifier = None
+                return self
+            self.load_seconds = load_seconds
+            self.warmup_seconds = warmup_seconds
+
+            self.rss_delta_bytes = max(0, _rss_bytes() - rss_before)
+            self.model_bytes = self._model_bytes(clf)
+            self.load_error = None
+            self._classifier = clf
+        return self
+
+    def _model_bytes(self, clf: IntentClassifier) -> int:
+        if clf.model is not None:
+            return sum(p.numel() * p.element_size() for p in clf.model.parameters())
+        path = os.path.join(self.model_dir, ONNX_DIR_NAME, ONNX_FILES[self.backend])
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "loaded": self.loaded,
+            "error": self.load_error,
+            "load_seconds": round(self.load_seconds, 3),
+            "warmup_seconds": round(self.warmup_seconds, 3),
+            "model_mb": round(self.model_bytes / 1e6, 1),
+            "rss_delta_mb": round(self.rss_delta_bytes / 1e6, 1),
+            "pid": os.getpid(),
+        }
+
+
+_manager: Optional[ModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager(preload: bool = True) -> ModelManager:
+    """Return this process's ModelManager, loading and warming it on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ModelManager()
+    if preload:
+        _manager.load()
+    return _manager
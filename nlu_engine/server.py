@@ -0,0 +1,241 @@
+# nlu_engine/server.py
+"""
+Standalone asyncio NLU service.
+
+    POST /parse        {"text": "...", "top_k": 3}
+    POST /parse_batch  {"texts": ["...", "..."], "top_k": 3}
+    GET  /health
+
+/parse answers {"text", "intents": {"text", "predictions": [...]},
+"entities": [...]} — the contract nlu_engine/tests/test_nlu.py uses.
+Model work runs on a bounded thread pool, never on the event loop, and
+requests beyond `max_pending` get 503 instead of queueing forever.
+
+    python -m nlu_engine.server --port 5006 --workers 4
+"""
+import os
+import json
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_HOST = os.getenv("BANKBOT_NLU_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("BANKBOT_NLU_PORT", "5006"))
+EXECUTOR_THREADS = int(os.getenv("BANKBOT_NLU_THREADS", "4"))
+MAX_PENDING = int(os.getenv("BANKBOT_NLU_MAX_PENDING", "256"))
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 256
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class NLUService:
+    """Synchronous NLU work the HTTP layer pushes onto the executor."""
+
+    def __init__(self, predict_batch: Optional[Callable[[List[str], int], List[Dict[str, Any]]]] = None,
+                 extract_batch: Optional[Callable[[List[str]], List[List[Dict]]]] = None):
+        self._predict_batch = predict_batch
+        self._extract_batch = extract_batch
+
+    def warm_up(self):
+        if self._predict_batch is None:
+            from nlu_engine.model_manager import get_model_manager
+            get_model_manager()
+        if self._extract_batch is None:
+            from nlu_engine.entity_extractor import EntityExtractor
+            self._extract_batch = EntityExtractor().extract_batch
+
+    def model_loaded(self) -> bool:
+        if self._predict_batch is not None:
+            return True
+        try:
+            from nlu_engine.model_manager import get_model_manager
+            return get_model_manager(preload=False).loaded
+        except Exception:
+            return False
+
+    def _predict(self, texts: List[str], top_k: int) -> List[Dict[str, Any]]:
+        if self._predict_batch is not None:
+            return self._predict_batch(texts, top_k)
+        from nlu_engine.infer_intent import get_classifier, rule_based_intent
+        try:
+            return get_classifier().predict_batch(texts, top_k=top_k)
+        except Exception:
+            # same safety net as predict_intent: keyword rules
+            out = []
+            for t in texts:
+                intent, conf, _ = rule_based_intent(t)
+                out.append({"text": t, "predictions": [{"intent": intent, "confidence": conf}]})
+            return out
+
+    def parse_batch(self, texts: List[str], top_k: int = 3) -> List[Dict[str, Any]]:
+        if self._extract_batch is None:
+            self.warm_up()
+        intents = self._predict(texts, top_k)
+        entities = self._extract_batch(texts)
+        return [{"text": t, "intents": i, "entities": e} for t, i, e in zip(texts, intents, entities)]
+
+
+class NLUServer:
+    def __init__(self, service: Optional[NLUService] = None, threads: int = EXECUTOR_THREADS,
+                 max_pending: int = MAX_PENDING):
+        self.service = service or NLUService()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="nlu")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+
+    # ---------- HTTP plumbing ----------
+    async def _read_request(self, reader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ValueError("malformed request line")
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = h.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise OverflowError
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _response(status: int, payload: Dict[str, Any], keep_alive: bool) -> bytes:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    req = await self._read_request(reader)
+                except OverflowError:
+                    writer.write(self._response(413, {"error": "body too large"}, False))
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(self._response(400, {"error": "malformed request"}, False))
+                    break
+                if req is None:
+                    break
+                method, path, headers, body = req
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.route(method, path, body)
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------- routes ----------
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, {"status": "ok", "pid": os.getpid(), "model_loaded": self.service.model_loaded(),
+                         "pending": self.pending, "served": self.served, "rejected": self.rejected}
+        if path not in ("/parse", "/parse_batch"):
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            data = json.loads(body or b"{}")
+            top_k = int(data.get("top_k", 3))
+            if path == "/parse":
+                texts = [str(data["text"])]
+            else:
+                texts = [str(t) for t in data["texts"]]
+                if len(texts) > MAX_BATCH:
+                    return 413, {"error": f"at most {MAX_BATCH} texts per batch"}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            key = "text" if path == "/parse" else "texts"
+            return 400, {"error": f"expected JSON body with '{key}'"}
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return 503, {"error": "server busy, retry later"}
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor, self.service.parse_batch, texts, top_k)
+        except Exception as e:
+            return 500, {"error": str(e)}
+        finally:
+            self.pending -= 1
+        self.served += len(texts)
+        if path == "/parse":
+            return 200, results[0]
+        return 200, {"results": results}
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, reuse_port: bool = False,
+                    ready: Optional[Callable[[int], None]] = None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.service.warm_up)
+        server = await asyncio.start_server(self.handle, host, port, reuse_port=reuse_port or None)
+        if ready:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def _run_worker(host: str, port: int, threads: int, max_pending: int, reuse_port: bool):
+    server = NLUServer(threads=threads, max_pending=max_pending)
+    try:
+        asyncio.run(server.serve(host, port, reuse_port=reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(args):
+    reuse_port = args.workers > 1 and hasattr(socket, "SO_REUSEPORT")
+    if args.workers > 1 and not reuse_port:
+        print("SO_REUSEPORT not available on this platform; running a single worker.")
+        args.workers = 1
+    print(f"NLU service on http://{args.host}:{args.port} ({args.workers} worker(s), {args.threads} threads each)")
+    if args.workers == 1:
+        _run_worker(args.host, args.port, args.threads, args.max_pending, False)
+        return
+    # every worker binds the same port; the kernel spreads connections across them
+    procs = [
+        multiprocessing.Process(target=_run_worker, args=(args.host, args.port, args.threads, args.max_pending, True))
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the port")
+    parser.add_argument("--threads", type=int, default=EXECUTOR_THREADS, help="model threads per worker")
+    parser.add_argument("--max_pending", type=int, default=MAX_PENDING)
+    main(parser.parse_args())
@@ -0,0 +1,68 @@
+# nlu_engine/tests/test_batching.py
+import threading
+
+from nlu_engine.batching import BatchingEngine
+
+
+class FakeClassifier:
+    def __init__(self):
+        self.calls = []
+
+    def predict_batch(self, texts, top_k=3):
+        self.calls.append(list(texts))
+        return [
+            {"text": t, "predictions": [{"intent": f"i{j}", "confidence": 1.0 / (j + 1)} for j in range(5)][:top_k]}
+            for t in texts
+        ]
+
+
+def test_results_match_callers():
+    clf = FakeClassifier()
+    engine = BatchingEngine(clf, max_batch_size=8, max_wait_ms=20)
+    futures = [engine.submit(f"text {i}", top_k=1 + i % 3) for i in range(20)]
+    for i, fut in enumerate(futures):
+        res = fut.result(timeout=5)
+        assert res["text"] == f"text {i}"
+        assert len(res["predictions"]) == 1 + i % 3
+    engine.close()
+
+    stats = engine.stats()
+    assert stats["requests"] == 20
+    assert max(len(c) for c in clf.calls) <= 8
+    assert sum(k * v for k, v in stats["batch_size_histogram"].items()) == 20
+
+
+def test_concurrent_callers_are_grouped():
+    clf = FakeClassifier()
+    engine = BatchingEngine(clf, max_batch_size=64, max_wait_ms=50)
+    barrier = threading.Barrier(16)
+    out = {}
+
+    def caller(i):
+        barrier.wait()
+        out[i] = engine.predict(f"q{i}", timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.close()
+
+    assert sorted(out) == list(range(16))
+    assert engine.stats()["batches"] < 16
+
+
+def test_errors_propagate_to_futures():
+    class Broken:
+        def predict_batch(self, texts, top_k=3):
+            raise RuntimeError("boom")
+
+    engine = BatchingEngine(Broken(), max_wait_ms=1)
+    fut = engine.submit("hello")
+    try:
+        fut.result(timeout=5)
+        assert False, "expected exception"
+    except RuntimeError as e:
+        assert "boom" in str(e)
+    engine.close()
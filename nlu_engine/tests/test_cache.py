@@ -0,0 +1,50 @@
+# nlu_engine/tests/test_cache.py
+import os
+import time
+
+from nlu_engine import cache as cache_mod
+from nlu_engine.cache import PredictionCache, normalize_utterance
+
+
+def test_normalization_masks_digits_and_whitespace():
+    assert normalize_utterance("  Transfer 500   to account 12345678 ") == "transfer # to account #"
+    assert normalize_utterance("transfer 9000 to account 87654321") == "transfer # to account #"
+    assert normalize_utterance("HI") == "hi"
+
+
+def test_lru_eviction_and_counters():
+    c = PredictionCache(maxsize=2, ttl=60, watch_paths=())
+    c.put("hi", ("greet", 0.9, "rules"))
+    c.put("check balance", ("check_balance", 0.9, "rules"))
+    assert c.get("Hi ") == ("greet", 0.9, "rules")  # refreshes "hi"
+    c.put("block my card", ("block_card", 0.9, "rules"))  # evicts "check balance"
+    assert c.get("check balance") is None
+    assert c.get("hi") is not None
+    stats = c.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["evictions"] == 1
+
+
+def test_ttl_expiry():
+    c = PredictionCache(maxsize=8, ttl=0.01, watch_paths=())
+    c.put("hi", "greet")
+    time.sleep(0.02)
+    assert c.get("hi") is None
+    assert c.stats()["expirations"] == 1
+
+
+def test_invalidated_when_watched_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_mod, "WATCH_INTERVAL", 0.0)
+    intents = tmp_path / "intents.json"
+    intents.write_text("{}")
+    c = PredictionCache(watch_paths=(str(intents),))
+    c.put("hi", "greet")
+    assert c.get("hi") == "greet"
+    intents.write_text('{"intents": []}')
+    os.utime(intents, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert c.get("hi") is None
+    assert c.stats()["invalidations"] == 1
+
+
+def test_watches_intents_only_by_default():
+    # a new model needs a restart; clearing the cache would not load it
+    assert PredictionCache().watch_paths == (cache_mod.INTENTS_PATH,)
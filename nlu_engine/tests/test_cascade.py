@@ -0,0 +1,40 @@
+# nlu_engine/tests/test_cascade.py
+import sqlite3
+
+from nlu_engine.cascade import CascadeClassifier, replay
+
+
+def fake_transformer(text, top_k=3):
+    return {"text": text, "predictions": [{"intent": "from_transformer", "confidence": 0.99}]}
+
+
+def test_threshold_controls_escalation():
+    cheap = CascadeClassifier(margin_threshold=0.0, transformer=fake_transformer)
+    res = cheap.predict("check my account balance")
+    assert res["stage"] == "tfidf"
+    assert res["predictions"][0]["intent"] == "check_balance"
+
+    always = CascadeClassifier(margin_threshold=1.1, transformer=fake_transformer)
+    res = always.predict("check my account balance")
+    assert res["stage"] == "transformer"
+    assert res["predictions"][0]["intent"] == "from_transformer"
+
+    stats = always.stats()
+    assert stats["calls"] == 1
+    assert stats["stages"]["transformer"]["hits"] == 1
+    assert stats["transformer_calls_saved"] == 0
+
+
+def test_replay_counts_saved_calls(tmp_path):
+    db = tmp_path / "logs.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE chat_logs (id INTEGER PRIMARY KEY, user_query TEXT)")
+    conn.executemany("INSERT INTO chat_logs (user_query) VALUES (?)",
+                     [("check balance",), ("block my card",), ("asdf qwerty",)])
+    conn.commit()
+    conn.close()
+
+    rep = replay(str(db), [0.0, 1.1], cascade=CascadeClassifier(transformer=fake_transformer))
+    assert rep[0.0]["saved"] == 3
+    assert rep[1.1]["saved"] == 0
+    assert rep[1.1]["transformer_calls"] == 3
@@ -0,0 +1,66 @@
+# nlu_engine/tests/test_entity_extractor.py
+import random
+
+from nlu_engine.entity_extractor import EntityExtractor
+
+
+def legacy_extract_regex(ex, text):
+    # reference: one finditer per pattern + linear reserved-span check
+    results, reserved = [], []
+    for name in ["transaction_id", "account_number", "amount", "date", "ifsc"]:
+        pat = ex.compiled.get(name)
+        if not pat:
+            continue
+        for m in pat.finditer(text):
+            start, end = m.start(), m.end()
+            if any(not (end <= s or start >= e) for s, e in reserved):
+                continue
+            reserved.append((start, end))
+            val = m.group(0).strip()
+            item = {"entity": name, "value": val, "start": start, "end": end, "source": "regex"}
+            if name == "amount":
+                item["normalized"] = ex._normalize_amount(val)
+            results.append(item)
+    return results
+
+
+CASES = [
+    "Please transfer ₹2,500 to account 9988776655. TXN: TXN12345. Do it tomorrow.",
+    "Move Rs 1,234567 to 12345678 today",
+    "IFSC HDFC0001234 and sbin0abc123, ref REF-99AB1 on 12/05/2024 or 2024-05-12",
+    "pay $12.50, INR 300, rs.45 and ₹1,00,000.75 yesterday",
+    "UTR_ABC123456789 TRN1234567 1234567890123456 12345678901234567",
+    "",
+    "no entities here at all",
+]
+
+
+def test_regex_extraction_matches_legacy_output():
+    ex = EntityExtractor(use_spacy=False)
+    rng = random.Random(7)
+    tokens = ["₹2,500", "Rs 1,234567", "account", "9988776655", "TXN12345", "tomorrow", "HDFC0001234",
+              "12/05/2024", "$40", "to", "ref", "REF-AB12", "INR 5000", "123456", "2024-01-31", ","]
+    cases = CASES + [" ".join(rng.choice(tokens) for _ in range(rng.randint(1, 60))) for _ in range(300)]
+    for text in cases:
+        assert ex.extract_regex(text) == legacy_extract_regex(ex, text), text
+
+
+def test_regex_only_path_never_imports_spacy(monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def guarded(name, *args, **kwargs):
+        assert name.split(".")[0] != "spacy", "regex-only extractor imported spaCy"
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", guarded)
+    ex = EntityExtractor(use_spacy=False)
+    ents = ex.extract(CASES[0])
+    assert ex.nlp is None
+    assert {e["entity"] for e in ents} >= {"amount", "account_number", "transaction_id", "date"}
+
+
+def test_extract_batch_matches_extract():
+    ex = EntityExtractor(use_spacy=False)
+    assert ex.extract_batch(CASES) == [ex.extract(t) for t in CASES]
+    assert ex.extract_batch([]) == []
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from nlu_engine.infer_intent import IntentClassifier, MODEL_DIR, ONNX_DIR_NAME, ONNX_FILES
+
+SENTENCES = [
+    "hi",
+    "check my balance",
+    "Please transfer ₹2,500 to account 9988776655",
+    "block my debit card",
+    "unblock card ending 123456",
+    "where is the nearest atm",
+    "what is the interest rate on a fixed deposit",
+    "bye",
+]
+
+# max |p_torch - p_onnx| per class; int8 weights move probabilities more than fp32 rounding does
+TOLERANCE = {"onnx": 1e-4, "onnx-int8": 0.05}
+
+
+def _exported(backend):
+    return os.path.exists(os.path.join(MODEL_DIR, ONNX_DIR_NAME, ONNX_FILES[backend]))
+
+
+@pytest.fixture(scope="module")
+def torch_clf():
+    if not os.path.isdir(MODEL_DIR):
+        pytest.skip("no trained intent model")
+    return IntentClassifier(MODEL_DIR, backend="torch")
+
+
+def _probs(clf, text):
+    out = clf.predict(text, top_k=len(clf.labels))
+    return {p["intent"]: p["confidence"] for p in out["predictions"]}, out["predictions"][0]["intent"]
+
+
+@pytest.mark.parametrize("backend", sorted(TOLERANCE))
+def test_onnx_matches_torch(torch_clf, backend):
+    if not _exported(backend):
+        pytest.skip(f"{ONNX_FILES[backend]} not exported (run nlu_engine/export_onnx.py)")
+    clf = IntentClassifier(MODEL_DIR, backend=backend)
+    for text in SENTENCES:
+        ref, ref_top = _probs(torch_clf, text)
+        got, top = _probs(clf, text)
+        assert top == ref_top, f"{backend} top-1 differs on {text!r}"
+        assert set(got) == set(ref)
+        assert max(abs(got[k] - ref[k]) for k in ref) <= TOLERANCE[backend], text
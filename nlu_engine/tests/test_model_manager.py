@@ -0,0 +1,79 @@
+import pytest
+
+from nlu_engine import model_manager
+from nlu_engine.model_manager import WARMUP_TEXTS, ModelManager
+
+
+class _Param:
+    def numel(self):
+        return 250_000
+
+    def element_size(self):
+        return 4
+
+
+class _Model:
+    def parameters(self):
+        return [_Param(), _Param()]
+
+
+class StubClassifier:
+    built = 0
+    fail_warmup = False
+
+    def __init__(self, model_dir, backend="torch"):
+        type(self).built += 1
+        self.model = _Model()
+        self.batches = []
+
+    def predict_batch(self, texts, top_k=3):
+        if self.fail_warmup:
+            raise RuntimeError("warm-up exploded")
+        self.batches.append(list(texts))
+        return [{"text": t, "predictions": []} for t in texts]
+
+    def predict(self, text, top_k=3):
+        return self.predict_batch([text], top_k)[0]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(StubClassifier, "built", 0)
+    monkeypatch.setattr(StubClassifier, "fail_warmup", False)
+    monkeypatch.setattr(model_manager, "IntentClassifier", StubClassifier)
+    return StubClassifier
+
+
+def test_loads_and_warms_once(stub, tmp_path):
+    manager = ModelManager(str(tmp_path))
+    clf = manager.load().classifier
+    manager.load()
+    assert manager.classifier is clf and stub.built == 1
+    assert clf.batches == [WARMUP_TEXTS, WARMUP_TEXTS[:1]]
+
+
+def test_failed_warmup_leaves_no_classifier(stub, tmp_path):
+    stub.fail_warmup = True
+    manager = ModelManager(str(tmp_path)).load()
+    assert not manager.loaded and manager.load_error == "warm-up exploded"
+    with pytest.raises(RuntimeError, match="warm-up exploded"):
+        manager.classifier
+    # the failure is remembered until a forced reload
+    manager.load()
+    assert stub.built == 1
+    stub.fail_warmup = False
+    assert manager.load(force=True).loaded and manager.load_error is None and stub.built == 2
+
+
+def test_failed_constructor_is_reported(tmp_path):
+    manager = ModelManager(str(tmp_path / "missing")).load()
+    assert not manager.loaded and "Model directory not found" in manager.load_error
+    assert manager.stats()["error"] == manager.load_error
+
+
+def test_stats(stub, tmp_path):
+    stats = ModelManager(str(tmp_path), backend="torch").load().stats()
+    assert set(stats) == {"backend", "loaded", "error", "load_seconds", "warmup_seconds", "model_mb",
+                          "rss_delta_mb", "pid"}
+    assert stats["loaded"] and stats["error"] is None and stats["backend"] == "torch"
+    assert stats["model_mb"] == 2.0 and stats["load_seconds"] >= 0 and stats["warmup_seconds"] >= 0
@@ -0,0 +1,70 @@
+# nlu_engine/tests/test_server.py
+import asyncio
+import threading
+import time
+
+import requests
+
+from nlu_engine.entity_extractor import EntityExtractor
+from nlu_engine.server import NLUServer, NLUService
+
+
+def fake_predict(texts, top_k):
+    out = []
+    for t in texts:
+        if t == "slow":
+            time.sleep(1.0)
+        out.append({"text": t, "predictions": [{"intent": "transfer_money", "confidence": 0.9}][:top_k]})
+    return out
+
+
+def start_server(**kwargs):
+    service = NLUService(predict_batch=fake_predict, extract_batch=EntityExtractor(use_spacy=False).extract_batch)
+    server = NLUServer(service, **kwargs)
+    ready = threading.Event()
+    port = {}
+
+    def on_ready(p):
+        port["value"] = p
+        ready.set()
+
+    threading.Thread(target=lambda: asyncio.run(server.serve("127.0.0.1", 0, ready=on_ready)), daemon=True).start()
+    assert ready.wait(5)
+    return f"http://127.0.0.1:{port['value']}"
+
+
+def test_parse_contract_and_batch():
+    base = start_server()
+    assert requests.get(f"{base}/health", timeout=2).json()["status"] == "ok"
+
+    j = requests.post(f"{base}/parse", json={"text": "Please transfer ₹2,500 to account 9988776655"}, timeout=2).json()
+    assert j["intents"]["predictions"][0]["intent"] == "transfer_money"
+    assert {"amount", "account_number"} <= {e["entity"] for e in j["entities"]}
+
+    j = requests.post(f"{base}/parse_batch", json={"texts": ["hi", "Has TXN12345 been processed?"]}, timeout=2).json()
+    assert [r["text"] for r in j["results"]] == ["hi", "Has TXN12345 been processed?"]
+    assert j["results"][1]["entities"][0]["entity"] == "transaction_id"
+
+    assert requests.post(f"{base}/parse", json={"nope": 1}, timeout=2).status_code == 400
+    assert requests.get(f"{base}/missing", timeout=2).status_code == 404
+
+
+def test_slow_request_does_not_block_others():
+    base = start_server(threads=2)
+    slow = threading.Thread(target=lambda: requests.post(f"{base}/parse", json={"text": "slow"}, timeout=5))
+    slow.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    r = requests.post(f"{base}/parse", json={"text": "fast"}, timeout=5)
+    assert r.status_code == 200
+    assert time.perf_counter() - start < 0.5
+    slow.join()
+
+
+def test_rejects_when_saturated():
+    base = start_server(threads=1, max_pending=1)
+    slow = threading.Thread(target=lambda: requests.post(f"{base}/parse", json={"text": "slow"}, timeout=5))
+    slow.start()
+    time.sleep(0.1)
+    assert requests.post(f"{base}/parse", json={"text": "fast"}, timeout=5).status_code == 503
+    slow.join()
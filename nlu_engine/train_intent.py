@@ -6,16 +6,11 @@ This version is robust to different transformers versions.
 import os
 import json
 import argparse
-from datasets import Dataset
-from transformers import (
-    AutoTokenizer,
-    AutoModelForSequenceClassification,
-    TrainingArguments,
-    Trainer,
-)
 import numpy as np
 from sklearn.metrics import precision_recall_fscore_support, accuracy_score
-import transformers
+
+# datasets / transformers are imported where training needs them, so
+# load_intents() can be reused (nlu_engine.cascade) without them installed
 
 HERE = os.path.dirname(__file__)
 INTENTS_PATH = os.path.join(HERE, "intents.json")
@@ -40,6 +35,7 @@ def load_intents(path=INTENTS_PATH):
     return texts, labels
 
 def build_dataset(texts, labels, label_list):
+    from datasets import Dataset
     label2id = {l: i for i, l in enumerate(label_list)}
     data = {"text": texts, "label": [label2id[l] for l in labels]}
     ds = Dataset.from_dict(data)
@@ -53,6 +49,13 @@ def compute_metrics(pred):
     return {"accuracy": acc, "f1": f1, "precision": precision, "recall": recall}
 
 def main(args):
+    import transformers
+    from transformers import (
+        AutoTokenizer,
+        AutoModelForSequenceClassification,
+        TrainingArguments,
+        Trainer,
+    )
     print("Transformers version:", transformers.__version__)
     texts, labels = load_intents()
     if len(texts) == 0: